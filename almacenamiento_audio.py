@@ -0,0 +1,206 @@
+# almacenamiento_audio.py
+# Escritura incremental de audio en disco mientras se graba, y lectura tolerante
+# de archivos que quedaron a medio escribir por un cierre inesperado.
+# Las reuniones guardadas pueden archivarse comprimidas (FLAC sin pérdida u Opus);
+# la lectura decodifica en memoria, sin archivos intermedios. `soundfile` solo se
+# importa cuando se usa un formato comprimido.
+
+import os
+import struct
+import wave
+
+TAMANO_CABECERA_WAV = 44
+
+# --- Formatos de archivo de las reuniones guardadas ---
+# formato -> (extensión, formato y subtipo de libsndfile)
+FORMATOS = {
+    "wav": (".wav", None, None),
+    "flac": (".flac", "FLAC", "PCM_16"),   # Sin pérdida, ~50-60% del WAV
+    "opus": (".opus", "OGG", "OPUS"),      # Con pérdida, ~5% del WAV; suficiente para voz
+}
+# Se puede cambiar sin tocar el código con EVARISIS_FORMATO_AUDIO=flac|opus.
+FORMATO_POR_DEFECTO = os.environ.get("EVARISIS_FORMATO_AUDIO", "wav").strip().lower()
+if FORMATO_POR_DEFECTO not in FORMATOS:
+    FORMATO_POR_DEFECTO = "wav"
+FRAMES_POR_BLOQUE = 64 * 1024  # Tamaño de bloque al comprimir, para no cargar el audio entero en memoria
+
+
+def _cabecera_wav(canales, ancho_muestra, frecuencia, bytes_datos):
+    """Construye una cabecera RIFF/WAVE PCM estándar de 44 bytes."""
+    alineacion = canales * ancho_muestra
+    return struct.pack(
+        '<4sI4s4sIHHIIHH4sI',
+        b'RIFF', 36 + bytes_datos, b'WAVE',
+        b'fmt ', 16, 1, canales, frecuencia, frecuencia * alineacion, alineacion, ancho_muestra * 8,
+        b'data', bytes_datos
+    )
+
+
+class EscritorWavIncremental:
+    """
+    Escribe PCM en un .wav a medida que llega del micrófono.
+    La cabecera se actualiza cada `bloques_por_actualizacion` bloques, de modo
+    que el archivo es legible aunque el proceso muera sin llegar a cerrarlo.
+    """
+    def __init__(self, ruta, canales, ancho_muestra, frecuencia, bloques_por_actualizacion=16):
+        self.ruta = ruta
+        self.canales = canales
+        self.ancho_muestra = ancho_muestra
+        self.frecuencia = frecuencia
+        self.bloques_por_actualizacion = bloques_por_actualizacion
+        self.bytes_datos = 0
+        self._bloques = 0
+        self._f = open(ruta, 'wb')
+        self._f.write(_cabecera_wav(canales, ancho_muestra, frecuencia, 0))
+
+    def escribir(self, datos):
+        self._f.write(datos)
+        self.bytes_datos += len(datos)
+        self._bloques += 1
+        if self._bloques % self.bloques_por_actualizacion == 0:
+            self._actualizar_cabecera()
+
+    def _actualizar_cabecera(self):
+        posicion = self._f.tell()
+        self._f.seek(0)
+        self._f.write(_cabecera_wav(self.canales, self.ancho_muestra, self.frecuencia, self.bytes_datos))
+        self._f.seek(posicion)
+        self._f.flush()
+        os.fsync(self._f.fileno())
+
+    def cerrar(self):
+        if self._f.closed:
+            return
+        self._actualizar_cabecera()
+        self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+
+def reparar_cabecera_wav(ruta):
+    """
+    Ajusta los tamaños de la cabecera al tamaño real del archivo.
+    Devuelve True si hubo que corregirla.
+    """
+    tamano = os.path.getsize(ruta)
+    if tamano < TAMANO_CABECERA_WAV:
+        return False
+    with open(ruta, 'r+b') as f:
+        cabecera = f.read(TAMANO_CABECERA_WAV)
+        (riff, _, wave_id, fmt_id, _, _, canales, frecuencia, _, alineacion, bits, data_id, bytes_declarados) = \
+            struct.unpack('<4sI4s4sIHHIIHH4sI', cabecera)
+        if riff != b'RIFF' or wave_id != b'WAVE' or fmt_id != b'fmt ' or data_id != b'data':
+            # No es una cabecera escrita por EscritorWavIncremental; no se toca.
+            return False
+        bytes_reales = tamano - TAMANO_CABECERA_WAV
+        bytes_reales -= bytes_reales % max(alineacion, 1)
+        if bytes_reales == bytes_declarados:
+            return False
+        f.seek(0)
+        f.write(_cabecera_wav(canales, bits // 8, frecuencia, bytes_reales))
+    return True
+
+
+def formato_de(ruta):
+    """Formato de un archivo de audio según su extensión."""
+    extension = os.path.splitext(ruta)[1].lower()
+    for formato, (ext, _, _) in FORMATOS.items():
+        if ext == extension:
+            return formato
+    raise ValueError(f"Formato de audio no soportado: {ruta}")
+
+
+def ruta_con_formato(ruta, formato):
+    """Cambia la extensión de `ruta` por la del `formato` indicado."""
+    return os.path.splitext(ruta)[0] + FORMATOS[formato][0]
+
+
+def _soundfile():
+    try:
+        import soundfile
+    except ImportError as e:
+        raise RuntimeError("Para usar audio comprimido (FLAC/Opus) hay que instalar 'soundfile'.") from e
+    return soundfile
+
+
+def _abrir_comprimido(ruta, formato, canales, frecuencia):
+    _, formato_sf, subtipo = FORMATOS[formato]
+    return _soundfile().SoundFile(ruta, 'w', samplerate=frecuencia, channels=canales, subtype=subtipo, format=formato_sf)
+
+
+def escribir_audio(ruta, pcm, canales, ancho_muestra, frecuencia):
+    """Escribe PCM int16 en `ruta`, en el formato que indique su extensión."""
+    formato = formato_de(ruta)
+    if formato == "wav":
+        with wave.open(ruta, 'wb') as wf:
+            wf.setnchannels(canales)
+            wf.setsampwidth(ancho_muestra)
+            wf.setframerate(frecuencia)
+            wf.writeframes(pcm)
+        return
+    import numpy as np
+    with _abrir_comprimido(ruta, formato, canales, frecuencia) as f:
+        f.write(np.frombuffer(pcm, dtype='<i2').reshape(-1, canales))
+
+
+def comprimir_wav(ruta_wav, ruta_destino):
+    """
+    Codifica un .wav en el formato de `ruta_destino` leyéndolo por bloques.
+    En FLAC se comprueba que el número de muestras coincide. No borra el original.
+    """
+    import numpy as np
+    formato = formato_de(ruta_destino)
+    reparar_cabecera_wav(ruta_wav)
+    ruta_tmp = f"{ruta_destino}.tmp"
+    with wave.open(ruta_wav, 'rb') as wf:
+        canales, frecuencia, total = wf.getnchannels(), wf.getframerate(), wf.getnframes()
+        if wf.getsampwidth() != 2:
+            raise ValueError(f"Solo se comprime PCM de 16 bits: {ruta_wav}")
+        _, formato_sf, subtipo = FORMATOS[formato]
+        # Se escribe en un temporal: un archivo comprimido a medias no es legible.
+        with _soundfile().SoundFile(ruta_tmp, 'w', samplerate=frecuencia, channels=canales, subtype=subtipo, format=formato_sf) as f:
+            while True:
+                bloque = wf.readframes(FRAMES_POR_BLOQUE)
+                if not bloque:
+                    break
+                f.write(np.frombuffer(bloque, dtype='<i2').reshape(-1, canales))
+    if formato == "flac" and _soundfile().info(ruta_tmp).frames != total:
+        os.remove(ruta_tmp)
+        raise ValueError(f"La copia comprimida de {ruta_wav} no tiene las mismas muestras.")
+    os.replace(ruta_tmp, ruta_destino)
+    return ruta_destino
+
+
+def leer_pcm(ruta):
+    """
+    Devuelve los bytes PCM int16 de un archivo de audio. Los .wav se reparan antes
+    si su cabecera quedó desfasada; FLAC/Opus se decodifican en memoria.
+    """
+    if formato_de(ruta) != "wav":
+        datos, _ = _soundfile().read(ruta, dtype='int16')
+        return datos.tobytes()
+    reparar_cabecera_wav(ruta)
+    with wave.open(ruta, 'rb') as wf:
+        return wf.readframes(wf.getnframes())
+
+
+def duracion_segundos(ruta):
+    """Duración del audio, leyendo solo la cabecera."""
+    if formato_de(ruta) != "wav":
+        return _soundfile().info(ruta).duration
+    reparar_cabecera_wav(ruta)
+    with wave.open(ruta, 'rb') as wf:
+        return wf.getnframes() / float(wf.getframerate())
+
+
+def tiene_audio(ruta):
+    """True si el archivo contiene algún dato además de la cabecera."""
+    if not os.path.exists(ruta):
+        return False
+    if formato_de(ruta) != "wav":
+        return os.path.getsize(ruta) > 0
+    return os.path.getsize(ruta) > TAMANO_CABECERA_WAV
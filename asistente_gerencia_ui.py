@@ -1,20 +1,27 @@
 # asistente_gerencia_ui.py (VERSIÓN FINAL CON LÓGICA DE REINTENTO MEJORADA)
 
+import time
+_T_ARRANQUE = time.perf_counter()  # Referencia para medir el tiempo hasta que la ventana es visible
+
 import tkinter as tk
 from tkinter import messagebox, Listbox, simpledialog
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
-from PIL import Image, ImageTk
+from PIL import ImageTk
 import os
 import sys
 import threading
-import time
+import queue
 import argparse
 import logging
-import socket
 import logger
 # --- Importar módulo de lógica ---
 import asistente_reuniones_gerencia_logic as arl_gerencia
+import huggingface
+import resiliencia
+import miniaturas
+import integrantes
+import tareas_ui
 
 # --- Función de ayuda para rutas ---
 def get_path(relative_path):
@@ -24,17 +31,25 @@ def get_path(relative_path):
         base_path = os.path.abspath(os.path.dirname(__file__))
     return os.path.join(base_path, relative_path)
 
+TAMANO_ICONO = (24, 24)
+TAMANO_FOTO_USUARIO = (80, 80)
+TAMANO_FOTO_PARTICIPANTE = (90, 90)
+
 class AsistenteGerenciaApp(ttk.Window):
-    def __init__(self, theme, nombre_usuario, cargo_usuario, foto_path, ruta_datos):
+    def __init__(self, theme, nombre_usuario, cargo_usuario, foto_path, ruta_datos, motor_transcripcion=None):
         super().__init__(themename=theme)
         
         self.current_user = {"nombre": nombre_usuario, "cargo": cargo_usuario}
         self.ruta_datos_central = ruta_datos
+        self.var_motor = tk.StringVar(value=motor_transcripcion or arl_gerencia.motores_transcripcion.MOTOR_POR_DEFECTO)
 
         self.title("EVARISIS - Gestor Actas de Reuniones de Gerencia")
         self.state('zoomed')
         
         # --- Carga de recursos ---
+        self.miniaturas = miniaturas.CacheMiniaturas()
+        # Las fotos de los participantes llegan desde el pool de miniaturas por esta cola.
+        self._cola_fotos, self._fotos_pendientes = queue.SimpleQueue(), 0
         self.foto_usuario = self._cargar_foto_path(foto_path)
         self.iconos = self._cargar_iconos()
         self._set_app_icon()
@@ -48,8 +63,11 @@ class AsistenteGerenciaApp(ttk.Window):
         # --- Variables de estado ---
         self.active_panel, self.acta_word, self.current_speaker = None, None, None
         self.is_recording = False
-        self.reunion_participantes, self.grabacion_frames, self.participant_buttons = [], [], {}
-        self.stop_event = None
+        self.reunion_participantes, self.participant_buttons = [], {}
+        # Un único flujo de micrófono por reunión; cada clic solo marca un corte en él.
+        self.captura, self.ruta_grabacion_actual = None, None
+        # Todo el trabajo bloqueante (red, disco, transcripción, IA) pasa por aquí, fuera del hilo de Tk.
+        self.tareas = tareas_ui.EjecutorTareas(self)
 
         # --- Construcción de la UI ---
         self._crear_header()
@@ -59,18 +77,68 @@ class AsistenteGerenciaApp(ttk.Window):
         self.panel_reunion_gerencia = self._crear_panel_reunion_gerencia(self.content_container)
 
         self._switch_panel(self.panel_setup_gerencia)
+        self.after_idle(self._al_mostrar_ventana)
+
+    def _al_mostrar_ventana(self):
+        # El cliente de IA (desencriptar config.dat + importar huggingface_hub) se
+        # prepara en segundo plano una vez la ventana ya es visible.
+        logging.info(f"Ventana principal visible {time.perf_counter() - _T_ARRANQUE:.2f} s después del inicio del proceso.")
+        huggingface.precalentar_cliente()
+        self.tareas.ejecutar(self._buscar_grabaciones_interrumpidas, al_terminar=self._ofrecer_recuperar_grabaciones, nombre="buscar_grabaciones")
+
+    def _buscar_grabaciones_interrumpidas(self, tarea):
+        # Una reunión que se cerró sin guardar deja sus intervenciones en la carpeta de grabaciones en curso.
+        recuperables = []
+        for carpeta in arl_gerencia.grabaciones_interrumpidas():
+            titulo = f"Acta Reunión Gerencia - {time.strftime('%d-%m-%Y', arl_gerencia.fecha_grabacion(carpeta))}"
+            try:
+                acta = arl_gerencia.ActaWord.recuperar_grabacion(carpeta, titulo, ruta_datos=self.ruta_datos_central)
+            except Exception as e:
+                logging.error(f"No se pudo recuperar la grabación de {carpeta}: {e}")
+                continue
+            if acta.cola_de_grabaciones: recuperables.append(acta)
+            else: arl_gerencia.descartar_grabacion(carpeta)  # No llegó a grabarse ninguna intervención
+        return recuperables
+
+    def _ofrecer_recuperar_grabaciones(self, actas):
+        for acta in actas:
+            fecha = time.strftime('%d/%m/%Y a las %H:%M', arl_gerencia.fecha_grabacion(acta.carpeta_grabacion))
+            respuesta = messagebox.askyesnocancel(
+                "Reunión sin Guardar",
+                f"Se encontró una reunión del {fecha} que no llegó a guardarse ({len(acta.cola_de_grabaciones)} intervenciones).\n\n"
+                "¿Desea guardarla y transcribirla ahora?\n\n"
+                "Sí: guardarla ahora.  No: descartar sus audios.  Cancelar: preguntar en el próximo inicio.",
+                parent=self, icon='question'
+            )
+            if respuesta is None: continue
+            if not respuesta:
+                arl_gerencia.descartar_grabacion(acta.carpeta_grabacion); continue
+            self.acta_word, self.reunion_participantes = acta, acta.participantes
+            self._advertir_y_procesar()
+            return
 
     def _cargar_iconos(self):
-        try:
-            return {"back": ImageTk.PhotoImage(Image.open(get_path("imagenes/back.jpeg")).resize((24, 24), Image.Resampling.LANCZOS))}
-        except Exception as e: logging.warning(f"No se pudo cargar icono 'back': {e}"); return {"back": None}
+        imagen = self.miniaturas.obtener(get_path("imagenes/back.jpeg"), TAMANO_ICONO)
+        if imagen is None: logging.warning("No se pudo cargar icono 'back'.")
+        return {"back": ImageTk.PhotoImage(imagen) if imagen else None}
         
     def _cargar_foto_path(self, foto_path):
-        if foto_path and foto_path != "SIN_FOTO" and os.path.exists(foto_path):
-            try: return ImageTk.PhotoImage(Image.open(foto_path).resize((80, 80), Image.Resampling.LANCZOS))
-            except Exception as e: logging.error(f"Error al cargar foto: {e}")
+        if foto_path and foto_path != "SIN_FOTO":
+            imagen = self.miniaturas.obtener(foto_path, TAMANO_FOTO_USUARIO)
+            if imagen: return ImageTk.PhotoImage(imagen)
         return None
 
+    def _rellenar_fotos_participantes(self):
+        # Los PhotoImage solo pueden crearse en el hilo de Tk: el pool entrega la miniatura ya reducida y aquí se coloca.
+        while True:
+            try: btn, imagen = self._cola_fotos.get_nowait()
+            except queue.Empty: break
+            self._fotos_pendientes -= 1
+            if not btn.winfo_exists(): continue  # La reunión se cerró antes de que llegara la foto
+            foto = ImageTk.PhotoImage(imagen) if imagen else None
+            btn.config(image=foto or "", text="" if foto else "Sin Foto"); btn.image = foto
+        if self._fotos_pendientes > 0: self.after(50, self._rellenar_fotos_participantes)
+
     def _set_app_icon(self):
         try:
             # 1. Asume que el nombre de tu icono es "GestorActasGerencia.ico" (o el que sea).
@@ -110,47 +178,90 @@ class AsistenteGerenciaApp(ttk.Window):
         lf = ttk.Labelframe(panel, text="Seleccione los participantes (Ctrl+Click para varios)", bootstyle=INFO, padding=10)
         lf.pack(fill=BOTH, expand=TRUE, pady=5)
         
+        self.directorio = integrantes.directorio(self.ruta_datos_central)
+        # La selección se guarda por nombre para que sobreviva a los cambios de filtro.
+        self._seleccion_integrantes, self._integrantes_visibles, self._filtro_pendiente = set(), [], None
+        self.var_filtro_integrantes = tk.StringVar()
+        filtro_frame = ttk.Frame(lf); filtro_frame.pack(fill=X, pady=(0, 5))
+        ttk.Label(filtro_frame, text="Buscar:", font=self.FONT_NORMAL).pack(side=LEFT, padx=(0, 10))
+        ttk.Entry(filtro_frame, textvariable=self.var_filtro_integrantes, font=self.FONT_NORMAL).pack(side=LEFT, fill=X, expand=TRUE)
+        self.var_filtro_integrantes.trace_add("write", lambda *_: self._programar_filtro_integrantes())
+
         list_frame = ttk.Frame(lf); list_frame.pack(fill=BOTH, expand=TRUE)
-        self.listbox_integrantes_gerencia = Listbox(list_frame, selectmode=tk.MULTIPLE, relief=FLAT, highlightthickness=0, font=self.FONT_NORMAL)
-        
-        todos_integrantes = arl_gerencia.get_todos_los_integrantes(self.ruta_datos_central)
-        for nombre, area in todos_integrantes:
-            if nombre != arl_gerencia.JEFE and nombre != self.current_user["nombre"]:
-                self.listbox_integrantes_gerencia.insert(tk.END, f"{nombre}  ({area})")
+        self.listbox_integrantes_gerencia = Listbox(list_frame, selectmode=tk.MULTIPLE, relief=FLAT, highlightthickness=0, font=self.FONT_NORMAL, exportselection=False)
+        self.listbox_integrantes_gerencia.bind("<<ListboxSelect>>", self._on_seleccion_integrantes)
+        self._mostrar_integrantes()
         
         scrollbar = ttk.Scrollbar(list_frame, orient=VERTICAL, command=self.listbox_integrantes_gerencia.yview, bootstyle="info-round")
         self.listbox_integrantes_gerencia.config(yscrollcommand=scrollbar.set); scrollbar.pack(side=RIGHT, fill=Y)
         self.listbox_integrantes_gerencia.pack(side=LEFT, fill=BOTH, expand=TRUE)
         
+        motor_frame = ttk.Frame(panel); motor_frame.pack(pady=(10, 0))
+        ttk.Label(motor_frame, text="Motor de transcripción:", font=self.FONT_NORMAL).pack(side=LEFT, padx=(0, 10))
+        ttk.Combobox(motor_frame, textvariable=self.var_motor, values=list(arl_gerencia.motores_transcripcion.MOTORES), state="readonly", width=12).pack(side=LEFT)
+        
         btn_confirmar = ttk.Button(panel, text="Confirmar Participantes y Empezar Reunión", bootstyle=SUCCESS, command=self._confirmar_participantes_gerencia)
         btn_confirmar.pack(pady=10)
         return panel
+
+    def _programar_filtro_integrantes(self):
+        # Se filtra cuando se deja de teclear un momento, no en cada pulsación.
+        if self._filtro_pendiente: self.after_cancel(self._filtro_pendiente)
+        self._filtro_pendiente = self.after(150, self._mostrar_integrantes)
+
+    def _mostrar_integrantes(self):
+        self._filtro_pendiente = None
+        excluidos = {self.directorio.jefe, self.current_user["nombre"]}
+        self._integrantes_visibles = [(n, a) for n, a in self.directorio.buscar(self.var_filtro_integrantes.get()) if n not in excluidos]
+        self.listbox_integrantes_gerencia.delete(0, tk.END)
+        for i, (nombre, area) in enumerate(self._integrantes_visibles):
+            self.listbox_integrantes_gerencia.insert(tk.END, f"{nombre}  ({area})")
+            if nombre in self._seleccion_integrantes: self.listbox_integrantes_gerencia.selection_set(i)
+
+    def _on_seleccion_integrantes(self, event=None):
+        visibles = {nombre for nombre, _ in self._integrantes_visibles}
+        marcados = {self._integrantes_visibles[i][0] for i in self.listbox_integrantes_gerencia.curselection()}
+        self._seleccion_integrantes = (self._seleccion_integrantes - visibles) | marcados
+
+    def _motor_requiere_red(self):
+        return arl_gerencia.motores_transcripcion.MOTORES[self.var_motor.get()].requiere_red
     
     def _confirmar_participantes_gerencia(self):
-        indices = self.listbox_integrantes_gerencia.curselection()
-        participantes_elegidos = [self.listbox_integrantes_gerencia.get(i).split('  (')[0] for i in indices]
-        participantes_set = {self.current_user["nombre"], arl_gerencia.JEFE, *participantes_elegidos}
+        participantes_set = {self.current_user["nombre"], self.directorio.jefe, *self._seleccion_integrantes}
         self.reunion_participantes = sorted(list(participantes_set))
         
         for widget in self.panel_caras_gerencia.winfo_children(): widget.destroy()
         self.participant_buttons.clear()
         
         cols = min(4, len(self.reunion_participantes) + 1) or 1
+        sondeo_en_marcha = self._fotos_pendientes > 0  # Fotos de una reunión anterior que aún no habían llegado
         
         for i, nombre in enumerate(self.reunion_participantes):
             row, col = divmod(i, cols)
             frame_persona = ttk.Labelframe(self.panel_caras_gerencia, text=nombre, bootstyle=PRIMARY, padding=5); frame_persona.grid(row=row, column=col, padx=10, pady=10, sticky="nsew")
             ruta_foto = os.path.join(self.ruta_datos_central, 'base_de_usuarios', f"{nombre}.jpeg")
-            foto = ImageTk.PhotoImage(Image.open(ruta_foto).resize((90, 90), Image.Resampling.LANCZOS)) if os.path.exists(ruta_foto) else None
-            btn = ttk.Button(frame_persona, image=foto, text="" if foto else "Sin Foto", bootstyle=OUTLINE, command=lambda n=nombre: self._on_participant_click(n)); btn.image = foto; btn.pack(fill=BOTH, expand=TRUE); self.participant_buttons[nombre] = btn
+            btn = ttk.Button(frame_persona, text="Cargando...", bootstyle=OUTLINE, command=lambda n=nombre: self._on_participant_click(n)); btn.image = None; btn.pack(fill=BOTH, expand=TRUE); self.participant_buttons[nombre] = btn
+            self._fotos_pendientes += 1
+            self.miniaturas.cargar_en_segundo_plano(ruta_foto, TAMANO_FOTO_PARTICIPANTE, lambda imagen, b=btn: self._cola_fotos.put((b, imagen)))
 
         row, col = divmod(len(self.reunion_participantes), cols)
         frame_publico = ttk.Labelframe(self.panel_caras_gerencia, text="Público / Invitado", bootstyle=INFO, padding=5); frame_publico.grid(row=row, column=col, padx=10, pady=10, sticky="nsew")
         self.btn_publico = ttk.Button(frame_publico, text="🎤", bootstyle=OUTLINE, command=self._on_publico_click); self.btn_publico.pack(fill=BOTH, expand=TRUE)
         
         for i in range(cols): self.panel_caras_gerencia.columnconfigure(i, weight=1)
+        if not sondeo_en_marcha: self._rellenar_fotos_participantes()
         
-        self.acta_word = arl_gerencia.ActaWord(f"Acta Reunión Gerencia - {time.strftime('%d-%m-%Y')}", self.reunion_participantes)
+        self.acta_word = arl_gerencia.ActaWord(f"Acta Reunión Gerencia - {time.strftime('%d-%m-%Y')}", self.reunion_participantes,
+                                               carpeta_grabacion=arl_gerencia.crear_carpeta_grabacion(), ruta_datos=self.ruta_datos_central)
+        # Cada intervención empieza a transcribirse en cuanto termina; al cerrar la reunión solo quedan las últimas.
+        self.acta_word.iniciar_transcripcion_en_vivo(self.var_motor.get())
+        self.captura = arl_gerencia.crear_servicio_captura()
+        try:
+            self.captura.iniciar()
+        except Exception as e:
+            logging.error(f"No se pudo abrir el micrófono: {e}")
+            messagebox.showerror("Micrófono no disponible", f"No se pudo abrir el micrófono:\n{e}", parent=self)
+            self.captura = None
         self._switch_panel(self.panel_reunion_gerencia)
     
     def _crear_panel_reunion_gerencia(self, parent):
@@ -167,9 +278,10 @@ class AsistenteGerenciaApp(ttk.Window):
         self.after(200, self._iniciar_grabacion_y_pedir_nombre_publico)
 
     def _iniciar_grabacion_y_pedir_nombre_publico(self):
-        self.current_speaker, self.is_recording, self.stop_event, self.grabacion_frames = "Grabando Invitado...", True, threading.Event(), []
+        self.current_speaker, self.is_recording = "Grabando Invitado...", True
         self.btn_publico.config(bootstyle=DANGER); self.lbl_estado_reunion_gerencia.config(text="🔴 Grabando a (Público)... Ingrese nombre.", bootstyle=DANGER)
-        threading.Thread(target=arl_gerencia.hilo_grabacion_manual, args=(self.stop_event, self.grabacion_frames), daemon=True).start()
+        if not self._lanzar_hilo_grabacion(self.current_speaker):
+            self._deshacer_inicio_grabacion(self.btn_publico); return
         nombre_invitado = simpledialog.askstring("Nombre del Interviniente", "Grabación iniciada. Ingrese el nombre:", parent=self)
         if self.is_recording and self.current_speaker == "Grabando Invitado...":
             self.current_speaker = f"{nombre_invitado.strip()} (Público)" if nombre_invitado and nombre_invitado.strip() else "Invitado Anónimo (Público)"
@@ -182,28 +294,53 @@ class AsistenteGerenciaApp(ttk.Window):
             if hablante_anterior == nombre_hablante: return
         self.after(150, lambda: self._iniciar_grabacion_para(nombre_hablante))
 
+    def _lanzar_hilo_grabacion(self, hablante):
+        # La intervención se escribe directamente en su .wav mientras se graba;
+        # el micrófono ya está abierto, solo se marca dónde empieza.
+        if not self.captura or not self.captura.activo:
+            self.captura = arl_gerencia.crear_servicio_captura()
+            try:
+                self.captura.iniciar()
+            except Exception as e:
+                logging.error(f"No se pudo abrir el micrófono: {e}")
+                messagebox.showerror("Micrófono no disponible", f"No se pudo abrir el micrófono:\n{e}", parent=self)
+                self.captura = None
+                return False
+        self.ruta_grabacion_actual = self.acta_word.nueva_ruta_grabacion(hablante)
+        self.captura.iniciar_segmento(self.ruta_grabacion_actual)
+        return True
+
     def _guardar_grabacion_actual(self):
         if not self.is_recording: return
-        self.stop_event.set()
-        hablante_anterior, audio_a_guardar = self.current_speaker, self.grabacion_frames
-        self.is_recording, self.current_speaker, self.grabacion_frames = False, None, []
+        segmento = self.captura.terminar_segmento() if self.captura else None  # Espera a que se cierre el .wav
+        hablante_anterior, audio_a_guardar = self.current_speaker, self.ruta_grabacion_actual
+        self.is_recording, self.current_speaker, self.ruta_grabacion_actual = False, None, None
         
         if hablante_anterior in self.participant_buttons: self.participant_buttons[hablante_anterior].config(bootstyle=OUTLINE)
         elif "Público" in hablante_anterior or "Invitado" in hablante_anterior: self.btn_publico.config(bootstyle=OUTLINE)
         self.lbl_estado_reunion_gerencia.config(text=f"✅ Intervención de {hablante_anterior} grabada localmente.")
 
         if self.acta_word and audio_a_guardar:
-            self.acta_word.agregar_grabacion(hablante_anterior, b''.join(audio_a_guardar))
+            self.acta_word.agregar_grabacion(hablante_anterior, audio_a_guardar, segmento)
 
     def _iniciar_grabacion_para(self, nombre_hablante):
         if self.is_recording: return
-        self.current_speaker, self.is_recording, self.stop_event, self.grabacion_frames = nombre_hablante, True, threading.Event(), []
+        self.current_speaker, self.is_recording = nombre_hablante, True
         if nombre_hablante in self.participant_buttons: self.participant_buttons[nombre_hablante].config(bootstyle=DANGER)
         self.lbl_estado_reunion_gerencia.config(text=f"🔴 Grabando a {nombre_hablante}...", bootstyle=DANGER)
-        threading.Thread(target=arl_gerencia.hilo_grabacion_manual, args=(self.stop_event, self.grabacion_frames), daemon=True).start()
+        if not self._lanzar_hilo_grabacion(nombre_hablante):
+            self._deshacer_inicio_grabacion(self.participant_buttons.get(nombre_hablante))
+
+    def _deshacer_inicio_grabacion(self, boton):
+        # El micrófono no se pudo abrir: no hay intervención en curso.
+        self.is_recording, self.current_speaker, self.ruta_grabacion_actual = False, None, None
+        if boton: boton.config(bootstyle=OUTLINE)
+        self.lbl_estado_reunion_gerencia.config(text="Micrófono no disponible. Haga clic en un participante para reintentar.", bootstyle=WARNING)
 
     def _terminar_reunion(self):
+        if self.tareas.ocupado: return  # Ya se está comprobando la red o procesando la reunión
         if self.is_recording: self._guardar_grabacion_actual()
+        self._liberar_microfono()
         self.after(200, self._advertir_y_procesar)
 
     def _advertir_y_procesar(self):
@@ -213,7 +350,16 @@ class AsistenteGerenciaApp(ttk.Window):
                 return
         
         # Realizar la comprobación de internet justo antes de preguntar al usuario
-        if not self._hay_conexion_internet():
+        # (los motores locales transcriben sin conexión). Puede tardar unos segundos,
+        # así que se hace en el pool de tareas y la respuesta llega por `al_terminar`.
+        if self._motor_requiere_red():
+            self.lbl_estado_reunion_gerencia.config(text="Comprobando la conexión a internet...")
+            self.tareas.ejecutar(lambda tarea: self._hay_conexion_internet(), al_terminar=self._confirmar_finalizacion, nombre="comprobar_red")
+        else:
+            self._confirmar_finalizacion(True)
+
+    def _confirmar_finalizacion(self, hay_conexion):
+        if not hay_conexion:
             messagebox.showerror(
                 "Sin Conexión a Internet",
                 "No se ha podido detectar una conexión a internet activa.\n\n"
@@ -229,132 +375,175 @@ class AsistenteGerenciaApp(ttk.Window):
         nombre_reunion = simpledialog.askstring("Guardar Acta", "Introduce un nombre para la reunión:", parent=self)
         if not nombre_reunion or not nombre_reunion.strip(): return
         
-        try:
-            docs_path = os.path.join(os.path.expanduser('~'), 'Documents'); evarisis_path = os.path.join(docs_path, 'evarisis')
-            ruta_carpeta_reunion = os.path.join(evarisis_path, nombre_reunion.strip())
-            ruta_proyecto_json = os.path.join(ruta_carpeta_reunion, "proyecto_reunion.json")
-            if os.path.exists(ruta_proyecto_json):
-                if not messagebox.askyesno("Reanudar Proceso", "Ya existe una reunión con este nombre.\n¿Desea reanudar la transcripción?", icon='question'): return
-            else:
-                if not self.acta_word:
-                    messagebox.showerror("Error de Estado", "No hay una reunión activa para guardar. Si desea reanudar una reunión anterior, ingrese su nombre exacto.", parent=self)
-                    return
-                ruta_proyecto_json, err = self.acta_word.guardar_proyecto_para_transcribir(ruta_carpeta_reunion)
-                if err: messagebox.showerror("Error Crítico", f"No se pudieron guardar los audios: {err}", parent=self); return
-                messagebox.showinfo("Audios Guardados", "Audios guardados. Iniciando transcripción.", parent=self)
-        except Exception as e: messagebox.showerror("Error de Ruta", f"Error al crear carpeta: {e}", parent=self); return
+        ruta_carpeta_reunion = os.path.join(arl_gerencia.RUTA_EVARISIS, nombre_reunion.strip())
+        ruta_proyecto_json = os.path.join(ruta_carpeta_reunion, "proyecto_reunion.json")
+        acta_a_guardar = None
+        if os.path.exists(ruta_proyecto_json):
+            if not messagebox.askyesno("Reanudar Proceso", "Ya existe una reunión con este nombre.\n¿Desea reanudar la transcripción?", icon='question'): return
+        elif not self.acta_word:
+            messagebox.showerror("Error de Estado", "No hay una reunión activa para guardar. Si desea reanudar una reunión anterior, ingrese su nombre exacto.", parent=self)
+            return
+        else:
+            acta_a_guardar = self.acta_word
         
         dialogo_progreso, lbl_estado, progress_bar = self._mostrar_ventana_progreso()
+        # Se llama desde los hilos de trabajo: solo encola la actualización para el hilo de Tk.
+        def update_progress(value, text, vista_previa=None): self.tareas.en_hilo_principal(self._actualizar_progreso_en_hilo_principal, dialogo_progreso, progress_bar, lbl_estado, value, text, vista_previa)
+        motor_elegido = self.var_motor.get()
         
-        def update_progress(value, text): self.after(0, lambda: self._actualizar_progreso_en_hilo_principal(dialogo_progreso, progress_bar, lbl_estado, value, text))
-        
-        def HiloDeTrabajo():
-            stop_event = threading.Event()
-            
-            def HiloMonitor():
-                while not stop_event.is_set():
-                    if not self._hay_conexion_internet():
-                        logging.error("¡Pérdida de conexión detectada durante el procesamiento!")
-                        stop_event.set()
-                        break
-                    time.sleep(10)
-
-            monitor = threading.Thread(target=HiloMonitor, daemon=True)
-            monitor.start()
-
-            # Se crea una instancia del procesador lógico.
-            logic_processor = arl_gerencia.ActaWord("", []) 
+        def HiloDeTrabajo(tarea):
+            # Ya no hay sondeo periódico de la red: si el reconocedor o la IA dejan de
+            # responder, sus reintentos y su circuito (resiliencia.py) pausan el trabajo.
+            # `tarea.evento_cancelar` es el stop_event de la transcripción (botón Cancelar).
+            ruta_json = ruta_proyecto_json
+
+            # --- ETAPA 0: Guardado de los audios (reunión recién grabada) ---
+            # No se interrumpe a medias aunque se cancele: los audios se están moviendo a su carpeta definitiva.
+            if acta_a_guardar:
+                update_progress(0, "Guardando los audios de la reunión...")
+                ruta_json, err = acta_a_guardar.guardar_proyecto_para_transcribir(ruta_carpeta_reunion, update_progress)
+                if err: return {"etapa": "guardado", "mensaje": err}
+                if tarea.cancelada: return {"etapa": "cancelado"}
+                self.tareas.preguntar(messagebox.showinfo, "Audios Guardados", "Audios guardados. Iniciando transcripción.", parent=self)
+
+            # Si la reunión se acaba de grabar se usa su propia acta, que conoce las
+            # transcripciones en vivo aún en curso; al reanudar otra reunión se crea una
+            # nueva, aunque haya una reunión activa (esa sigue intacta).
+            logic_processor = acta_a_guardar or arl_gerencia.ActaWord("", [], ruta_datos=self.ruta_datos_central)
             
             # --- ETAPA 1: Transcripción del Acta Literal ---
             update_progress(0, "Iniciando transcripción del acta literal...")
             
             exito_literal, msg_literal, ruta_acta_literal = logic_processor.transcribir_desde_proyecto(
-                ruta_proyecto_json, 
+                ruta_json, 
                 update_progress,
-                stop_event
+                tarea.evento_cancelar,
+                motor=motor_elegido,
+                renderizar_literal=False
             )
             
-            # Si la transcripción literal falla, detenemos todo el proceso.
+            # Si la transcripción literal falla (o se canceló), detenemos todo el proceso.
             if not exito_literal:
-                if not stop_event.is_set(): stop_event.set()
-                self.after(0, lambda: dialogo_progreso.destroy())
-                
-                mensaje_guia = (
-                    "El progreso ha sido guardado.\n\n"
-                    "Por favor, revise el problema (ej. su conexión a internet) "
-                    "y haga clic en 'Terminar Reunión y Generar Acta' de nuevo para reintentar."
-                )
-                messagebox.showerror("Error de Transcripción", f"{msg_literal}\n\n{mensaje_guia}", parent=self)
-                return # Termina el hilo de trabajo aquí.
+                return {"etapa": "cancelado" if tarea.cancelada else "transcripcion", "mensaje": msg_literal}
 
             # --- ETAPA 2: Generación del Acta Inteligente ---
-            # Si la primera etapa fue exitosa, procedemos con la segunda.
-            update_progress(0, "Acta literal creada. Iniciando resumen con IA...")
-            time.sleep(2) # Pausa para que el usuario pueda leer el mensaje de estado.
+            # Si la primera etapa fue exitosa, procedemos con la segunda. El acta
+            # literal (.docx) se escribe en paralelo: la IA toma el texto del proyecto.
+            update_progress(0, "Transcripción completada. Iniciando resumen con IA...")
+            error_literal = []
+            def HiloActaLiteral():
+                try: arl_gerencia.renderizar_acta_literal(arl_gerencia.cargar_proyecto(ruta_json), ruta_acta_literal)
+                except Exception as e: logging.error(f"No se pudo escribir el acta literal: {e}"); error_literal.append(e)
+            hilo_literal = threading.Thread(target=HiloActaLiteral, daemon=True)
+            hilo_literal.start()
 
             exito_inteligente, msg_inteligente = logic_processor.generar_acta_inteligente(
-                ruta_acta_literal,
-                update_progress
+                ruta_json,
+                update_progress,
+                stop_event=tarea.evento_cancelar
             )
-            
-            # --- FINALIZACIÓN Y MENSAJES AL USUARIO ---
-            if not stop_event.is_set():
-                stop_event.set()
-            
-            self.after(0, lambda: dialogo_progreso.destroy())
-        
-            if exito_inteligente:
-                # Caso de éxito total: ambas actas se generaron.
-                mensaje_final = f"{msg_literal}\n\n{msg_inteligente}"
-                if messagebox.askyesno("Éxito Total", f"{mensaje_final}\n\n¿Desea abrir la carpeta de la reunión?", parent=self):
-                    try:
-                        os.startfile(ruta_carpeta_reunion)
-                    except Exception as e:
-                        messagebox.showinfo("Info", f"No se pudo abrir la carpeta: {ruta_carpeta_reunion}\nError: {e}", parent=self)
-                self.after(0, self._resetear_paneles_reunion)
+            hilo_literal.join()
+            if error_literal:
+                msg_literal = f"Transcripción guardada, pero no se pudo escribir el acta literal (.docx): {error_literal[0]}"
+            if tarea.cancelada and not exito_inteligente:
+                return {"etapa": "cancelado", "msg_literal": msg_literal}
+            return {"etapa": "final", "exito_inteligente": exito_inteligente, "msg_literal": msg_literal, "msg_inteligente": msg_inteligente}
+
+        def al_fallar(error):
+            if dialogo_progreso.winfo_exists(): dialogo_progreso.destroy()
+            messagebox.showerror("Error Inesperado", f"El proceso se detuvo por un error inesperado: {error}\n\nEl progreso guardado se puede reanudar.", parent=self)
+
+        tarea = self.tareas.ejecutar(HiloDeTrabajo, al_terminar=lambda r: self._mostrar_resultado_proceso(r, dialogo_progreso, ruta_carpeta_reunion, acta_a_guardar),
+                                     al_fallar=al_fallar, nombre="procesar_reunion")
+        dialogo_progreso.btn_cancelar.config(command=lambda: self._cancelar_proceso(tarea, dialogo_progreso, lbl_estado))
+
+    def _cancelar_proceso(self, tarea, dialogo, lbl_estado):
+        tarea.cancelar()
+        dialogo.btn_cancelar.config(state=DISABLED)
+        lbl_estado.config(text="Cancelando... (se termina lo que está en curso y se guarda el progreso)")
+
+    def _mostrar_resultado_proceso(self, resultado, dialogo_progreso, ruta_carpeta_reunion, acta_guardada=None):
+        # --- FINALIZACIÓN Y MENSAJES AL USUARIO (en el hilo de Tk) ---
+        if dialogo_progreso.winfo_exists(): dialogo_progreso.destroy()
+        etapa = resultado["etapa"]
+        if etapa == "guardado":
+            messagebox.showerror("Error Crítico", f"No se pudieron guardar los audios: {resultado['mensaje']}", parent=self)
+            return
+        if etapa in ("cancelado", "transcripcion"):
+            mensaje_guia = (
+                "El progreso ha sido guardado.\n\n"
+                "Por favor, revise el problema (ej. su conexión a internet) "
+                "y haga clic en 'Terminar Reunión y Generar Acta' de nuevo para reintentar."
+            )
+            if etapa == "cancelado" and resultado.get("msg_literal"):
+                # Se canceló mientras la IA redactaba: la transcripción ya está completa.
+                messagebox.showinfo("Proceso Cancelado", f"Se canceló la redacción del acta oficial.\n\n{resultado['msg_literal']}\n\nPuede generarla más tarde con 'Terminar Reunión y Generar Acta'.", parent=self)
+            elif etapa == "cancelado":
+                messagebox.showinfo("Proceso Cancelado", "Proceso cancelado. El progreso ha sido guardado; puede reanudarlo con 'Terminar Reunión y Generar Acta'.", parent=self)
             else:
-                # Caso de éxito parcial: el acta literal se creó, pero el resumen con IA falló.
-                mensaje_final = f"¡Proceso parcialmente exitoso!\n\n- {msg_literal}\n- Error en resumen IA: {msg_inteligente}"
-                if messagebox.askyesno("Éxito Parcial", f"{mensaje_final}\n\n¿Desea abrir la carpeta para ver el acta literal?", parent=self):
-                    try:
-                        os.startfile(ruta_carpeta_reunion)
-                    except Exception as e:
-                        messagebox.showinfo("Info", f"No se pudo abrir la carpeta: {ruta_carpeta_reunion}\nError: {e}", parent=self)
-                self.after(0, self._resetear_paneles_reunion)
-
-        # La línea que inicia el hilo no cambia.
-        threading.Thread(target=HiloDeTrabajo, daemon=True).start()
-
+                messagebox.showerror("Error de Transcripción", f"{resultado['mensaje']}\n\n{mensaje_guia}", parent=self)
+            return
+
+        msg_literal, msg_inteligente = resultado["msg_literal"], resultado["msg_inteligente"]
+        if resultado["exito_inteligente"]:
+            # Caso de éxito total: ambas actas se generaron.
+            titulo, pregunta = "Éxito Total", f"{msg_literal}\n\n{msg_inteligente}\n\n¿Desea abrir la carpeta de la reunión?"
+        else:
+            # Caso de éxito parcial: el acta literal se creó, pero el resumen con IA falló.
+            titulo = "Éxito Parcial"
+            pregunta = f"¡Proceso parcialmente exitoso!\n\n- {msg_literal}\n- Error en resumen IA: {msg_inteligente}\n\n¿Desea abrir la carpeta para ver el acta literal?"
+        if messagebox.askyesno(titulo, pregunta, parent=self):
+            try:
+                os.startfile(ruta_carpeta_reunion)
+            except Exception as e:
+                messagebox.showinfo("Info", f"No se pudo abrir la carpeta: {ruta_carpeta_reunion}\nError: {e}", parent=self)
+        # Si se reanudó otra reunión mientras había una activa con grabaciones, esta se conserva.
+        reunion_activa = self.acta_word and self.acta_word.cola_de_grabaciones and self.acta_word is not acta_guardada
+        if not reunion_activa: self._resetear_paneles_reunion()
 
     def _mostrar_ventana_progreso(self):
-        dialogo = tk.Toplevel(self); dialogo.title("Procesando..."); dialogo.geometry("450x150"); dialogo.transient(self); dialogo.grab_set(); dialogo.resizable(False, False)
-        x, y = self.winfo_x()+(self.winfo_width()/2)-225, self.winfo_y()+(self.winfo_height()/2)-75; dialogo.geometry(f"+{int(x)}+{int(y)}")
+        dialogo = tk.Toplevel(self); dialogo.title("Procesando..."); dialogo.geometry("600x190"); dialogo.transient(self); dialogo.grab_set(); dialogo.resizable(False, False)
+        x, y = self.winfo_x()+(self.winfo_width()/2)-300, self.winfo_y()+(self.winfo_height()/2)-95; dialogo.geometry(f"+{int(x)}+{int(y)}")
         container = ttk.Frame(dialogo, padding=20); container.pack(fill=BOTH, expand=TRUE)
         lbl_estado = ttk.Label(container, text="Iniciando...", font=self.FONT_NORMAL); lbl_estado.pack(pady=(0, 10))
-        progress_bar = ttk.Progressbar(container, mode='determinate', length=400); progress_bar.pack(pady=10)
+        progress_bar = ttk.Progressbar(container, mode='determinate', length=550); progress_bar.pack(pady=10)
+        dialogo.btn_cancelar = ttk.Button(container, text="Cancelar", bootstyle="danger-outline"); dialogo.btn_cancelar.pack(side=BOTTOM, pady=(5, 0))
+        dialogo.protocol("WM_DELETE_WINDOW", lambda: None)  # Se cierra al terminar la tarea; para detenerla está "Cancelar"
+        # Vista previa del acta mientras la IA la redacta; se muestra al llegar el primer texto.
+        dialogo.vista_previa = tk.Text(container, height=14, wrap=WORD, font=("Segoe UI", 9), state=DISABLED, relief=FLAT)
         return dialogo, lbl_estado, progress_bar
         
-    def _actualizar_progreso_en_hilo_principal(self, dialogo, progress_bar, lbl_estado, value, text):
+    def _actualizar_progreso_en_hilo_principal(self, dialogo, progress_bar, lbl_estado, value, text, vista_previa=None):
         if dialogo.winfo_exists():
             progress_bar['value'] = value * 100
             lbl_estado.config(text=text)
+            if vista_previa is not None:
+                txt = dialogo.vista_previa
+                if not txt.winfo_ismapped():
+                    dialogo.geometry("600x460"); txt.pack(fill=BOTH, expand=TRUE, pady=(10, 0))
+                txt.config(state=NORMAL); txt.delete("1.0", END); txt.insert(END, vista_previa); txt.see(END); txt.config(state=DISABLED)
     
     def _resetear_paneles_reunion(self):
         for widget in self.panel_caras_gerencia.winfo_children(): widget.destroy()
         self.participant_buttons.clear()
         self.listbox_integrantes_gerencia.selection_clear(0, tk.END)
+        self._seleccion_integrantes.clear(); self.var_filtro_integrantes.set("")
         # Limpiamos el objeto de acta para la nueva reunión
+        self._liberar_microfono()
+        if self.acta_word:
+            self.acta_word.finalizar_transcripcion_en_vivo(timeout=0)
+            self.acta_word.descartar_carpeta_grabacion()
         self.acta_word = None
         self.reunion_participantes = []
         self._switch_panel(self.panel_setup_gerencia)
 
-    def _hay_conexion_internet(self, host="8.8.8.8", port=53, timeout=3):
-        try:
-            socket.setdefaulttimeout(timeout)
-            socket.socket(socket.AF_INET, socket.SOCK_STREAM).connect((host, port))
-            return True
-        except socket.error:
-            return False
+    def _liberar_microfono(self):
+        if self.captura:
+            self.captura.detener()
+            self.captura = None
+
+    def _hay_conexion_internet(self):
+        return resiliencia.hay_conexion()
 
 if __name__ == "__main__":
     logger.setup_global_logger()
@@ -366,8 +555,9 @@ if __name__ == "__main__":
     parser.add_argument("--foto", default="SIN_FOTO", help="Ruta a la foto del usuario.")
     parser.add_argument("--tema", default="superhero", help="Tema de ttkbootstrap.")
     parser.add_argument("--ruta-datos", required=True, help="Ruta a la carpeta de datos central de EVARISIS.")
+    parser.add_argument("--motor", default=arl_gerencia.motores_transcripcion.MOTOR_POR_DEFECTO, choices=list(arl_gerencia.motores_transcripcion.MOTORES), help="Motor de transcripción inicial.")
 
     args = parser.parse_args()
 
-    app = AsistenteGerenciaApp(theme=args.tema, nombre_usuario=args.nombre, cargo_usuario=args.cargo, foto_path=args.foto, ruta_datos=args.ruta_datos)
+    app = AsistenteGerenciaApp(theme=args.tema, nombre_usuario=args.nombre, cargo_usuario=args.cargo, foto_path=args.foto, ruta_datos=args.ruta_datos, motor_transcripcion=args.motor)
     app.mainloop()
\ No newline at end of file
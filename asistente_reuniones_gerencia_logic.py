@@ -1,265 +1,1029 @@
 # asistente_reuniones_gerencia_logic.py (VERSIÓN FINAL Y ROBUSTA)
 
 import pyaudio
-import wave
 import os
 import threading
-import speech_recognition as sr
-from docx import Document
+import motores_transcripcion
+from motores_transcripcion import AudioNoReconocido, ErrorMotorTranscripcion
 import time
 import json
-from concurrent.futures import ThreadPoolExecutor, TimeoutError
+import re
+import logging
+import shutil
+import queue
+import contextlib
+from concurrent.futures import ThreadPoolExecutor, TimeoutError, wait, as_completed
 import huggingface
-from docx.shared import Inches # Importación útil para el futuro si quieres controlar anchos
-import pypandoc # <<< Nueva importación
+import almacenamiento_audio
+import captura_audio
+import linea_de_tiempo
+import compromisos
+import integrantes
+import resiliencia
+import metricas
+import renderizador_docx
+# python-docx, pypandoc y numpy (vad) se importan dentro de las funciones que
+# los usan, para no retrasar el arranque de la interfaz.
 
 
 # --- Constantes de Audio (no cambian) ---
 CHUNK = 1024
 FORMAT = pyaudio.paInt16
+ANCHO_MUESTRA = 2  # Bytes por muestra de paInt16
 CHANNELS = 1
 RATE = 16000
 
-# --- Definición de Áreas y Personal Fijo (no cambian) ---
-AREAS = {
-    "Innovación y Desarrollo": "innovacion_y_desarrollo.txt",
-    "Soporte": "soporte.txt",
-    "Gestión del Dato": "gestion_del_dato.txt",
-    "Gestión de la Información": "gestion_de_la_informacion.txt"
-}
-JEFE = "Diego mauricio peña Bolaños"
-SECRETARIA = "Luz Adriana Ricardo"
+# --- Parámetros de transcripción ---
+MAX_HILOS_TRANSCRIPCION = 4   # Diálogos que se envían al reconocedor al mismo tiempo
+TIMEOUT_TRANSCRIPCION = 180   # Segundos máximos por diálogo, contados desde que empieza a procesarse
+
+# --- Transcripción en vivo (mientras la reunión sigue en curso) ---
+MAX_HILOS_EN_VIVO = 2         # Intervenciones que se transcriben a la vez durante la reunión
+CAPACIDAD_COLA_EN_VIVO = 8    # Intervenciones en espera; si se llena, el resto se transcribe al final
+
+# Semáforo opcional que limita las transcripciones simultáneas de todo el proceso
+# (o de varios procesos, si es un semáforo de multiprocessing). Por defecto no hay
+# límite más allá de `max_hilos`; lo instala el procesamiento por lotes.
+limite_reconocedor = None
+
+# --- Parámetros del resumen por bloques (map-reduce) del acta oficial ---
+LIMITE_TOKENS_TRANSCRIPCION_DIRECTA = 6000  # Hasta aquí la transcripción va completa en una sola llamada
+PRESUPUESTO_TOKENS_BLOQUE = 3000            # Tamaño máximo de cada bloque en la fase de resumen
+MAX_TOKENS_RESUMEN_BLOQUE = 700             # Longitud máxima de la respuesta para cada bloque
+MAX_HILOS_RESUMEN = 4                       # Bloques que se resumen al mismo tiempo
+MAX_TOKENS_ACTA = 2048                      # Longitud máxima del acta oficial generada
+INTERVALO_VISTA_PREVIA = 0.25               # Segundos mínimos entre avisos de progreso durante el streaming
+
+# --- Definición de Áreas y Personal Fijo ---
+# Valores por defecto; los vigentes se leen de areas.json en la carpeta de datos
+# (ver integrantes.py) y se consultan con `integrantes.directorio(ruta_datos)`.
+AREAS = integrantes.AREAS_POR_DEFECTO
+JEFE = integrantes.JEFE_POR_DEFECTO
+SECRETARIA = integrantes.SECRETARIA_POR_DEFECTO
+
+# --- Carpetas de trabajo ---
+RUTA_EVARISIS = os.path.join(os.path.expanduser('~'), 'Documents', 'evarisis')
+# Las intervenciones se escriben aquí mientras se graba; al guardar la reunión se
+# mueven a su carpeta definitiva.
+RUTA_GRABACIONES_EN_CURSO = os.path.join(RUTA_EVARISIS, '.grabaciones_en_curso')
+MANIFIESTO_GRABACION = "grabacion_en_curso.jsonl"
+TRANSCRIPCION_EN_VIVO = "transcripcion_en_vivo.jsonl"
 
 # --- Funciones de Lógica ---
 
 def get_integrantes(area_filename):
     """Lee un archivo .txt y devuelve una lista de nombres."""
+    return integrantes.leer_nombres(area_filename)
+
+def get_todos_los_integrantes(ruta_carpeta_datos):
+    """
+    Devuelve una lista de tuplas (nombre, area) de todas las áreas. Los archivos
+    se leen una vez y solo se vuelven a leer si cambian.
+    """
+    return integrantes.directorio(ruta_carpeta_datos).integrantes()
+
+# --- Persistencia del proyecto ---
+# El proyecto se guarda siempre con escritura atómica (temporal + renombrado).
+# Durante la transcripción cada diálogo terminado se añade a un diario JSON Lines
+# junto al proyecto, para no reescribir el JSON completo en cada diálogo.
+
+def guardar_json_atomico(ruta, datos):
+    """Escribe `datos` en un archivo temporal y lo renombra sobre `ruta`."""
+    ruta_tmp = f"{ruta}.tmp"
+    with open(ruta_tmp, 'w', encoding='utf-8') as f:
+        json.dump(datos, f, indent=4, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(ruta_tmp, ruta)
+
+def configurar_limite_reconocedor(semaforo):
+    """Instala (o quita, con None) el semáforo que acota las llamadas concurrentes al reconocedor."""
+    global limite_reconocedor
+    limite_reconocedor = semaforo
+
+def get_ruta_diario(ruta_proyecto_json):
+    """Ruta del diario de transcripciones asociado a un proyecto."""
+    return os.path.splitext(ruta_proyecto_json)[0] + ".diario.jsonl"
+
+def registrar_en_diario(ruta_proyecto_json, id_dialogo, texto, motor=None):
+    """Añade una línea al diario con el texto de un diálogo recién transcrito."""
+    linea = json.dumps({"id": id_dialogo, "texto_transcrito": texto, "motor": motor}, ensure_ascii=False)
+    with open(get_ruta_diario(ruta_proyecto_json), 'a', encoding='utf-8') as f:
+        f.write(linea + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+def cargar_proyecto(ruta_proyecto_json):
+    """
+    Lee el proyecto y le aplica las entradas del diario que no llegaron a
+    compactarse (p. ej. tras un cierre inesperado).
+    """
+    with open(ruta_proyecto_json, 'r', encoding='utf-8') as f:
+        proyecto_info = json.load(f)
+
+    ruta_diario = get_ruta_diario(ruta_proyecto_json)
+    if os.path.exists(ruta_diario):
+        dialogos_por_id = {d["id"]: d for d in proyecto_info.get("dialogos", [])}
+        with open(ruta_diario, 'r', encoding='utf-8') as f:
+            for linea in f:
+                try:
+                    entrada = json.loads(linea)
+                except json.JSONDecodeError:
+                    # Última línea a medio escribir cuando se cortó el proceso.
+                    continue
+                if entrada.get("id") in dialogos_por_id and entrada.get("texto_transcrito"):
+                    dialogos_por_id[entrada["id"]]["texto_transcrito"] = entrada["texto_transcrito"]
+                    if entrada.get("motor"):
+                        dialogos_por_id[entrada["id"]]["motor"] = entrada["motor"]
+    return proyecto_info
+
+def compactar_proyecto(ruta_proyecto_json, proyecto_info):
+    """Vuelca el estado completo al JSON de forma atómica y descarta el diario."""
+    guardar_json_atomico(ruta_proyecto_json, proyecto_info)
+    ruta_diario = get_ruta_diario(ruta_proyecto_json)
+    if os.path.exists(ruta_diario):
+        os.remove(ruta_diario)
+
+def _compactar_con_diario(ruta_proyecto_json, proyecto_info, lock_diario, diario_cerrado):
+    """
+    Cierra el diario y compacta el proyecto. Antes se releen sus entradas: un
+    diálogo que se dio por perdido (p. ej. por timeout) puede haber terminado
+    en segundo plano y estar ya en el diario.
+    """
+    with lock_diario:
+        diario_cerrado.set()
+        en_disco = {d["id"]: d for d in cargar_proyecto(ruta_proyecto_json).get("dialogos", [])}
+        for dialogo in proyecto_info["dialogos"]:
+            anotado = en_disco.get(dialogo["id"], {})
+            if not dialogo.get("texto_transcrito") and anotado.get("texto_transcrito"):
+                dialogo["texto_transcrito"] = anotado["texto_transcrito"]
+                if anotado.get("motor"):
+                    dialogo["motor"] = anotado["motor"]
+        compactar_proyecto(ruta_proyecto_json, proyecto_info)
+
+def _es_error_reintentable(texto):
+    """Errores de red o de tiempo: el diálogo debe volver a enviarse al reanudar."""
+    return texto.startswith("[Error de Conexión") or texto.startswith("[Error de Transcripción")
+
+def crear_carpeta_grabacion():
+    """Crea una carpeta temporal única para las intervenciones de una reunión en curso."""
+    ruta = os.path.join(RUTA_GRABACIONES_EN_CURSO, time.strftime('%Y%m%d_%H%M%S'))
+    os.makedirs(ruta, exist_ok=True)
+    return ruta
+
+def fecha_grabacion(carpeta_grabacion):
+    """Momento en que empezó la reunión de una carpeta de grabación (su nombre), como struct_time."""
+    try:
+        return time.strptime(os.path.basename(carpeta_grabacion), '%Y%m%d_%H%M%S')
+    except ValueError:
+        return time.localtime(os.path.getmtime(carpeta_grabacion))
+
+def grabaciones_interrumpidas():
+    """Carpetas de grabación de reuniones que no llegaron a guardarse, de la más antigua a la más reciente."""
     try:
-        with open(area_filename, 'r', encoding='utf-8') as f:
-            return [line.strip() for line in f if line.strip()]
+        entradas = sorted(os.scandir(RUTA_GRABACIONES_EN_CURSO), key=lambda e: e.name)
     except FileNotFoundError:
         return []
+    return [e.path for e in entradas if e.is_dir()]
 
-def get_todos_los_integrantes(ruta_carpeta_datos):
+def descartar_grabacion(carpeta_grabacion):
+    """Borra la carpeta de grabación de una reunión cuyas intervenciones ya se guardaron o se descartan."""
+    shutil.rmtree(carpeta_grabacion, ignore_errors=True)
+    logging.info(f"Carpeta de grabación eliminada: {carpeta_grabacion}")
+
+def crear_servicio_captura():
+    """Servicio que mantiene el micrófono abierto durante toda la reunión (ver captura_audio)."""
+    return captura_audio.ServicioCaptura(frecuencia=RATE, canales=CHANNELS, ancho_muestra=ANCHO_MUESTRA, muestras_por_bloque=CHUNK)
+
+def transcribir_dialogo_segmentado(audio_data, motor=None):
     """
-    Recorre todas las áreas, lee los archivos de integrantes desde una ruta base
-    y devuelve una lista de tuplas (nombre, area).
+    Pasa el audio de un diálogo por el VAD, transcribe cada segmento de voz con
+    el motor indicado y une los textos. Lanza AudioNoReconocido si no se
+    reconoce nada.
     """
-    todos = []
-    for area, filename in AREAS.items():
-        ruta_completa = os.path.join(ruta_carpeta_datos, filename)
-        integrantes_area = get_integrantes(ruta_completa)
-        for nombre in integrantes_area:
-            todos.append((nombre, area))
-    
-    todos.sort(key=lambda x: x[0])
-    return todos
-
-def hilo_grabacion_manual(stop_event, frames_buffer):
-    """Graba audio en un hilo y lo guarda en un buffer hasta que el evento 'stop' se activa."""
-    p = pyaudio.PyAudio()
-    stream = p.open(format=FORMAT, channels=CHANNELS, rate=RATE, input=True, frames_per_buffer=CHUNK)
-    
-    while not stop_event.is_set():
-        data = stream.read(CHUNK)
-        frames_buffer.append(data)
-
-    stream.stop_stream()
-    stream.close()
-    p.terminate()
-
-def transcribir_dialogo_aislado(audio_frames):
+    import vad  # Importación diferida: numpy solo se carga al transcribir
+    motor = motor or motores_transcripcion.obtener_motor()
+    with metricas.tramo("vad"):
+        segmentos = vad.segmentar_por_voz(audio_data, RATE)
+    with metricas.tramo("reconocedor"):
+        return motor.transcribir_lote(segmentos, RATE)
+
+def _partir_linea_larga(linea, presupuesto_tokens):
+    """Parte una intervención que por sí sola excede el presupuesto, por frases y si hace falta por palabras."""
+    piezas, actual, tokens_actual = [], [], 0
+    for frase in re.split(r'(?<=[.!?])\s+', linea):
+        tokens_frase = huggingface.estimar_tokens(frase)
+        unidades = [(frase, tokens_frase)] if tokens_frase <= presupuesto_tokens else \
+            [(palabra, huggingface.estimar_tokens(palabra)) for palabra in frase.split()]
+        for unidad, tokens_unidad in unidades:
+            if actual and tokens_actual + tokens_unidad > presupuesto_tokens:
+                piezas.append(" ".join(actual))
+                actual, tokens_actual = [], 0
+            actual.append(unidad)
+            tokens_actual += tokens_unidad
+    if actual:
+        piezas.append(" ".join(actual))
+    return piezas
+
+def dividir_en_bloques(lineas, presupuesto_tokens=PRESUPUESTO_TOKENS_BLOQUE):
     """
-    Toma frames de audio y devuelve el texto.
-    Esta función está diseñada para ser ejecutada en un hilo separado
-    y lanzará excepciones en caso de error para que el llamador las maneje.
+    Agrupa las líneas de la transcripción (una por diálogo) en bloques que no
+    superan `presupuesto_tokens`, sin partir diálogos salvo que uno solo lo exceda.
     """
-    if not audio_frames:
-        return "[Grabación vacía]"
-    
-    recognizer = sr.Recognizer()
-    audio_data = b''.join(audio_frames)
-    audio_file = sr.AudioData(audio_data, RATE, 2) # 2 bytes por muestra para 16-bit
-
-    # Esta función puede lanzar sr.UnknownValueError o sr.RequestError.
-    # El hilo que la llama debe estar preparado para capturarlas.
-    texto = recognizer.recognize_google(audio_file, language="es-ES")
-    return texto
+    bloques, actual, tokens_actual = [], [], 0
+    for linea in lineas:
+        tokens_linea = huggingface.estimar_tokens(linea)
+        piezas = [linea] if tokens_linea <= presupuesto_tokens else _partir_linea_larga(linea, presupuesto_tokens)
+        for pieza in piezas:
+            tokens_pieza = tokens_linea if len(piezas) == 1 else huggingface.estimar_tokens(pieza)
+            if actual and tokens_actual + tokens_pieza > presupuesto_tokens:
+                bloques.append("\n".join(actual))
+                actual, tokens_actual = [], 0
+            actual.append(pieza)
+            tokens_actual += tokens_pieza
+    if actual:
+        bloques.append("\n".join(actual))
+    return bloques
+
+def _prompt_resumen_bloque(bloque, indice, total, titulo, participantes):
+    return f"""
+Eres un asistente administrativo experto del Hospital Universitario del Valle "Evaristo García" E.S.E. Vas a recibir la parte {indice} de {total} de la transcripción de una reunión. Otra persona unirá después los resúmenes de todas las partes para redactar el acta oficial.
+
+**Instrucciones estrictas:**
+1.  Resume en tercera persona y tiempo pasado, conservando el orden de los temas.
+2.  Conserva los nombres de quien interviene, las cifras, las fechas y las decisiones tomadas.
+3.  Enumera al final, bajo el título "COMPROMISOS:", toda tarea asignada con su RESPONSABLE y FECHA si se menciona. Si no hay, escribe "COMPROMISOS: ninguno".
+4.  Ignora muletillas, saludos y repeticiones. No inventes información.
+
+**Título de la Reunión:** {titulo}
+**Participantes:** {', '.join(participantes)}
+
+**Transcripción (parte {indice} de {total}):**
+---
+{bloque}
+---
+
+**Resumen de esta parte (produce únicamente el resumen):**
+"""
+
+def resumir_transcripcion_por_bloques(lineas, titulo, participantes, update_progress_callback=None, usar_cache=True,
+                                      cancelar=None):
+    """
+    Fase "map": divide la transcripción en bloques y los resume en paralelo.
+    Devuelve (resumen_unido, None) o (None, mensaje_de_error). Si se activa
+    `cancelar`, lanza resiliencia.OperacionCancelada.
+    """
+    bloques = dividir_en_bloques(lineas)
+    total = len(bloques)
+    resumenes = [None] * total
+    hechos = 0
+
+    with ThreadPoolExecutor(max_workers=MAX_HILOS_RESUMEN, thread_name_prefix="ResumenBloque") as executor:
+        futuros = {
+            executor.submit(
+                metricas.propagar(huggingface.generar_texto_hf),
+                _prompt_resumen_bloque(bloque, i + 1, total, titulo, participantes),
+                MAX_TOKENS_RESUMEN_BLOQUE,
+                usar_cache=usar_cache,
+                cancelar=cancelar
+            ): i
+            for i, bloque in enumerate(bloques)
+        }
+        for future in as_completed(futuros):
+            i = futuros[future]
+            resumenes[i] = future.result()
+            hechos += 1
+            if update_progress_callback:
+                update_progress_callback(0.4 + 0.3 * hechos / total, f"Resumiendo la transcripción por partes ({hechos}/{total})...")
+
+    for i, resumen in enumerate(resumenes):
+        if resumen.startswith("[Error"):
+            return None, f"Falló el resumen de la parte {i+1} de {total}: {resumen}"
+    return "\n\n".join(f"[Parte {i+1} de {total}]\n{r}" for i, r in enumerate(resumenes)), None
+
+def lineas_transcripcion(proyecto_info):
+    """
+    Transcripción estructurada del proyecto: una línea por diálogo con texto
+    útil, en el mismo formato que el acta literal.
+    """
+    return [
+        f"Diálogo {d['id']} - {d['hablante']}: {d['texto_transcrito']}"
+        for d in proyecto_info.get("dialogos", [])
+        if d.get("texto_transcrito") and not d["texto_transcrito"].startswith("[")
+    ]
+
+def get_ruta_acta_literal(ruta_proyecto_json):
+    """El acta literal se llama como la carpeta de la reunión."""
+    ruta_carpeta_reunion = os.path.dirname(ruta_proyecto_json)
+    return os.path.join(ruta_carpeta_reunion, f"{os.path.basename(ruta_carpeta_reunion)}.docx")
+
+def get_ruta_acta_oficial(ruta_proyecto_json):
+    """El acta oficial HUV lleva el nombre de la carpeta con el sufijo _ActaOficial_HUV."""
+    ruta_carpeta_reunion = os.path.dirname(ruta_proyecto_json)
+    return os.path.join(ruta_carpeta_reunion, f"{os.path.basename(ruta_carpeta_reunion)}_ActaOficial_HUV.docx")
+
+def renderizar_acta_literal(proyecto_info, ruta_word):
+    """
+    Escribe el acta literal (.docx) a partir del proyecto. Es un paso de salida
+    independiente: no lo necesita la generación del acta oficial, así que puede
+    ejecutarse en paralelo con ella.
+    """
+    from docx import Document
+    doc = Document()
+    doc.add_heading(proyecto_info["titulo"], level=1)
+    doc.add_heading("Acta de Reunión", level=2)
+    doc.add_paragraph(f"Fecha: {time.strftime('%d-%m-%Y')}")
+    doc.add_paragraph(f"Participantes: {', '.join(proyecto_info['participantes'])}")
+    doc.add_paragraph("-" * 50)
+    for dialogo in proyecto_info["dialogos"]:
+        p = doc.add_paragraph()
+        p.add_run(f"Diálogo {dialogo['id']} - {dialogo['hablante']}: ").bold = True
+        p.add_run(dialogo.get("texto_transcrito") or "[Error de Transcripción: no se obtuvo texto; se reintentará al reanudar]")
+    with metricas.tramo("docx"):
+        doc.save(ruta_word)
+    return ruta_word
+
+def convertir_markdown_a_docx(texto_md, ruta_salida, plantilla_referencia=None):
+    """
+    Escribe el acta en Markdown como .docx. Usa el renderizador propio (sin
+    procesos externos) y solo recurre a pandoc para construcciones que este no
+    cubre. Devuelve (True, None) o (False, mensaje_de_error).
+    """
+    plantilla_referencia = plantilla_referencia or renderizador_docx.PLANTILLA_REFERENCIA_POR_DEFECTO
+    try:
+        with metricas.tramo("docx"):
+            renderizador_docx.markdown_a_docx(texto_md, ruta_salida, plantilla_referencia)
+        return True, None
+    except renderizador_docx.MarkdownNoSoportado as e:
+        logging.info(f"{e} Se convertirá con Pandoc.")
+
+    try:
+        import pypandoc
+        extra_args = [f"--reference-doc={plantilla_referencia}"] if os.path.exists(plantilla_referencia) else []
+        with metricas.tramo("pandoc"):
+            pypandoc.convert_text(texto_md, 'docx', format='md', outputfile=ruta_salida, extra_args=extra_args)
+        return True, None
+    except OSError:
+        # Este bloque se ejecutará si pypandoc no puede encontrar a Pandoc.
+        return False, ("Error Crítico: No se pudo encontrar Pandoc. "
+                       "Asegúrate de que esté instalado en el sistema y disponible en el PATH. "
+                       "No se pudo generar el acta formateada.")
+
+class TranscripcionEnVivo:
+    """
+    Transcribe cada intervención en segundo plano en cuanto termina de grabarse.
+    El productor es `ActaWord.agregar_grabacion`; `max_hilos` consumidores leen
+    de una cola acotada. Si la cola está llena la intervención no se encola (la
+    interfaz nunca espera) y queda pendiente para la transcripción final.
+    `al_transcribir(ruta_audio, texto)` recibe cada resultado; los errores de red
+    no producen resultado, para que el diálogo se reintente al final.
+    """
+    def __init__(self, motor, al_transcribir, lock_archivo=None, max_hilos=MAX_HILOS_EN_VIVO, capacidad=CAPACIDAD_COLA_EN_VIVO):
+        self.motor = motor
+        self.al_transcribir = al_transcribir
+        # `lock_archivo(ruta)` da el lock de ese .wav; se toma mientras se lee, para que no se mueva a mitad de lectura.
+        lock_comun = threading.Lock()
+        self.lock_archivo = lock_archivo or (lambda ruta: lock_comun)
+        self.cola = queue.Queue(maxsize=capacidad)
+        self._hilos = [threading.Thread(target=self._consumir, name=f"EnVivo-{i+1}", daemon=True) for i in range(max_hilos)]
+        for hilo in self._hilos:
+            hilo.start()
+
+    def encolar(self, ruta_audio):
+        """Devuelve False si la cola está llena y la intervención se deja para el final."""
+        try:
+            self.cola.put_nowait(ruta_audio)
+            return True
+        except queue.Full:
+            logging.info(f"Cola de transcripción en vivo llena; {os.path.basename(ruta_audio)} se transcribirá al final.")
+            return False
+
+    def _consumir(self):
+        while True:
+            ruta_audio = self.cola.get()
+            try:
+                if ruta_audio is None:
+                    return
+                texto = self._transcribir(ruta_audio)
+                if texto:
+                    self.al_transcribir(ruta_audio, texto)
+            except Exception as e:
+                logging.error(f"Error en la transcripción en vivo de {ruta_audio}: {e}")
+            finally:
+                self.cola.task_done()
+
+    def _transcribir(self, ruta_audio):
+        def _intento():
+            with limite_reconocedor or contextlib.nullcontext():
+                with self.lock_archivo(ruta_audio):
+                    if not os.path.exists(ruta_audio):
+                        return None  # Ya se movió a la carpeta de la reunión
+                    pcm = almacenamiento_audio.leer_pcm(ruta_audio)
+                return transcribir_dialogo_segmentado(pcm, self.motor)
+        try:
+            if not self.motor.requiere_red:
+                return _intento()
+            # En vivo no se espera a que el servicio vuelva ni se reintenta: lo que
+            # falle queda para el final. Los fallos sí cuentan para su circuito.
+            return resiliencia.servicio(self.motor.nombre).ejecutar(
+                _intento, es_transitorio=lambda e: isinstance(e, ErrorMotorTranscripcion), intentos=1, esperar_circuito=False
+            )
+        except AudioNoReconocido:
+            return "[Audio no reconocido o silencio]"
+        except Exception as e:
+            logging.warning(f"La transcripción en vivo de {os.path.basename(ruta_audio)} falló; se reintentará al final: {e}")
+            return None
+
+    def descartar_pendientes(self):
+        """Saca de la cola las intervenciones que aún no han empezado a transcribirse."""
+        while True:
+            try:
+                self.cola.get_nowait()
+            except queue.Empty:
+                return
+            self.cola.task_done()
+
+    def detener(self, timeout=None):
+        """
+        Descarta lo que no ha empezado y espera (hasta `timeout`) a que terminen
+        las transcripciones en curso. Devuelve False si alguna sigue en marcha.
+        """
+        self.descartar_pendientes()
+        for _ in self._hilos:
+            self.cola.put(None)
+        limite = time.monotonic() + timeout if timeout is not None else None
+        for hilo in self._hilos:
+            hilo.join(None if limite is None else max(limite - time.monotonic(), 0))
+        return not any(hilo.is_alive() for hilo in self._hilos)
+
 
 class ActaWord:
     """
     Clase para manejar la creación del documento Word, con un diseño
     robusto que guarda audios primero y permite reanudar transcripciones interrumpidas.
     """
-    def __init__(self, titulo, participantes):
+    def __init__(self, titulo, participantes, carpeta_grabacion=None, formato_audio=None, ruta_datos=None):
         self.titulo = titulo
         self.participantes = participantes
+        # Carpeta de datos central: de su areas.json salen el elaborador y el revisor del acta.
+        self.ruta_datos = ruta_datos
+        # Formato en que quedan los audios en la carpeta de la reunión (wav, flac u opus).
+        # Durante la grabación siempre se escribe .wav, que sobrevive a un cierre inesperado.
+        self.formato_audio = formato_audio or almacenamiento_audio.FORMATO_POR_DEFECTO
+        # `lock` protege solo el estado en memoria; la lectura y el movimiento de
+        # cada audio usan su propio lock (`_lock_audio`) y las anotaciones en los
+        # .jsonl de la carpeta de grabación, `_lock_registros`.
         self.lock = threading.Lock()
+        self._locks_audio = {}
+        self._lock_registros = threading.Lock()
+        # Cada elemento es (hablante, audio): `audio` son bytes PCM en el modo en
+        # memoria, o la ruta de un .wav ya escrito cuando hay `carpeta_grabacion`.
         self.cola_de_grabaciones = []
+        self.carpeta_grabacion = carpeta_grabacion
+        self._contador_grabaciones = 0
+        # Transcripciones hechas durante la reunión, por nombre de archivo de la carpeta de grabación.
+        self.textos_en_vivo = {}
+        self.transcripcion_en_vivo = None
+        self._motor_en_vivo = None
+        # Una vez guardado el proyecto, los resultados en vivo que lleguen tarde van a su diario.
+        self._destino_en_vivo = None
+        # Posición de cada intervención en el flujo de captura, por nombre de archivo.
+        self.segmentos_grabacion = {}
+
+    def nueva_ruta_grabacion(self, hablante):
+        """
+        Reserva el siguiente `dialogo_N.wav` de la carpeta de grabación y lo anota
+        en el manifiesto, para poder recuperarlo aunque la aplicación se cierre.
+        """
+        with self.lock:
+            self._contador_grabaciones += 1
+            nombre_audio = f"dialogo_{self._contador_grabaciones}.wav"
+        self._anotar_en_manifiesto(nombre_audio, hablante)
+        return os.path.join(self.carpeta_grabacion, nombre_audio)
 
-    def agregar_grabacion(self, hablante, audio_data):
-        """Añade una grabación a la cola de pendientes en memoria."""
+    def _lock_audio(self, ruta_audio):
+        """Lock de un audio de la carpeta de grabación: se toma para leerlo o moverlo."""
         with self.lock:
-            if audio_data:
+            return self._locks_audio.setdefault(os.path.basename(ruta_audio), threading.Lock())
+
+    def _anotar(self, nombre_registro, entrada):
+        linea = json.dumps(entrada, ensure_ascii=False)
+        with self._lock_registros:
+            with open(os.path.join(self.carpeta_grabacion, nombre_registro), 'a', encoding='utf-8') as f:
+                f.write(linea + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+    def _anotar_en_manifiesto(self, nombre_audio, hablante, segmento=None):
+        entrada = {"archivo_audio": nombre_audio, "hablante": hablante}
+        if segmento:
+            entrada.update({k: segmento[k] for k in ("muestra_inicio", "muestra_fin", "hora_inicio")})
+        self._anotar(MANIFIESTO_GRABACION, entrada)
+
+    def iniciar_transcripcion_en_vivo(self, motor=None, max_hilos=MAX_HILOS_EN_VIVO):
+        """
+        Empieza a transcribir cada intervención en cuanto se agrega, sin esperar
+        al final de la reunión. Solo aplica cuando se graba en `carpeta_grabacion`.
+        """
+        if not self.carpeta_grabacion or self.transcripcion_en_vivo:
+            return
+        motor_transcripcion = motores_transcripcion.obtener_motor(motor)
+        try:
+            motor_transcripcion.preparar()
+        except ErrorMotorTranscripcion as e:
+            logging.warning(f"Sin transcripción en vivo; todo se transcribirá al final: {e}")
+            return
+        self._motor_en_vivo = motor_transcripcion.nombre
+        self.transcripcion_en_vivo = TranscripcionEnVivo(motor_transcripcion, self._al_transcribir_en_vivo,
+                                                         lock_archivo=self._lock_audio, max_hilos=max_hilos)
+
+    def finalizar_transcripcion_en_vivo(self, timeout=TIMEOUT_TRANSCRIPCION):
+        """Detiene el pipeline en vivo esperando a las intervenciones que ya estaban transcribiéndose."""
+        if self.transcripcion_en_vivo:
+            if not self.transcripcion_en_vivo.detener(timeout):
+                logging.warning("Alguna transcripción en vivo no terminó a tiempo; se repetirá en la transcripción final.")
+            self.transcripcion_en_vivo = None
+
+    def _al_transcribir_en_vivo(self, ruta_audio, texto):
+        nombre_audio = os.path.basename(ruta_audio)
+        motor = self._motor_en_vivo
+        with self.lock:
+            destino = self._destino_en_vivo
+            if not destino:
+                self.textos_en_vivo[nombre_audio] = (texto, motor)
+        if destino:
+            # El proyecto ya se está guardando: el resultado se aplica como una reanudación más.
+            ruta_proyecto_json, ids_por_audio = destino
+            if nombre_audio in ids_por_audio:
+                with self._lock_registros:
+                    registrar_en_diario(ruta_proyecto_json, ids_por_audio[nombre_audio], texto, motor)
+            return
+        if not os.path.isdir(self.carpeta_grabacion):
+            return  # Reunión descartada mientras se transcribía
+        self._anotar(TRANSCRIPCION_EN_VIVO, {"archivo_audio": nombre_audio, "texto_transcrito": texto, "motor": motor})
+
+    def agregar_grabacion(self, hablante, audio_data, segmento=None):
+        """
+        Añade una grabación a la cola de pendientes. `audio_data` puede ser bytes
+        PCM o la ruta de un .wav escrito por el servicio de captura; en ese caso,
+        si hay transcripción en vivo, se encola también para transcribirse ya.
+        `segmento` es la posición devuelta por `ServicioCaptura.terminar_segmento()`.
+        """
+        if isinstance(audio_data, str):
+            if not almacenamiento_audio.tiene_audio(audio_data):
+                if os.path.exists(audio_data):
+                    os.remove(audio_data)
+                return
+            # El hablante definitivo (p. ej. el nombre de un invitado) se anota de nuevo.
+            self._anotar_en_manifiesto(os.path.basename(audio_data), hablante, segmento)
+            with self.lock:
+                if segmento:
+                    self.segmentos_grabacion[os.path.basename(audio_data)] = segmento
                 self.cola_de_grabaciones.append((hablante, audio_data))
+        elif audio_data:
+            with self.lock:
+                self.cola_de_grabaciones.append((hablante, audio_data))
+            return
+        else:
+            return
+        if self.transcripcion_en_vivo:
+            self.transcripcion_en_vivo.encolar(audio_data)
+
+    @classmethod
+    def recuperar_grabacion(cls, carpeta_grabacion, titulo, participantes=None, ruta_datos=None):
+        """
+        Reconstruye la cola de una reunión interrumpida a partir del manifiesto
+        de su carpeta de grabación. Sin `participantes` se toman los hablantes
+        del manifiesto. Si no quedó ninguna intervención, la cola queda vacía.
+        """
+        acta = cls(titulo, participantes or [], carpeta_grabacion, ruta_datos=ruta_datos)
+        hablantes = {}
+        ruta_manifiesto = os.path.join(carpeta_grabacion, MANIFIESTO_GRABACION)
+        if os.path.exists(ruta_manifiesto):
+            with open(ruta_manifiesto, 'r', encoding='utf-8') as f:
+                for linea in f:
+                    try:
+                        entrada = json.loads(linea)
+                    except json.JSONDecodeError:
+                        continue
+                    hablantes[entrada["archivo_audio"]] = entrada["hablante"]  # La última anotación manda
+                    if "muestra_fin" in entrada:
+                        acta.segmentos_grabacion[entrada["archivo_audio"]] = entrada
+        for nombre_audio, hablante in hablantes.items():
+            ruta_audio = os.path.join(carpeta_grabacion, nombre_audio)
+            if almacenamiento_audio.tiene_audio(ruta_audio):
+                almacenamiento_audio.reparar_cabecera_wav(ruta_audio)
+                acta.cola_de_grabaciones.append((hablante, ruta_audio))
+        acta._contador_grabaciones = len(hablantes)
+        if not participantes:
+            acta.participantes = sorted({hablante for hablante, _ in acta.cola_de_grabaciones})
+
+        # Lo que ya se transcribió en vivo no se vuelve a enviar al reconocedor.
+        ruta_en_vivo = os.path.join(carpeta_grabacion, TRANSCRIPCION_EN_VIVO)
+        if os.path.exists(ruta_en_vivo):
+            with open(ruta_en_vivo, 'r', encoding='utf-8') as f:
+                for linea in f:
+                    try:
+                        entrada = json.loads(linea)
+                    except json.JSONDecodeError:
+                        continue
+                    acta.textos_en_vivo[entrada["archivo_audio"]] = (entrada["texto_transcrito"], entrada.get("motor"))
+        return acta
+
+    def descartar_carpeta_grabacion(self):
+        """
+        Borra la carpeta de grabación si ya no contiene intervenciones pendientes
+        de guardar (reunión guardada o terminada sin grabar nada).
+        """
+        if not self.carpeta_grabacion or not os.path.isdir(self.carpeta_grabacion):
+            return
+        with self.lock:
+            pendientes = [a for _, a in self.cola_de_grabaciones
+                          if isinstance(a, str) and os.path.dirname(a) == self.carpeta_grabacion]
+        if not pendientes:
+            descartar_grabacion(self.carpeta_grabacion)
+
+    def personal_fijo(self):
+        """(secretaria, jefe) vigentes en la carpeta de datos; sin ella, los valores por defecto."""
+        if not self.ruta_datos:
+            return SECRETARIA, JEFE
+        directorio = integrantes.directorio(self.ruta_datos)
+        return directorio.secretaria, directorio.jefe
 
     def _guardar_wav(self, path, audio_data):
-        """Función de ayuda para escribir un archivo .wav."""
-        p = pyaudio.PyAudio()
-        with wave.open(path, 'wb') as wf:
-            wf.setnchannels(CHANNELS)
-            wf.setsampwidth(p.get_sample_size(FORMAT))
-            wf.setframerate(RATE)
-            wf.writeframes(audio_data)
-        p.terminate()
-
-    def guardar_proyecto_para_transcribir(self, ruta_carpeta_reunion):
+        """Función de ayuda para escribir un archivo de audio (el formato lo da la extensión)."""
+        almacenamiento_audio.escribir_audio(path, audio_data, CHANNELS, ANCHO_MUESTRA, RATE)
+
+    def guardar_proyecto_para_transcribir(self, ruta_carpeta_reunion, update_progress_callback=None):
         """
         PASO 1: Guarda todos los audios en crudo y un archivo de proyecto (.json).
-        Este paso es rápido, no necesita internet y asegura los datos.
+        Este paso no necesita internet y asegura los datos; en reuniones largas
+        (o con compresión) puede tardar, así que informa del avance por audio.
         """
+        # Las intervenciones aún en cola ya no se transcriben en vivo: sus archivos se van a mover.
+        if self.transcripcion_en_vivo:
+            self.transcripcion_en_vivo.descartar_pendientes()
         try:
+            os.makedirs(ruta_carpeta_reunion, exist_ok=True)
+            ruta_proyecto_json = os.path.join(ruta_carpeta_reunion, "proyecto_reunion.json")
             with self.lock:
-                os.makedirs(ruta_carpeta_reunion, exist_ok=True)
-                
-                proyecto_info = {
-                    "titulo": self.titulo,
-                    "participantes": self.participantes,
-                    "dialogos": []
-                }
-
                 if not self.cola_de_grabaciones:
                     return None, "No se grabaron diálogos."
+                grabaciones = list(self.cola_de_grabaciones)
+                ids_por_audio = {os.path.basename(a): i + 1 for i, (_, a) in enumerate(grabaciones) if isinstance(a, str)}
+                # Desde aquí los resultados en vivo que lleguen van al diario del proyecto
+                # (se aplica al cargarlo), así que no hace falta retener el lock mientras
+                # se mueven o comprimen los audios.
+                self._destino_en_vivo = (ruta_proyecto_json, ids_por_audio)
+                textos_en_vivo = dict(self.textos_en_vivo)
+                segmentos_grabacion = dict(self.segmentos_grabacion)
 
-                for i, (hablante, audio_data) in enumerate(self.cola_de_grabaciones):
-                    nombre_audio = f"dialogo_{i+1}.wav"
-                    ruta_audio = os.path.join(ruta_carpeta_reunion, nombre_audio)
+            proyecto_info = {
+                "titulo": self.titulo,
+                "participantes": self.participantes,
+                "dialogos": []
+            }
+            intervenciones = []
+            extension = almacenamiento_audio.FORMATOS[self.formato_audio][0]
+            for i, (hablante, audio_data) in enumerate(grabaciones):
+                nombre_audio = f"dialogo_{i+1}{extension}"
+                ruta_audio = os.path.join(ruta_carpeta_reunion, nombre_audio)
+                texto, motor, segmento = None, None, None
+                if isinstance(audio_data, str):
+                    segmento = segmentos_grabacion.get(os.path.basename(audio_data))
+                    # Solo espera si el pipeline en vivo está leyendo justo este audio.
+                    with self._lock_audio(audio_data):
+                        if self.formato_audio == "wav":
+                            # Ya está en disco: solo se mueve a la carpeta de la reunión.
+                            shutil.move(audio_data, ruta_audio)
+                        else:
+                            almacenamiento_audio.comprimir_wav(audio_data, ruta_audio)
+                    texto, motor = textos_en_vivo.get(os.path.basename(audio_data), (None, None))
+                else:
                     self._guardar_wav(ruta_audio, audio_data)
-                    
-                    proyecto_info["dialogos"].append({
-                        "id": i + 1,
-                        "hablante": hablante,
-                        "archivo_audio": nombre_audio,
-                        "texto_transcrito": None
-                    })
-
-                ruta_proyecto_json = os.path.join(ruta_carpeta_reunion, "proyecto_reunion.json")
-                with open(ruta_proyecto_json, 'w', encoding='utf-8') as f:
-                    json.dump(proyecto_info, f, indent=4, ensure_ascii=False)
                 
-                return ruta_proyecto_json, None
+                dialogo = {
+                    "id": i + 1,
+                    "hablante": hablante,
+                    "archivo_audio": nombre_audio,
+                    "texto_transcrito": texto
+                }
+                if texto and motor:
+                    dialogo["motor"] = motor
+                proyecto_info["dialogos"].append(dialogo)
+                duracion = None if segmento else almacenamiento_audio.duracion_segundos(ruta_audio)
+                intervenciones.append(linea_de_tiempo.entrada(i + 1, hablante, nombre_audio, RATE, segmento, duracion))
+                if update_progress_callback:
+                    total = len(grabaciones)
+                    update_progress_callback((i + 1) / total, f"Guardando audios de la reunión ({i + 1}/{total})...")
+
+            proyecto_info["linea_de_tiempo"] = linea_de_tiempo.crear(intervenciones, RATE, CHANNELS, ANCHO_MUESTRA)
+            guardar_json_atomico(ruta_proyecto_json, proyecto_info)
+
+            # Los audios ya están a salvo en la carpeta definitiva.
+            with self.lock:
+                self.cola_de_grabaciones = [(h, os.path.join(ruta_carpeta_reunion, d["archivo_audio"]))
+                                            for (h, _), d in zip(grabaciones, proyecto_info["dialogos"])]
+            if self.carpeta_grabacion:
+                descartar_grabacion(self.carpeta_grabacion)
+            
+            return ruta_proyecto_json, None
         except Exception as e:
+            with self.lock:
+                self._destino_en_vivo = None
             return None, f"Error al guardar los audios del proyecto: {e}"
 
-    def transcribir_desde_proyecto(self, ruta_proyecto_json, update_progress_callback, stop_event=None):
+    def transcribir_desde_proyecto(self, ruta_proyecto_json, update_progress_callback, stop_event=None, max_hilos=None, motor=None,
+                                   renderizar_literal=True):
         """
         PASO 2: Lee el proyecto, transcribe los audios con timeouts, y genera el .docx.
-        Esta versión es robusta contra bloqueos de red.
+        Los diálogos pendientes se envían a un pool acotado de hilos (`max_hilos`),
+        pero los resultados se consumen en el orden original.
+        `motor` es el nombre del motor de transcripción; si no se indica se usa
+        el registrado en el proyecto o el motor por defecto.
+        Con `renderizar_literal=False` solo se actualiza el proyecto; el .docx se
+        puede generar después con `renderizar_acta_literal` (p. ej. en paralelo
+        con el acta oficial). La ruta devuelta es la que tendrá el acta literal.
         """
         ruta_carpeta_reunion = os.path.dirname(ruta_proyecto_json)
         proyecto_info = {}
         error_encontrado = None
+        max_hilos = max_hilos or MAX_HILOS_TRANSCRIPCION
+        executor = None
+        exito = False
+        # Los hilos escriben en el diario con este lock; al compactar se cierra el
+        # diario para que un hilo que termine tarde no lo vuelva a crear.
+        lock_diario = threading.Lock()
+        diario_cerrado = threading.Event()
+        # Los tiempos de esta ejecución se añaden a metricas.json en la carpeta de la reunión.
+        registro_metricas = metricas.iniciar_ejecucion("transcripcion")
 
         try:
-            with open(ruta_proyecto_json, 'r', encoding='utf-8') as f:
-                proyecto_info = json.load(f)
-
-            doc = Document()
-            doc.add_heading(proyecto_info["titulo"], level=1)
-            doc.add_heading("Acta de Reunión", level=2)
-            doc.add_paragraph(f"Fecha: {time.strftime('%d-%m-%Y')}")
-            doc.add_paragraph(f"Participantes: {', '.join(proyecto_info['participantes'])}")
-            doc.add_paragraph("-" * 50)
-            
-            total_dialogos = len(proyecto_info["dialogos"])
+            # Las intervenciones que se estaban transcribiendo en vivo terminan antes
+            # de leer el proyecto, para no enviarlas dos veces al reconocedor.
+            if self.transcripcion_en_vivo:
+                update_progress_callback(0, "Esperando a las transcripciones en vivo en curso...")
+                self.finalizar_transcripcion_en_vivo()
+            proyecto_info = cargar_proyecto(ruta_proyecto_json)
+
+            # El motor elegido queda registrado en el proyecto para las reanudaciones.
+            nombre_motor = motor or proyecto_info.get("motor_transcripcion") or motores_transcripcion.MOTOR_POR_DEFECTO
+            motor_transcripcion = motores_transcripcion.obtener_motor(nombre_motor)
+            try:
+                motor_transcripcion.preparar()
+            except ErrorMotorTranscripcion as e:
+                raise Exception(f"No se pudo preparar el motor de transcripción '{nombre_motor}': {e}")
+            proyecto_info["motor_transcripcion"] = nombre_motor
+            # Los motores en la nube pasan por los reintentos y el circuito de su servicio.
+            servicio_reconocedor = resiliencia.servicio(nombre_motor) if motor_transcripcion.requiere_red else None
             
-            for i, dialogo in enumerate(proyecto_info["dialogos"]):
+            dialogos = proyecto_info["dialogos"]
+            total_dialogos = len(dialogos)
+
+            # --- Pool de transcripción ---
+            # Se mantiene una ventana de diálogos enviados por delante del que se está
+            # escribiendo, para no cargar en memoria todos los audios de la reunión.
+            executor = ThreadPoolExecutor(max_workers=max_hilos, thread_name_prefix="Transcripcion")
+            pendientes = [i for i, d in enumerate(dialogos) if not d.get("texto_transcrito")]
+            futuros, inicios, errores_lectura = {}, {}, {}
+            siguiente_pendiente = 0
+            progreso_actual = 0.0
+
+            def _anotar_en_diario(indice, texto):
+                try:
+                    with lock_diario:
+                        if not diario_cerrado.is_set():
+                            registrar_en_diario(ruta_proyecto_json, dialogos[indice]["id"], texto, nombre_motor)
+                except Exception as e:
+                    logging.error(f"No se pudo registrar el diálogo {indice+1} en el diario: {e}")
+
+            def _tarea_transcripcion(indice, frames):
+                # El diálogo se anota en el diario dentro del propio hilo, antes de devolver
+                # el resultado: cuando el hilo principal lo consume ya está a salvo en disco,
+                # aunque aún no toque escribirlo en el acta.
+                try:
+                    texto = _transcribir(indice, frames)
+                except AudioNoReconocido:
+                    _anotar_en_diario(indice, "[Audio no reconocido o silencio]")
+                    raise
+                _anotar_en_diario(indice, texto)
+                return texto
+
+            def _transcribir(indice, frames):
+                def _intento():
+                    with limite_reconocedor or contextlib.nullcontext():
+                        # El timeout de cada diálogo se mide desde que un hilo lo toma (y obtiene
+                        # turno en el reconocedor), no desde que se encola.
+                        inicios[indice] = time.monotonic()
+                        return transcribir_dialogo_segmentado(frames, motor_transcripcion)
+
+                def _al_esperar(segundos, motivo):
+                    # Las pausas entre reintentos no cuentan para el timeout del diálogo.
+                    inicios.pop(indice, None)
+                    update_progress_callback(progreso_actual, f"Sin respuesta del reconocedor ({motivo}); reintentando en {segundos:.0f} s...")
+
+                if not servicio_reconocedor:
+                    return _intento()
+                return servicio_reconocedor.ejecutar(
+                    _intento, es_transitorio=lambda e: isinstance(e, ErrorMotorTranscripcion),
+                    cancelar=stop_event, al_esperar=_al_esperar
+                )
+
+            def _llenar_ventana():
+                nonlocal siguiente_pendiente
+                while siguiente_pendiente < len(pendientes) and len(futuros) < max_hilos * 2:
+                    indice = pendientes[siguiente_pendiente]
+                    siguiente_pendiente += 1
+                    try:
+                        ruta_audio = os.path.join(ruta_carpeta_reunion, dialogos[indice]["archivo_audio"])
+                        with metricas.tramo("lectura_audio"):
+                            frames = almacenamiento_audio.leer_pcm(ruta_audio)
+                    except Exception as e:
+                        errores_lectura[indice] = e
+                        continue
+                    metricas.observar("audio_s_por_dialogo", len(frames) / (RATE * ANCHO_MUESTRA * CHANNELS))
+                    futuros[indice] = executor.submit(metricas.propagar(_tarea_transcripcion), indice, frames)
+
+            def _esperar_resultado(indice, future):
+                # Devuelve None si el proceso se cancela mientras se espera.
+                while not future.done():
+                    if stop_event and stop_event.is_set():
+                        return None
+                    inicio = inicios.get(indice)
+                    restante = TIMEOUT_TRANSCRIPCION - (time.monotonic() - inicio) if inicio else TIMEOUT_TRANSCRIPCION
+                    if restante <= 0:
+                        raise TimeoutError()
+                    wait([future], timeout=min(0.5, restante))
+                return future.result()
+
+            for i, dialogo in enumerate(dialogos):
                 if stop_event and stop_event.is_set():
-                    error_encontrado = "Proceso cancelado por pérdida de conexión (detectado por monitor)."
+                    error_encontrado = "Proceso cancelado."
                     break
                 
-                progreso = (i + 1) / total_dialogos
+                progreso_actual = (i + 1) / total_dialogos
                 hablante = dialogo["hablante"]
-                update_progress_callback(progreso, f"Procesando diálogo {i+1}/{total_dialogos} ({hablante})...")
+                update_progress_callback(progreso_actual, f"Procesando diálogo {i+1}/{total_dialogos} ({hablante})...")
                 
-                if dialogo.get("texto_transcrito"):
-                    texto = dialogo["texto_transcrito"]
-                else:
-                    try:
-                        ruta_audio = os.path.join(ruta_carpeta_reunion, dialogo["archivo_audio"])
-                        with wave.open(ruta_audio, 'rb') as wf:
-                            frames = wf.readframes(wf.getnframes())
-                        
-                        # --- INICIO: Lógica de Transcripción con Timeout ---
-                        executor = ThreadPoolExecutor(max_workers=1)
-                        future = executor.submit(transcribir_dialogo_aislado, [frames])
-                        
-                        try:
-                            # Esperamos el resultado con un timeout de 180 segundos
-                            texto = future.result(timeout=180)
-                        except TimeoutError:
-                            texto = "[Error de Transcripción: La operación tardó demasiado (Timeout)]"
-                        except Exception as e:
-                            # Capturamos excepciones que ocurrieron DENTRO del hilo de transcripción
-                            if isinstance(e, sr.UnknownValueError):
-                                texto = "[Audio no reconocido o silencio]"
-                            elif isinstance(e, sr.RequestError):
-                                texto = f"[Error de Conexión en Transcripción: {e}]"
-                            else:
-                                texto = f"[Error inesperado durante transcripción: {e}]"
-                        # --- FIN: Lógica de Transcripción con Timeout ---
-                        
-                        dialogo["texto_transcrito"] = texto
-
-                        # Si la transcripción falló por un problema de red, detenemos todo el proceso.
-                        if "[Error de Conexión" in texto or "[Timeout]" in texto:
-                            error_encontrado = "Se perdió la conexión a internet durante la transcripción."
-                            break
+                if not dialogo.get("texto_transcrito"):
+                    _llenar_ventana()
+                    if i in errores_lectura:
+                        error_encontrado = f"Error crítico al leer el archivo de audio para el diálogo {i+1}: {errores_lectura[i]}"
+                        break
 
+                    # --- INICIO: Lógica de Transcripción con Timeout ---
+                    future = futuros.pop(i)
+                    servicio_caido = False
+                    try:
+                        texto = _esperar_resultado(i, future)
+                    except TimeoutError:
+                        metricas.contar("timeouts.reconocedor")
+                        texto = "[Error de Transcripción: La operación tardó demasiado (Timeout)]"
+                    except resiliencia.OperacionCancelada:
+                        texto = None
+                    except resiliencia.CircuitoAbierto as e:
+                        texto = f"[Error de Conexión en Transcripción: {e}]"
+                        servicio_caido = True
                     except Exception as e:
-                        error_encontrado = f"Error crítico al leer el archivo de audio para el diálogo {i+1}: {e}"
+                        # Capturamos excepciones que ocurrieron DENTRO del hilo de transcripción
+                        if isinstance(e, AudioNoReconocido):
+                            metricas.contar("audio_no_reconocido")
+                            texto = "[Audio no reconocido o silencio]"
+                        elif isinstance(e, ErrorMotorTranscripcion):
+                            # Se agotaron los reintentos de este diálogo; el resto sigue.
+                            metricas.contar("errores.reconocedor")
+                            texto = f"[Error de Conexión en Transcripción: {e}]"
+                        else:
+                            texto = f"[Error inesperado durante transcripción: {e}]"
+                    # --- FIN: Lógica de Transcripción con Timeout ---
+
+                    if texto is None:
+                        error_encontrado = "Proceso cancelado."
+                        break
+                    
+                    # Los errores de red o timeout no se guardan, para que el diálogo se reintente al reanudar.
+                    dialogo["texto_transcrito"] = None if _es_error_reintentable(texto) else texto
+                    if dialogo["texto_transcrito"]:
+                        dialogo["motor"] = nombre_motor
+
+                    # Solo se detiene todo si el servicio no volvió tras la pausa del circuito.
+                    if servicio_caido:
+                        error_encontrado = "Se perdió la conexión con el servicio de transcripción durante demasiado tiempo."
                         break
-                
-                p = doc.add_paragraph()
-                p.add_run(f"Diálogo {dialogo['id']} - {hablante}: ").bold = True
-                p.add_run(texto)
 
             if error_encontrado:
                 raise Exception(error_encontrado) 
 
+            _compactar_con_diario(ruta_proyecto_json, proyecto_info, lock_diario, diario_cerrado)
+            # Los errores de conexión y los timeouts dejan el diálogo sin texto; se cuentan
+            # después de releer el diario, por si alguno terminó en segundo plano.
+            dialogos_fallidos = sum(1 for d in dialogos if not d.get("texto_transcrito"))
+            if dialogos_fallidos:
+                mensaje = (f"{dialogos_fallidos} diálogos no se pudieron transcribir por errores de conexión "
+                           f"o tiempo agotado; se reintentarán al reanudar.")
+                update_progress_callback(1.0, f"Error: {mensaje} Progreso guardado.")
+                return False, mensaje, None
+
             nombre_reunion = os.path.basename(ruta_carpeta_reunion)
-            ruta_word = os.path.join(ruta_carpeta_reunion, f"{nombre_reunion}.docx")
-            doc.save(ruta_word)
+            ruta_word = get_ruta_acta_literal(ruta_proyecto_json)
+            if renderizar_literal:
+                renderizar_acta_literal(proyecto_info, ruta_word)
             update_progress_callback(1.0, "¡Acta literal completada!")
             mensaje_exito = f"Acta y audios guardados en la carpeta: {nombre_reunion}"
+            exito = True
             return True, mensaje_exito, ruta_word # <--- DEVOLVEMOS LA RUTA
 
         except Exception as e:
             # --- Bloque de guardado de emergencia ---
             # Guarda el progreso parcial en el archivo JSON antes de salir.
+            # Los diálogos que terminaron en segundo plano ya están en el diario; se
+            # releen antes de compactar para no perderlos.
             update_progress_callback(1.0, f"Error: {e}. Guardando progreso...")
             if proyecto_info and "dialogos" in proyecto_info:
-                with open(ruta_proyecto_json, 'w', encoding='utf-8') as f:
-                    json.dump(proyecto_info, f, indent=4, ensure_ascii=False)
+                try:
+                    _compactar_con_diario(ruta_proyecto_json, proyecto_info, lock_diario, diario_cerrado)
+                except Exception as e_guardado:
+                    logging.error(f"No se pudo compactar el proyecto; el diario se conserva: {e_guardado}")
             return False, str(e), None
+
+        finally:
+            # No esperamos a los hilos colgados en la red: se descartan los diálogos
+            # aún no iniciados y el resto termina en segundo plano.
+            if executor:
+                executor.shutdown(wait=False, cancel_futures=True)
+            dialogos = proyecto_info.get("dialogos", [])
+            registro_metricas.terminar(ruta_carpeta_reunion if os.path.isdir(ruta_carpeta_reunion) else None, ok=exito,
+                                       motor=proyecto_info.get("motor_transcripcion"), dialogos=len(dialogos),
+                                       dialogos_pendientes=sum(1 for d in dialogos if not d.get("texto_transcrito")))
         
 
-    def generar_acta_inteligente(self, ruta_acta_literal, update_progress_callback):
+    def generar_acta_inteligente(self, ruta_proyecto_json, update_progress_callback, usar_cache=True, stop_event=None):
         """
-        PASO 3: Lee un acta literal y la transforma en un acta oficial
-        siguiendo la plantilla del HUV.
+        PASO 3: Toma la transcripción del proyecto (.json) y la transforma en un
+        acta oficial siguiendo la plantilla del HUV. No necesita el acta literal
+        .docx; por compatibilidad, si se recibe su ruta se usa el proyecto de la
+        misma carpeta. Con `usar_cache=False` se ignoran las
+        respuestas de IA guardadas y se fuerza una generación nueva.
+        Mientras la IA redacta, `update_progress_callback` recibe un tercer
+        argumento con el texto recibido hasta el momento (vista previa).
+        Si se activa `stop_event` se deja de llamar a la IA y se devuelve
+        (False, "Proceso cancelado."); lo recibido hasta entonces queda en el parcial.
         """
+        registro_metricas = metricas.iniciar_ejecucion("acta_oficial")
+        exito = False
+        try:
+            exito, mensaje = self._generar_acta_inteligente(ruta_proyecto_json, update_progress_callback, usar_cache, stop_event)
+            return exito, mensaje
+        finally:
+            ruta_carpeta = os.path.dirname(ruta_proyecto_json)
+            registro_metricas.terminar(ruta_carpeta if os.path.isdir(ruta_carpeta) else None, ok=exito)
+
+    def _generar_acta_inteligente(self, ruta_proyecto_json, update_progress_callback, usar_cache, stop_event):
         update_progress_callback(0.1, "Iniciando formateo de Acta Oficial HUV...")
         try:
-            # 1. Leer el texto del acta literal (la transcripción)
-            doc_literal = Document(ruta_acta_literal)
-            texto_completo_transcripcion = "\n".join([para.text for para in doc_literal.paragraphs if para.text.strip()])
+            # 1. Tomar la transcripción directamente del proyecto
+            if ruta_proyecto_json.endswith('.docx'):
+                ruta_proyecto_json = os.path.join(os.path.dirname(ruta_proyecto_json), "proyecto_reunion.json")
+            proyecto_info = cargar_proyecto(ruta_proyecto_json)
+            titulo = proyecto_info.get("titulo") or self.titulo
+            participantes = proyecto_info.get("participantes") or self.participantes
+            lineas = lineas_transcripcion(proyecto_info)
+            texto_completo_transcripcion = "\n".join(lineas)
+
+            # La fecha y las horas salen de la línea de tiempo de la grabación; si el
+            # proyecto no la tiene, las horas quedan como marcador para completar a mano.
+            inicio_reunion, fin_reunion = linea_de_tiempo.horario(proyecto_info)
+            fecha_reunion = inicio_reunion.strftime('%d/%m/%Y') if inicio_reunion else time.strftime('%d/%m/%Y')
+            hora_inicio = inicio_reunion.strftime('%H:%M') if inicio_reunion else "{HORA_INICIO}"
+            hora_fin = fin_reunion.strftime('%H:%M') if fin_reunion else "{HORA_FIN}"
+
+            # Los compromisos abiertos de reuniones anteriores salen del almacén, no de las actas viejas.
+            nombre_reunion = os.path.basename(os.path.dirname(ruta_proyecto_json))
+            try:
+                with compromisos.AlmacenCompromisos() as almacen:
+                    compromisos_previos = almacen.previos(nombre_reunion)
+            except Exception as e:
+                logging.warning(f"No se pudieron leer los compromisos previos: {e}")
+                compromisos_previos = []
+            lista_compromisos_previos = compromisos.filas_para_prompt(compromisos_previos)
+            elaborador, revisor_jefe = self.personal_fijo()
             
             if not texto_completo_transcripcion:
                 return False, "La transcripción está vacía, no se puede generar el acta."
 
             update_progress_callback(0.4, "Transcripción leída. Construyendo prompt para IA...")
 
+            # 1b. Las reuniones largas no caben en el contexto del modelo: se resumen
+            #     primero por bloques (map) y la plantilla se llena con esos resúmenes (reduce).
+            titulo_seccion_transcripcion = "Transcripción Completa"
+            if huggingface.estimar_tokens(texto_completo_transcripcion) > LIMITE_TOKENS_TRANSCRIPCION_DIRECTA:
+                texto_completo_transcripcion, error = resumir_transcripcion_por_bloques(
+                    lineas, titulo, participantes, update_progress_callback, usar_cache, stop_event
+                )
+                if error:
+                    return False, error
+                titulo_seccion_transcripcion = "Resumen de la Transcripción por Partes (en orden cronológico)"
+
             # 2. Construir el prompt de ingeniería avanzada con la plantilla
             #    Nota: Los {{PLACEHOLDERS}} son para datos que la UI debería pedir en el futuro.
             #    Por ahora, la IA los llenará con información genérica que podemos editar.
@@ -278,7 +1042,7 @@ DEPARTAMENTO DE {{DEPARTAMENTO}}
 
 FECHA: {{FECHA}}
 LUGAR: {{LUGAR}}
-HORA DE INICIO: {{HORA_INICIO}}     HORA DE FINALIZACIÓN: {{HORA_FIN}}
+HORA DE INICIO: {hora_inicio}     HORA DE FINALIZACIÓN: {hora_fin}
 MODERADOR: {{MODERADOR}}
 OBJETIVO DE LA REUNIÓN: {{OBJETIVO}}
 ASISTENCIA: Ver listado de asistencia digital.
@@ -302,7 +1066,8 @@ NOMBRE                  CARGO                            FIRMA
 
 REVISIÓN DE COMPROMISOS PREVIOS:
 COMPROMISO | RESPONSABLE | FECHA DE CUMPLIMIENTO | ESTADO
-{{LISTA_COMPROMISOS_PREVIOS}}
+{lista_compromisos_previos}
+[Copia esta tabla tal cual, sin el "#número". Cambia ESTADO a "Cumplido" solo si en la transcripción se dice que el compromiso se cumplió.]
 
 COMPROMISOS:
 [Analiza la sección 'DESARROLLO DE LA REUNIÓN' que generaste e identifica cualquier tarea, compromiso o acción nueva que se haya asignado. Formatea como una lista o tabla con COMPROMISO, RESPONSABLE y FECHA DE CUMPLIMIENTO si se menciona. Si no hay compromisos nuevos, escribe "No se generaron nuevos compromisos en esta reunión."]
@@ -312,73 +1077,87 @@ Reviso: {{NOMBRE_REVISOR_JEFE}}
 
 **INFORMACIÓN PROPORCIONADA PARA EL ACTA:**
 
-- **Transcripción Completa:**
+- **{titulo_seccion_transcripcion}:**
 ---
 {texto_completo_transcripcion}
 ---
-- **Título de la Reunión:** {self.titulo}
-- **Participantes:** {', '.join(self.participantes)}
-- **Fecha:** {time.strftime('%d/%m/%Y')}
-- **Elaborador:** Luz Adriana Ricardo
-- **Revisor Jefe:** Diego Mauricio Peña Bolaños
+- **Título de la Reunión:** {titulo}
+- **Participantes:** {', '.join(participantes)}
+- **Fecha:** {fecha_reunion}
+- **Elaborador:** {elaborador}
+- **Revisor Jefe:** {revisor_jefe}
 
 **ACCIÓN REQUERIDA:**
 Ahora, genera el contenido completo del acta final rellenando la plantilla anterior con la información proporcionada y el análisis de la transcripción.
+
+Después del acta, en una línea aparte, escribe exactamente {compromisos.MARCA_BLOQUE} y a continuación un JSON (sin texto adicional) con esta forma:
+{{"nuevos": [{{"compromiso": "...", "responsable": "Nombre completo", "fecha_limite": "AAAA-MM-DD o null"}}], "cumplidos": [números de los compromisos previos que se cumplieron]}}
 """
 
-            # 3. Llamar a la IA con el nuevo prompt
+            # Definimos la ruta de salida, igual que antes.
+            ruta_carpeta = os.path.dirname(ruta_proyecto_json)
+            titulo_original = os.path.basename(ruta_carpeta)
+            ruta_acta_final = get_ruta_acta_oficial(ruta_proyecto_json)
+            nombre_acta_final = os.path.basename(ruta_acta_final)
+            # El Markdown se vuelca aquí a medida que llega; si la conexión se corta,
+            # lo recibido hasta ese momento queda en la carpeta de la reunión.
+            ruta_markdown_parcial = os.path.join(ruta_carpeta, f"{titulo_original}_ActaOficial_HUV_parcial.md")
+            ruta_markdown_final = os.path.join(ruta_carpeta, f"{titulo_original}_ActaOficial_HUV.md")
+
+            # 3. Llamar a la IA con el nuevo prompt, recibiendo la respuesta en streaming
             update_progress_callback(0.5, "Contactando a la IA para generar el acta formateada...")
-            acta_formateada = huggingface.resumir_intervencion_hf(
-                texto_literal=prompt_plantilla_huv,
-                hablante="Generador de Acta HUV",
-                participantes=[]
-            )
+            texto_recibido = []
+            ultimo_aviso = 0.0
 
-            # ... (código anterior para obtener `acta_formateada` de la IA) ...
+            def _al_recibir_texto(fragmento, tokens_recibidos):
+                nonlocal ultimo_aviso
+                texto_recibido.append(fragmento)
+                ahora = time.monotonic()
+                # Se limita la frecuencia de avisos para no saturar el hilo de la interfaz.
+                if ahora - ultimo_aviso >= INTERVALO_VISTA_PREVIA:
+                    ultimo_aviso = ahora
+                    progreso = 0.5 + 0.3 * min(tokens_recibidos / MAX_TOKENS_ACTA, 1.0)
+                    update_progress_callback(progreso, f"Redactando el acta con IA ({tokens_recibidos} tokens recibidos)...", "".join(texto_recibido))
 
-            update_progress_callback(0.8, "Acta en Markdown recibida. Convirtiendo a formato Word con Pandoc...")
+            acta_formateada = huggingface.generar_texto_hf(
+                prompt_plantilla_huv, max_tokens=MAX_TOKENS_ACTA, temperature=0.3, usar_cache=usar_cache,
+                al_recibir_texto=_al_recibir_texto, ruta_parcial=ruta_markdown_parcial, cancelar=stop_event
+            )
+            if acta_formateada.startswith("[Error"):
+                if texto_recibido:
+                    acta_formateada += f"\nLo recibido hasta el corte se guardó en {os.path.basename(ruta_markdown_parcial)}."
+                return False, acta_formateada
 
-            # --- INICIO DE LA MODIFICACIÓN CON PYPANDOC ---
-            
-            # 4. Convertir el texto Markdown a un archivo .docx usando pypandoc.
-            
-            # Renombramos la variable para mayor claridad.
-            acta_en_markdown = acta_formateada
-            
-            # Definimos la ruta de salida, igual que antes.
-            ruta_carpeta = os.path.dirname(ruta_acta_literal)
-            titulo_original = os.path.basename(ruta_acta_literal).replace('.docx', '')
-            nombre_acta_final = f"{titulo_original}_ActaOficial_HUV.docx"
-            ruta_acta_final = os.path.join(ruta_carpeta, nombre_acta_final)
-            
-            try:
-                # Esta es la línea que hace toda la magia con Pandoc.
-                # Le decimos que convierta el texto `acta_en_markdown` al formato 'docx',
-                # asumiendo que el formato de entrada es 'md' (markdown),
-                # y que guarde el resultado directamente en `ruta_acta_final`.
-                pypandoc.convert_text(
-                    acta_en_markdown, 
-                    'docx', 
-                    format='md', 
-                    outputfile=ruta_acta_final,
-                    # Opcional: añade argumentos extra si necesitas una plantilla de Word específica
-                    # extra_args=['--reference-doc=mi_plantilla.docx'] 
-                )
+            # El bloque JSON de compromisos no forma parte del acta: se guarda aparte.
+            acta_formateada, datos_compromisos = compromisos.separar_bloque(acta_formateada)
+            if datos_compromisos is None:
+                logging.warning("La IA no devolvió el bloque de compromisos; no se actualiza el seguimiento.")
+            else:
+                try:
+                    with compromisos.AlmacenCompromisos() as almacen:
+                        nuevos, cerrados = almacen.registrar_reunion(nombre_reunion, datos_compromisos)
+                    logging.info(f"Compromisos de '{nombre_reunion}': {nuevos} nuevos, {cerrados} previos cumplidos.")
+                except Exception as e:
+                    logging.error(f"No se pudieron guardar los compromisos: {e}")
+            with open(ruta_markdown_final, 'w', encoding='utf-8') as f:
+                f.write(acta_formateada)
+            if os.path.exists(ruta_markdown_parcial):
+                os.remove(ruta_markdown_parcial)
 
-            except OSError:
-                # Este bloque se ejecutará si pypandoc no puede encontrar a Pandoc.
-                error_msg = ("Error Crítico: No se pudo encontrar Pandoc. "
-                             "Asegúrate de que esté instalado en el sistema y disponible en el PATH. "
-                             "No se pudo generar el acta formateada.")
+            update_progress_callback(0.8, "Acta en Markdown recibida. Convirtiendo a formato Word...", acta_formateada)
+
+            # 4. Convertir el texto Markdown a un archivo .docx.
+            exito_conversion, error_msg = convertir_markdown_a_docx(acta_formateada, ruta_acta_final)
+            if not exito_conversion:
                 # Devolvemos False para que la UI pueda mostrar el error.
                 return False, error_msg
 
-            # --- FIN DE LA MODIFICACIÓN ---
-
             update_progress_callback(1.0, "¡Acta Oficial HUV generada con éxito!")
 
             return True, f"Acta Oficial guardada como {nombre_acta_final}"
 
+        except resiliencia.OperacionCancelada:
+            return False, "Proceso cancelado."
         except Exception as e:
             # Este bloque ahora capturará otros posibles errores, 
             # como problemas al escribir el archivo, etc.
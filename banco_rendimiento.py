@@ -0,0 +1,510 @@
+# banco_rendimiento.py
+# Banco de rendimiento del flujo completo de una reunión: guardar el proyecto,
+# transcribir, escribir el acta literal y generar el acta oficial.
+# Las reuniones son sintéticas (de 10 a 500 diálogos) y los servicios externos se
+# sustituyen por dos servidores HTTP locales: un reconocedor de voz y un endpoint
+# de chat compatible con InferenceClient, ambos con latencia y tasa de errores
+# configurables. Cada escenario corre en un proceso nuevo con un HOME temporal,
+# así que no toca las reuniones, la caché ni los compromisos reales.
+#
+# Por etapa se informa el tiempo total, los percentiles de latencia de las
+# llamadas a los servicios, el pico de memoria (RSS) y los bytes escritos. Los
+# resultados se añaden a un .jsonl y se comparan con la ejecución anterior del
+# mismo escenario para detectar regresiones.
+#
+# Uso:
+#   python banco_rendimiento.py [--dialogos 10 100 500] [--latencia-reconocedor-ms 150]
+#                               [--errores-reconocedor 0.02] [--latencia-ia-ms 400] [--estricto]
+
+import os
+import sys
+import json
+import math
+import time
+import random
+import logging
+import argparse
+import threading
+import tempfile
+import traceback
+import subprocess
+import multiprocessing
+import urllib.error
+import urllib.request
+from types import SimpleNamespace
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Junto a los demás datos de la aplicación, no en la carpeta del código.
+RUTA_RESULTADOS = os.path.join(os.path.expanduser('~'), 'Documents', 'evarisis', 'resultados_rendimiento.jsonl')
+UMBRAL_REGRESION = 0.15        # Empeorar más de un 15% respecto a la ejecución anterior cuenta como regresión
+MINIMO_SIGNIFICATIVO_S = 0.05  # Diferencias absolutas menores se consideran ruido
+PERCENTILES = (50, 90, 99)
+ETAPAS = ("guardar", "transcribir", "acta_literal", "acta_oficial")
+PALABRAS = ("se revisó el presupuesto del área y el avance de los proyectos de soporte "
+            "la gerencia pidió un informe del servidor y la migración de datos para el próximo comité").split()
+MARCA_COMPROMISOS = "===COMPROMISOS_JSON==="  # Igual que compromisos.MARCA_BLOQUE
+
+
+# -----------------------------------------------------------------------------
+# SERVIDORES FALSOS (proceso aparte, para no contaminar la medición del cliente)
+# -----------------------------------------------------------------------------
+
+def _latencia(rnd, milisegundos):
+    """Duerme alrededor de `milisegundos` (±50%)."""
+    if milisegundos > 0:
+        time.sleep(milisegundos * rnd.uniform(0.5, 1.5) / 1000)
+
+
+def _texto_acta(rnd, palabras):
+    """Acta en Markdown con encabezados, párrafos, una tabla y el bloque de compromisos."""
+    parrafos = [" ".join(rnd.choice(PALABRAS) for _ in range(60)).capitalize() + "." for _ in range(max(1, palabras // 60))]
+    compromisos = {"nuevos": [{"compromiso": "Enviar el informe de la migración", "responsable": "Participante 1",
+                               "fecha_limite": None}], "cumplidos": []}
+    return ("# ACTA No. 001-2025\n\n## DESARROLLO DE LA REUNIÓN\n\n" + "\n\n".join(parrafos) +
+            "\n\n## COMPROMISOS\n\n| COMPROMISO | RESPONSABLE | FECHA |\n|---|---|---|\n"
+            "| Enviar el informe de la migración | Participante 1 | Sin fecha |\n\n"
+            f"{MARCA_COMPROMISOS}\n{json.dumps(compromisos, ensure_ascii=False)}")
+
+
+def _servir(config, cola_urls):
+    """Arranca el reconocedor y el endpoint de chat en hilos de este proceso y publica sus URLs."""
+    rnd = random.Random(config["semilla"])
+
+    class Reconocedor(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_POST(self):
+            pcm = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            _latencia(rnd, config["latencia_reconocedor_ms"])
+            if rnd.random() < config["errores_reconocedor"]:
+                self.send_error(503, "Reconocedor no disponible")
+                return
+            segundos = len(pcm) / 32000
+            cuerpo = json.dumps({"texto": " ".join(rnd.choice(PALABRAS) for _ in range(max(1, int(segundos * 2.5))))}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(cuerpo)))
+            self.end_headers()
+            self.wfile.write(cuerpo)
+
+    class Chat(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_POST(self):
+            peticion = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            prompt = peticion["messages"][-1]["content"]
+            max_tokens = peticion.get("max_tokens") or 512
+            _latencia(rnd, config["latencia_ia_ms"])
+            if rnd.random() < config["errores_ia"]:
+                self.send_response(503)
+                self.send_header("Retry-After", "1")
+                self.end_headers()
+                return
+            if MARCA_COMPROMISOS in prompt:
+                texto = _texto_acta(rnd, int(max_tokens * 0.6))
+            else:
+                texto = " ".join(rnd.choice(PALABRAS) for _ in range(min(max_tokens // 2, 200))).capitalize() + "."
+            piezas = texto.split(" ")
+            if not peticion.get("stream"):
+                time.sleep(len(piezas) * config["ms_por_token_ia"] / 1000)
+                cuerpo = json.dumps({"choices": [{"message": {"role": "assistant", "content": texto}}]}).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(cuerpo)))
+                self.end_headers()
+                self.wfile.write(cuerpo)
+                return
+            # Streaming como server-sent events; sin Content-Length, la conexión se cierra al final.
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.end_headers()
+            for i, pieza in enumerate(piezas):
+                time.sleep(config["ms_por_token_ia"] / 1000)
+                evento = {"choices": [{"delta": {"content": pieza if i == 0 else " " + pieza}}]}
+                self.wfile.write(f"data: {json.dumps(evento)}\n\n".encode())
+                self.wfile.flush()
+            self.wfile.write(b"data: [DONE]\n\n")
+
+    servidores = [ThreadingHTTPServer(("127.0.0.1", 0), Reconocedor), ThreadingHTTPServer(("127.0.0.1", 0), Chat)]
+    for servidor in servidores:
+        servidor.daemon_threads = True
+    cola_urls.put({"reconocedor": f"http://127.0.0.1:{servidores[0].server_address[1]}/reconocer",
+                   "ia": f"http://127.0.0.1:{servidores[1].server_address[1]}/v1/chat/completions"})
+    threading.Thread(target=servidores[0].serve_forever, daemon=True).start()
+    servidores[1].serve_forever()
+
+
+# -----------------------------------------------------------------------------
+# CLIENTES (dentro del proceso de cada escenario)
+# -----------------------------------------------------------------------------
+
+_llamadas = []          # (etapa, servicio, milisegundos, ok)
+_etapa_actual = None
+
+
+def _registrar_llamada(servicio, inicio, ok):
+    _llamadas.append((_etapa_actual, servicio, (time.perf_counter() - inicio) * 1000, ok))
+
+
+def _a_objeto(valor):
+    """dict/list JSON -> objetos con atributos, como los que devuelve InferenceClient."""
+    if isinstance(valor, dict):
+        return SimpleNamespace(**{k: _a_objeto(v) for k, v in valor.items()})
+    if isinstance(valor, list):
+        return [_a_objeto(v) for v in valor]
+    return valor
+
+
+class ErrorHTTPLocal(Exception):
+    """Respuesta de error del servidor falso, con `response` como las excepciones de huggingface_hub."""
+    def __init__(self, codigo, cabeceras):
+        super().__init__(f"HTTP {codigo}")
+        self.response = SimpleNamespace(status_code=codigo, headers=cabeceras)
+
+
+class ClienteInferenciaLocal:
+    """Lo mínimo de InferenceClient que usa huggingface.py: `chat.completions.create`."""
+    def __init__(self, url):
+        self.url = url
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._crear))
+
+    def _crear(self, messages, max_tokens=512, temperature=0.3, stream=False):
+        inicio = time.perf_counter()
+        datos = json.dumps({"messages": messages, "max_tokens": max_tokens, "temperature": temperature, "stream": stream}).encode()
+        peticion = urllib.request.Request(self.url, data=datos, headers={"Content-Type": "application/json"})
+        try:
+            respuesta = urllib.request.urlopen(peticion, timeout=120)
+        except urllib.error.HTTPError as e:
+            _registrar_llamada("ia", inicio, False)
+            raise ErrorHTTPLocal(e.code, dict(e.headers)) from None
+        if not stream:
+            with respuesta:
+                resultado = _a_objeto(json.load(respuesta))
+            _registrar_llamada("ia", inicio, True)
+            return resultado
+        return self._eventos(respuesta, inicio)
+
+    def _eventos(self, respuesta, inicio):
+        with respuesta:
+            for linea in respuesta:
+                linea = linea.decode("utf-8").strip()
+                if not linea.startswith("data:"):
+                    continue
+                datos = linea[5:].strip()
+                if datos == "[DONE]":
+                    break
+                yield _a_objeto(json.loads(datos))
+        _registrar_llamada("ia", inicio, True)
+
+
+def _instalar_servicios_falsos(urls):
+    """Registra el motor "banco" (reconocedor local) y sustituye el cliente de Hugging Face."""
+    import huggingface
+    import motores_transcripcion
+
+    class MotorServidorLocal(motores_transcripcion.MotorTranscripcion):
+        nombre = "banco"
+        requiere_red = True
+
+        def transcribir(self, pcm, frecuencia):
+            inicio = time.perf_counter()
+            peticion = urllib.request.Request(f"{urls['reconocedor']}?frecuencia={frecuencia}", data=pcm,
+                                              headers={"Content-Type": "application/octet-stream"})
+            try:
+                with urllib.request.urlopen(peticion, timeout=30) as respuesta:
+                    texto = json.load(respuesta).get("texto", "")
+            except OSError as e:
+                _registrar_llamada("reconocedor", inicio, False)
+                raise motores_transcripcion.ErrorMotorTranscripcion(str(e)) from e
+            _registrar_llamada("reconocedor", inicio, True)
+            if not texto:
+                raise motores_transcripcion.AudioNoReconocido()
+            return texto
+
+    motores_transcripcion.MOTORES[MotorServidorLocal.nombre] = MotorServidorLocal
+    huggingface.client = ClienteInferenciaLocal(urls["ia"])
+    huggingface._cliente_intentado = True
+    huggingface._tokenizador_intentado = True  # Siempre la estimación aproximada, para comparar ejecuciones
+
+
+# -----------------------------------------------------------------------------
+# MEDICIONES
+# -----------------------------------------------------------------------------
+
+def _rss_pico_mb():
+    """Pico de memoria residente del proceso en MB (None si no se puede medir)."""
+    try:
+        import psutil
+        memoria = psutil.Process().memory_info()
+        return round(getattr(memoria, "peak_wset", memoria.rss) / 2**20, 1)
+    except ImportError:
+        pass
+    try:
+        import resource
+        pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return round(pico / 2**20 if sys.platform == "darwin" else pico / 1024, 1)
+    except ImportError:
+        return None
+
+
+def _bytes_escritos():
+    """Bytes que el proceso ha pasado a write() (None si el sistema no lo expone)."""
+    try:
+        import psutil
+        contadores = psutil.Process().io_counters()
+        return getattr(contadores, "write_chars", contadores.write_bytes)
+    except (ImportError, AttributeError):
+        pass
+    try:
+        with open("/proc/self/io") as f:
+            return next(int(l.split()[1]) for l in f if l.startswith("wchar:"))
+    except (OSError, StopIteration):
+        return None
+
+
+def percentil(valores, p):
+    """Percentil por rango más cercano."""
+    if not valores:
+        return None
+    ordenados = sorted(valores)
+    return ordenados[max(0, math.ceil(p / 100 * len(ordenados)) - 1)]
+
+
+def _resumen_llamadas(etapa):
+    resumen = {}
+    for servicio in sorted({s for e, s, _, _ in _llamadas if e == etapa}):
+        tiempos = [ms for e, s, ms, _ in _llamadas if e == etapa and s == servicio]
+        resumen[servicio] = {"n": len(tiempos), "errores": sum(1 for e, s, _, ok in _llamadas if e == etapa and s == servicio and not ok)}
+        for p in PERCENTILES:
+            resumen[servicio][f"p{p}_ms"] = round(percentil(tiempos, p), 1)
+    return resumen
+
+
+# -----------------------------------------------------------------------------
+# ESCENARIO (proceso nuevo por reunión sintética)
+# -----------------------------------------------------------------------------
+
+def _audio_sintetico(generador, segundos, frecuencia):
+    """PCM int16 con ráfagas de tono y pausas, para que el VAD encuentre 'voz' como en una intervención real."""
+    import numpy as np
+    n = int(segundos * frecuencia)
+    senal = generador.normal(0, 40, n)
+    t = np.arange(n) / frecuencia
+    pos = 0
+    while pos < n:
+        largo = int(generador.uniform(0.6, 1.4) * frecuencia)
+        f0 = generador.uniform(110, 240)
+        senal[pos:pos + largo] += 3000 * np.sin(2 * np.pi * f0 * t[pos:pos + largo])
+        pos += largo + int(generador.uniform(0.2, 0.5) * frecuencia)
+    return np.clip(senal, -32768, 32767).astype(np.int16).tobytes()
+
+
+def _ejecutar_escenario(escenario, urls, directorio, cola_resultado):
+    global _etapa_actual
+    try:
+        # Antes de importar la aplicación: sus rutas se calculan a partir del HOME.
+        os.environ["HOME"] = os.environ["USERPROFILE"] = directorio
+        os.environ["EVARISIS_SIN_CACHE_IA"] = "1"
+        import numpy as np
+        import asistente_reuniones_gerencia_logic as arl_gerencia
+        import almacenamiento_audio
+        logging.getLogger().setLevel(logging.DEBUG if escenario["verbose"] else logging.WARNING)
+        _instalar_servicios_falsos(urls)
+
+        # Reunión sintética en la carpeta de grabación, como la deja el servicio de captura.
+        participantes = [f"Participante {i + 1}" for i in range(escenario["participantes"])]
+        generador = np.random.default_rng(escenario["semilla"])
+        acta = arl_gerencia.ActaWord("Reunión sintética", participantes, carpeta_grabacion=arl_gerencia.crear_carpeta_grabacion())
+        segundos_audio = 0.0
+        for i in range(escenario["dialogos"]):
+            hablante = participantes[i % len(participantes)]
+            segundos = generador.uniform(0.5, 1.5) * escenario["segundos_dialogo"]
+            segundos_audio += segundos
+            ruta = acta.nueva_ruta_grabacion(hablante)
+            almacenamiento_audio.escribir_audio(ruta, _audio_sintetico(generador, segundos, arl_gerencia.RATE),
+                                                arl_gerencia.CHANNELS, arl_gerencia.ANCHO_MUESTRA, arl_gerencia.RATE)
+            acta.agregar_grabacion(hablante, ruta)
+
+        ruta_carpeta = os.path.join(arl_gerencia.RUTA_EVARISIS, "reunion_sintetica")
+        resultado = {"segundos_audio": round(segundos_audio, 1), "etapas": {}, "ok": True, "mensaje": ""}
+        ruta_json = os.path.join(ruta_carpeta, "proyecto_reunion.json")
+
+        def _sin_progreso(*args):
+            pass
+
+        etapas = {
+            "guardar": lambda: acta.guardar_proyecto_para_transcribir(ruta_carpeta)[1] is None,
+            "transcribir": lambda: acta.transcribir_desde_proyecto(ruta_json, _sin_progreso, motor="banco", max_hilos=escenario["hilos"],
+                                                                   renderizar_literal=False)[0],
+            "acta_literal": lambda: bool(arl_gerencia.renderizar_acta_literal(arl_gerencia.cargar_proyecto(ruta_json),
+                                                                             arl_gerencia.get_ruta_acta_literal(ruta_json))),
+            "acta_oficial": lambda: acta.generar_acta_inteligente(ruta_json, _sin_progreso, usar_cache=False)[0],
+        }
+        for etapa in ETAPAS:
+            _etapa_actual = etapa
+            bytes_antes = _bytes_escritos()
+            inicio = time.perf_counter()
+            ok = etapas[etapa]()
+            duracion = time.perf_counter() - inicio
+            bytes_despues = _bytes_escritos()
+            resultado["etapas"][etapa] = {
+                "tiempo_s": round(duracion, 3),
+                "bytes_escritos": bytes_despues - bytes_antes if bytes_antes is not None else None,
+                "rss_pico_mb": _rss_pico_mb(),
+                "llamadas": _resumen_llamadas(etapa),
+            }
+            if not ok:
+                resultado["ok"] = False
+                resultado["mensaje"] = f"La etapa '{etapa}' no terminó correctamente."
+                break
+        resultado["tiempo_total_s"] = round(sum(e["tiempo_s"] for e in resultado["etapas"].values()), 3)
+        resultado["rss_pico_mb"] = _rss_pico_mb()
+        cola_resultado.put(resultado)
+    except Exception:
+        cola_resultado.put({"ok": False, "mensaje": traceback.format_exc(), "etapas": {}})
+
+
+# -----------------------------------------------------------------------------
+# RESULTADOS Y COMPARACIÓN
+# -----------------------------------------------------------------------------
+
+def version_codigo():
+    """Commit actual (con '+' si hay cambios sin confirmar) o 'desconocida'."""
+    directorio = os.path.abspath(os.path.dirname(__file__))
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=directorio, capture_output=True, text=True, timeout=10).stdout.strip()
+        cambios = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=directorio,
+                                 capture_output=True, text=True, timeout=10).stdout.strip()
+        return f"{commit}{'+' if cambios else ''}" if commit else "desconocida"
+    except (OSError, subprocess.SubprocessError):
+        return "desconocida"
+
+
+def cargar_resultados(ruta):
+    if not os.path.exists(ruta):
+        return []
+    with open(ruta, 'r', encoding='utf-8') as f:
+        return [json.loads(l) for l in f if l.strip()]
+
+
+def _metricas(resultado):
+    """Métricas comparables de una ejecución: {nombre: segundos}."""
+    metricas = {"total": resultado["tiempo_total_s"]}
+    for etapa, datos in resultado["etapas"].items():
+        metricas[etapa] = datos["tiempo_s"]
+        for servicio, llamadas in datos["llamadas"].items():
+            metricas[f"{etapa}.{servicio}.p90"] = llamadas["p90_ms"] / 1000
+    return metricas
+
+
+def comparar(anterior, actual, umbral=UMBRAL_REGRESION):
+    """Lista de (métrica, antes, ahora, variación, es_regresión)."""
+    filas = []
+    antes, ahora = _metricas(anterior), _metricas(actual)
+    for nombre, valor in ahora.items():
+        if nombre not in antes or not antes[nombre]:
+            continue
+        variacion = valor / antes[nombre] - 1
+        regresion = variacion > umbral and valor - antes[nombre] > MINIMO_SIGNIFICATIVO_S
+        filas.append((nombre, antes[nombre], valor, variacion, regresion))
+    return filas
+
+
+def _tamano_legible(n_bytes):
+    if n_bytes is None:
+        return "-"
+    for unidad in ("B", "KB", "MB"):
+        if n_bytes < 1024 or unidad == "MB":
+            return f"{n_bytes:.0f} {unidad}" if unidad == "B" else f"{n_bytes:.1f} {unidad}"
+        n_bytes /= 1024
+
+
+def imprimir_resultado(escenario, resultado):
+    print("=" * 72)
+    print(f"{escenario['dialogos']} diálogos · {resultado.get('segundos_audio', 0) / 60:.1f} min de audio · "
+          f"{'OK' if resultado['ok'] else 'ERROR'}")
+    if not resultado["ok"]:
+        print(resultado["mensaje"])
+    print(f"{'Etapa':<14}{'Tiempo':>10}{'Escrito':>12}{'RSS pico':>11}   Llamadas (p50 / p90 / p99 ms)")
+    for etapa, datos in resultado["etapas"].items():
+        escrito = _tamano_legible(datos["bytes_escritos"])
+        rss = f"{datos['rss_pico_mb']:.0f} MB" if datos["rss_pico_mb"] is not None else "-"
+        llamadas = ", ".join(f"{s}: {l['n']} ({l['errores']} err) {l['p50_ms']:.0f} / {l['p90_ms']:.0f} / {l['p99_ms']:.0f}"
+                             for s, l in datos["llamadas"].items())
+        print(f"{etapa:<14}{datos['tiempo_s']:>9.2f}s{escrito:>12}{rss:>11}   {llamadas}")
+    if resultado["etapas"]:
+        print(f"{'total':<14}{resultado['tiempo_total_s']:>9.2f}s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mide el rendimiento del flujo grabación -> acta con servicios locales simulados.")
+    parser.add_argument("--dialogos", type=int, nargs="+", default=[10, 100], help="Tamaños de reunión a medir (10 a 500).")
+    parser.add_argument("--segundos-dialogo", type=float, default=4.0, help="Duración media de cada intervención.")
+    parser.add_argument("--participantes", type=int, default=6)
+    parser.add_argument("--hilos", type=int, default=None, help="Hilos de transcripción (por defecto, los de la aplicación).")
+    parser.add_argument("--latencia-reconocedor-ms", type=float, default=150)
+    parser.add_argument("--errores-reconocedor", type=float, default=0.0, help="Fracción de peticiones que responden 503.")
+    parser.add_argument("--latencia-ia-ms", type=float, default=400, help="Tiempo hasta el primer token.")
+    parser.add_argument("--ms-por-token-ia", type=float, default=2)
+    parser.add_argument("--errores-ia", type=float, default=0.0, help="Fracción de peticiones que responden 503.")
+    parser.add_argument("--semilla", type=int, default=1234)
+    parser.add_argument("--resultados", default=RUTA_RESULTADOS, help="Archivo .jsonl donde se acumulan las ejecuciones.")
+    parser.add_argument("--no-guardar", action="store_true", help="No añadir esta ejecución al archivo de resultados.")
+    parser.add_argument("--umbral", type=float, default=UMBRAL_REGRESION, help="Empeoramiento relativo que cuenta como regresión.")
+    parser.add_argument("--estricto", action="store_true", help="Terminar con código 1 si hay regresiones.")
+    parser.add_argument("--verbose", action="store_true", help="Mostrar los logs de la aplicación.")
+    args = parser.parse_args(argv)
+
+    contexto = multiprocessing.get_context("spawn")
+    cola = contexto.Queue()
+    config_servidores = {
+        "latencia_reconocedor_ms": args.latencia_reconocedor_ms, "errores_reconocedor": args.errores_reconocedor,
+        "latencia_ia_ms": args.latencia_ia_ms, "ms_por_token_ia": args.ms_por_token_ia, "errores_ia": args.errores_ia,
+        "semilla": args.semilla,
+    }
+    servidores = contexto.Process(target=_servir, args=(config_servidores, cola), name="ServidoresFalsos", daemon=True)
+    servidores.start()
+    urls = cola.get(timeout=30)
+
+    version = version_codigo()
+    historial = cargar_resultados(args.resultados)
+    regresiones = 0
+    try:
+        for dialogos in args.dialogos:
+            escenario = {"dialogos": dialogos, "segundos_dialogo": args.segundos_dialogo, "participantes": args.participantes,
+                         "hilos": args.hilos, "semilla": args.semilla, "servidores": config_servidores}
+            with tempfile.TemporaryDirectory(prefix="evarisis_banco_") as directorio:
+                proceso = contexto.Process(target=_ejecutar_escenario, args=(dict(escenario, verbose=args.verbose), urls, directorio, cola))
+                proceso.start()
+                resultado = cola.get()
+                proceso.join()
+            imprimir_resultado(escenario, resultado)
+            if not resultado["ok"]:
+                continue
+
+            anterior = next((r for r in reversed(historial) if r["escenario"] == escenario), None)
+            if anterior:
+                print(f"Comparado con {anterior['version']} ({anterior['fecha']}):")
+                for nombre, antes, ahora, variacion, regresion in comparar(anterior["resultado"], resultado, args.umbral):
+                    marca = "  <-- REGRESIÓN" if regresion else ""
+                    print(f"  {nombre:<28}{antes:>9.3f} -> {ahora:>9.3f}  ({variacion:+.0%}){marca}")
+                    regresiones += regresion
+
+            registro = {"fecha": time.strftime('%Y-%m-%dT%H:%M:%S'), "version": version, "escenario": escenario, "resultado": resultado}
+            historial.append(registro)
+            if not args.no_guardar:
+                os.makedirs(os.path.dirname(os.path.abspath(args.resultados)), exist_ok=True)
+                with open(args.resultados, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(registro, ensure_ascii=False) + "\n")
+    finally:
+        servidores.terminate()
+
+    if regresiones:
+        print(f"{regresiones} métricas empeoraron más de un {args.umbral:.0%}.")
+    return 1 if regresiones and args.estricto else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,125 @@
+# cache_ia.py
+# Caché en disco de respuestas del modelo de lenguaje, direccionada por contenido.
+# La clave es un hash de (modelo, prompt, temperatura, max_tokens): si nada de eso
+# cambia, la respuesta se reutiliza sin volver a consumir cuota de inferencia.
+
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+
+RUTA_CACHE_IA = os.path.join(os.path.expanduser('~'), 'Documents', 'evarisis', '.cache_ia')
+TAMANO_MAXIMO_BYTES = 200 * 1024 * 1024   # Al superarlo se borran las entradas usadas hace más tiempo
+EDAD_MAXIMA_S = 30 * 24 * 3600            # Las entradas más antiguas se consideran caducadas
+ESCRITURAS_ENTRE_PODAS = 50
+
+
+def clave_cache(model_id, prompt, temperature, max_tokens):
+    """Hash SHA-256 que identifica de forma única una petición al modelo."""
+    contenido = json.dumps([model_id, prompt, temperature, max_tokens], ensure_ascii=False)
+    return hashlib.sha256(contenido.encode('utf-8')).hexdigest()
+
+
+class CacheRespuestas:
+    """
+    Guarda cada respuesta en un archivo JSON propio (`<clave[:2]>/<clave>.json`).
+    La edad se mide siempre desde la creación: la fecha de modificación del
+    archivo es la de escritura y no se toca al leer. La fecha de acceso se fija
+    explícitamente en cada lectura y hace de marca de último uso para la
+    expulsión por tamaño.
+    """
+    def __init__(self, directorio=RUTA_CACHE_IA, tamano_maximo=TAMANO_MAXIMO_BYTES, edad_maxima=EDAD_MAXIMA_S):
+        self.directorio = directorio
+        self.tamano_maximo = tamano_maximo
+        self.edad_maxima = edad_maxima
+        self._lock = threading.Lock()
+        self._escrituras = 0
+
+    def _ruta(self, clave):
+        return os.path.join(self.directorio, clave[:2], f"{clave}.json")
+
+    def obtener(self, clave):
+        """Devuelve la respuesta guardada o None si no existe o ha caducado."""
+        ruta = self._ruta(clave)
+        try:
+            with open(ruta, 'r', encoding='utf-8') as f:
+                entrada = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        except OSError as e:
+            logging.warning(f"No se pudo leer la caché de IA ({ruta}): {e}")
+            return None
+
+        if time.time() - entrada.get("creado", 0) > self.edad_maxima:
+            self._borrar(ruta)
+            return None
+        try:
+            # Último uso en la fecha de acceso; la de modificación (creación) se conserva.
+            os.utime(ruta, ns=(time.time_ns(), os.stat(ruta).st_mtime_ns))
+        except OSError:
+            pass
+        return entrada.get("respuesta")
+
+    def guardar(self, clave, respuesta):
+        ruta = self._ruta(clave)
+        try:
+            os.makedirs(os.path.dirname(ruta), exist_ok=True)
+            ruta_tmp = f"{ruta}.{threading.get_ident()}.tmp"
+            with open(ruta_tmp, 'w', encoding='utf-8') as f:
+                json.dump({"creado": time.time(), "respuesta": respuesta}, f, ensure_ascii=False)
+            os.replace(ruta_tmp, ruta)
+        except OSError as e:
+            logging.warning(f"No se pudo escribir en la caché de IA: {e}")
+            return
+
+        with self._lock:
+            self._escrituras += 1
+            toca_podar = self._escrituras % ESCRITURAS_ENTRE_PODAS == 1
+        if toca_podar:
+            self.podar()
+
+    def podar(self):
+        """Elimina entradas creadas hace más de `edad_maxima` y, si la caché excede el tamaño máximo, las usadas hace más tiempo."""
+        entradas = []
+        ahora = time.time()
+        for raiz, _, archivos in os.walk(self.directorio):
+            for nombre in archivos:
+                ruta = os.path.join(raiz, nombre)
+                try:
+                    estado = os.stat(ruta)
+                except OSError:
+                    continue
+                if nombre.endswith(".tmp"):
+                    # Temporales huérfanos de una escritura interrumpida.
+                    if ahora - estado.st_mtime > 3600:
+                        self._borrar(ruta)
+                    continue
+                if ahora - estado.st_mtime > self.edad_maxima:
+                    self._borrar(ruta)
+                    continue
+                entradas.append((estado.st_atime, estado.st_size, ruta))
+
+        total = sum(tamano for _, tamano, _ in entradas)
+        if total <= self.tamano_maximo:
+            return
+        # Se deja margen (90%) para no podar en cada escritura.
+        for _, tamano, ruta in sorted(entradas):
+            self._borrar(ruta)
+            total -= tamano
+            if total <= self.tamano_maximo * 0.9:
+                break
+
+    def limpiar(self):
+        """Vacía la caché por completo."""
+        for raiz, _, archivos in os.walk(self.directorio):
+            for nombre in archivos:
+                self._borrar(os.path.join(raiz, nombre))
+
+    @staticmethod
+    def _borrar(ruta):
+        try:
+            os.remove(ruta)
+        except OSError:
+            pass
@@ -0,0 +1,186 @@
+# captura_audio.py
+# Captura continua del micrófono durante toda la reunión.
+# PortAudio y el flujo de entrada se abren una sola vez por reunión. Los clics en
+# los participantes solo marcan dónde empieza y termina cada intervención dentro
+# del flujo continuo, así que cambiar de hablante no reabre el dispositivo ni
+# pierde las primeras sílabas.
+
+import time
+import queue
+import logging
+import threading
+import collections
+import almacenamiento_audio
+
+PREAMBULO_S = 0.5                 # Audio anterior al clic que se añade al inicio de cada intervención
+CAPACIDAD_COLA_BLOQUES = 2000     # Bloques en espera de escribirse (~2 min); si el disco se atasca más, se descartan
+
+
+class ServicioCaptura:
+    """
+    Mantiene abierto el micrófono y reparte el audio entre intervenciones.
+
+    El callback de PortAudio solo encola bloques; un hilo escritor los vuelca al
+    .wav de la intervención activa. Las marcas de inicio y fin viajan por la misma
+    cola que el audio, de modo que cada corte cae exactamente entre dos muestras
+    del flujo: lo que llega antes de la marca es de una intervención y lo que
+    llega después, de la siguiente. Las muestras se cuentan desde `iniciar()`.
+    Si la cola se llena, los bloques descartados se sustituyen por silencio de la
+    misma duración, para que las posiciones sigan coincidiendo con el reloj.
+    """
+    def __init__(self, frecuencia=16000, canales=1, ancho_muestra=2, muestras_por_bloque=1024):
+        self.frecuencia = frecuencia
+        self.canales = canales
+        self.ancho_muestra = ancho_muestra
+        self.muestras_por_bloque = muestras_por_bloque
+        self.hora_inicio = None          # time.time() de la primera muestra capturada
+        self.bloques_perdidos = 0
+        self._muestras_sin_encolar = 0   # Solo la toca el callback: perdidas desde el último bloque encolado
+        self._cola = queue.Queue(maxsize=CAPACIDAD_COLA_BLOQUES)
+        self._pyaudio = None
+        self._stream = None
+        self._hilo_escritor = None
+        # Estado del hilo escritor
+        self._muestras_escritas = 0
+        self._preambulo = collections.deque()
+        self._muestras_preambulo = 0
+        self._escritor = None
+        self._segmento = None
+
+    @property
+    def activo(self):
+        return self._stream is not None
+
+    def iniciar(self):
+        """Abre el micrófono. Lanza OSError si no hay dispositivo de entrada."""
+        if self._stream:
+            return
+        import pyaudio
+        self._pyaudio = pyaudio.PyAudio()
+        try:
+            self._hilo_escritor = threading.Thread(target=self._escribir, name="EscritorAudio", daemon=True)
+            self._hilo_escritor.start()
+            self.hora_inicio = time.time()
+            self._stream = self._pyaudio.open(
+                format=self._pyaudio.get_format_from_width(self.ancho_muestra), channels=self.canales, rate=self.frecuencia,
+                input=True, frames_per_buffer=self.muestras_por_bloque, stream_callback=self._callback
+            )
+        except Exception:
+            self.hora_inicio = None
+            self._cola.put(("salir", None))
+            self._pyaudio.terminate()
+            self._pyaudio = None
+            raise
+        logging.info("Captura de audio iniciada para la reunión.")
+
+    def _callback(self, datos, n_muestras, info_tiempo, estado):
+        # Se ejecuta en el hilo de PortAudio: nada de disco ni de bloqueos aquí.
+        import pyaudio
+        try:
+            self._cola.put_nowait(("audio", (datos, self._muestras_sin_encolar)))
+            self._muestras_sin_encolar = 0
+        except queue.Full:
+            self.bloques_perdidos += 1
+            self._muestras_sin_encolar += n_muestras
+        return (None, pyaudio.paContinue)
+
+    def iniciar_segmento(self, ruta_wav):
+        """Empieza a guardar en `ruta_wav` (cerrando la intervención anterior, si la hay)."""
+        self._cola.put(("inicio", ruta_wav))
+
+    def terminar_segmento(self, timeout=2.0):
+        """
+        Cierra la intervención activa y devuelve sus datos: ruta, muestra de inicio
+        y de fin en el flujo, y hora de inicio. None si no había ninguna.
+        """
+        listo = threading.Event()
+        resultado = {}
+        self._cola.put(("fin", (listo, resultado)))
+        if not listo.wait(timeout):
+            logging.warning("El escritor de audio no cerró la intervención a tiempo.")
+        return resultado.get("segmento")
+
+    def detener(self):
+        """Cierra la intervención activa y libera el micrófono."""
+        if not self._stream:
+            return None
+        segmento = self.terminar_segmento()
+        try:
+            self._stream.stop_stream()
+            self._stream.close()
+        finally:
+            self._stream = None
+            self._pyaudio.terminate()
+            self._pyaudio = None
+            self._cola.put(("salir", None))
+            self._hilo_escritor.join(timeout=2)
+        if self.bloques_perdidos:
+            logging.warning(f"Se descartaron {self.bloques_perdidos} bloques de audio porque el disco no daba abasto.")
+        logging.info("Captura de audio detenida.")
+        return segmento
+
+    # --- Hilo escritor ---
+
+    def _escribir(self):
+        while True:
+            tipo, valor = self._cola.get()
+            try:
+                if tipo == "audio":
+                    self._recibir_audio(valor)
+                elif tipo == "inicio":
+                    self._cerrar_segmento()
+                    self._abrir_segmento(valor)
+                elif tipo == "fin":
+                    listo, resultado = valor
+                    resultado["segmento"] = self._cerrar_segmento()
+                    listo.set()
+                elif tipo == "salir":
+                    self._cerrar_segmento()
+                    return
+            except Exception as e:
+                logging.error(f"Error en el escritor de audio ({tipo}): {e}")
+                if tipo == "fin":
+                    valor[0].set()
+
+    def _recibir_audio(self, valor):
+        datos, perdidas = valor
+        if perdidas:
+            # Bloques descartados justo antes de este: se rellenan con silencio.
+            self._agregar_audio(bytes(perdidas * self.ancho_muestra * self.canales))
+        self._agregar_audio(datos)
+
+    def _agregar_audio(self, datos):
+        muestras = len(datos) // (self.ancho_muestra * self.canales)
+        self._muestras_escritas += muestras
+        if self._escritor:
+            self._escritor.escribir(datos)
+            return
+        # Fuera de una intervención solo se guarda el último medio segundo, para
+        # anteponerlo a la siguiente y no cortar el arranque de la frase.
+        self._preambulo.append(datos)
+        self._muestras_preambulo += muestras
+        maximo = int(PREAMBULO_S * self.frecuencia)
+        while self._preambulo and self._muestras_preambulo - len(self._preambulo[0]) // (self.ancho_muestra * self.canales) >= maximo:
+            self._muestras_preambulo -= len(self._preambulo.popleft()) // (self.ancho_muestra * self.canales)
+
+    def _abrir_segmento(self, ruta_wav):
+        self._escritor = almacenamiento_audio.EscritorWavIncremental(ruta_wav, self.canales, self.ancho_muestra, self.frecuencia)
+        inicio = self._muestras_escritas - self._muestras_preambulo
+        for datos in self._preambulo:
+            self._escritor.escribir(datos)
+        self._preambulo.clear()
+        self._muestras_preambulo = 0
+        self._segmento = {
+            "ruta": ruta_wav,
+            "muestra_inicio": inicio,
+            "hora_inicio": self.hora_inicio + inicio / self.frecuencia if self.hora_inicio else time.time(),
+        }
+
+    def _cerrar_segmento(self):
+        if not self._escritor:
+            return None
+        self._escritor.cerrar()
+        segmento = self._segmento
+        segmento["muestra_fin"] = self._muestras_escritas
+        self._escritor, self._segmento = None, None
+        return segmento
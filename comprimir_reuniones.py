@@ -0,0 +1,95 @@
+# comprimir_reuniones.py
+# Migra las reuniones ya guardadas a un formato de audio comprimido.
+# Para cada <raíz>/*/proyecto_reunion.json codifica los dialogo_N.wav en FLAC
+# (u Opus), actualiza `archivo_audio` en el proyecto y después borra los .wav.
+# Si se interrumpe, volver a ejecutarlo termina el trabajo: el proyecto solo
+# apunta a los archivos nuevos cuando todos están escritos y verificados.
+# Debe ejecutarse con la aplicación cerrada.
+#
+# Uso:
+#   python comprimir_reuniones.py [--raiz RUTA] [--formato flac|opus] [--listar]
+
+import os
+import sys
+import logging
+import argparse
+
+import asistente_reuniones_gerencia_logic as arl_gerencia
+import almacenamiento_audio
+from procesar_lote import buscar_proyectos
+
+
+def comprimir_proyecto(ruta_proyecto_json, formato="flac"):
+    """
+    Comprime los audios .wav de un proyecto. Devuelve (archivos convertidos,
+    bytes antes, bytes después).
+    """
+    ruta_carpeta = os.path.dirname(ruta_proyecto_json)
+    proyecto_info = arl_gerencia.cargar_proyecto(ruta_proyecto_json)
+    convertidos, bytes_antes, bytes_despues = 0, 0, 0
+    wavs_a_borrar = []
+
+    for dialogo in proyecto_info.get("dialogos", []):
+        nombre_audio = dialogo["archivo_audio"]
+        ruta_audio = os.path.join(ruta_carpeta, nombre_audio)
+        if almacenamiento_audio.formato_de(ruta_audio) != "wav":
+            # Ya migrado; si quedó el .wav de una ejecución interrumpida, se borra.
+            ruta_wav = almacenamiento_audio.ruta_con_formato(ruta_audio, "wav")
+            if os.path.exists(ruta_wav) and os.path.exists(ruta_audio):
+                wavs_a_borrar.append(ruta_wav)
+            continue
+        if not os.path.exists(ruta_audio):
+            logging.warning(f"No existe {ruta_audio}; se deja como está.")
+            continue
+        ruta_destino = almacenamiento_audio.ruta_con_formato(ruta_audio, formato)
+        almacenamiento_audio.comprimir_wav(ruta_audio, ruta_destino)
+        bytes_antes += os.path.getsize(ruta_audio)
+        bytes_despues += os.path.getsize(ruta_destino)
+        dialogo["archivo_audio"] = os.path.basename(ruta_destino)
+        wavs_a_borrar.append(ruta_audio)
+        convertidos += 1
+
+    if convertidos:
+        arl_gerencia.compactar_proyecto(ruta_proyecto_json, proyecto_info)
+    for ruta_wav in wavs_a_borrar:
+        os.remove(ruta_wav)
+    return convertidos, bytes_antes, bytes_despues
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Comprime los audios de las reuniones guardadas.")
+    parser.add_argument("--raiz", default=arl_gerencia.RUTA_EVARISIS, help="Carpeta que contiene una subcarpeta por reunión.")
+    parser.add_argument("--formato", default="flac", choices=[f for f in almacenamiento_audio.FORMATOS if f != "wav"],
+                        help="flac conserva el audio exacto; opus ocupa mucho menos pero con pérdida.")
+    parser.add_argument("--listar", action="store_true", help="Solo mostrar cuántos .wav tiene cada reunión.")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s | %(levelname)-8s | %(message)s', force=True)
+
+    total_archivos, total_antes, total_despues, errores = 0, 0, 0, 0
+    for ruta in buscar_proyectos(args.raiz):
+        nombre = os.path.basename(os.path.dirname(ruta))
+        if args.listar:
+            proyecto_info = arl_gerencia.cargar_proyecto(ruta)
+            wavs = [d for d in proyecto_info.get("dialogos", []) if d["archivo_audio"].lower().endswith(".wav")]
+            print(f"{nombre}: {len(wavs)} audios .wav")
+            continue
+        try:
+            convertidos, antes, despues = comprimir_proyecto(ruta, args.formato)
+        except Exception as e:
+            logging.error(f"[{nombre}] No se pudo comprimir: {e}")
+            errores += 1
+            continue
+        if convertidos:
+            logging.info(f"[{nombre}] {convertidos} audios: {antes / 2**20:.1f} MB -> {despues / 2**20:.1f} MB")
+        total_archivos += convertidos
+        total_antes += antes
+        total_despues += despues
+
+    if not args.listar:
+        print(f"Audios comprimidos: {total_archivos}. Espacio: {total_antes / 2**20:.1f} MB -> {total_despues / 2**20:.1f} MB"
+              f"{f' ({errores} reuniones con error)' if errores else ''}")
+    return 1 if errores else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,190 @@
+# compromisos.py
+# Seguimiento de compromisos entre reuniones.
+# Al generar el acta oficial, la IA devuelve además un bloque JSON con los
+# compromisos nuevos y los previos que se dieron por cumplidos. Se guardan en
+# SQLite, indexados por estado, responsable y fecha de cumplimiento, y la
+# siguiente reunión recibe los abiertos en {{LISTA_COMPROMISOS_PREVIOS}} sin
+# volver a pasarle al modelo las actas anteriores.
+
+import os
+import re
+import json
+import time
+import sqlite3
+import logging
+import unicodedata
+from datetime import datetime
+
+RUTA_COMPROMISOS = os.path.join(os.path.expanduser('~'), 'Documents', 'evarisis', '.compromisos.sqlite3')
+MARCA_BLOQUE = "===COMPROMISOS_JSON==="   # Separa el acta del bloque JSON en la respuesta de la IA
+MAX_COMPROMISOS_PREVIOS = 40                 # Abiertos que se incluyen en el prompt de la siguiente reunión
+
+ABIERTO, CUMPLIDO = "abierto", "cumplido"
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS compromisos (
+    id INTEGER PRIMARY KEY,
+    reunion TEXT NOT NULL,
+    descripcion TEXT NOT NULL,
+    responsable TEXT,
+    responsable_clave TEXT,
+    fecha_limite TEXT,
+    estado TEXT NOT NULL DEFAULT 'abierto',
+    creado TEXT NOT NULL,
+    cerrado_en_reunion TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_compromisos_responsable ON compromisos (estado, responsable_clave);
+CREATE INDEX IF NOT EXISTS idx_compromisos_fecha ON compromisos (estado, fecha_limite);
+CREATE INDEX IF NOT EXISTS idx_compromisos_reunion ON compromisos (reunion, descripcion);
+CREATE INDEX IF NOT EXISTS idx_compromisos_cerrado ON compromisos (cerrado_en_reunion);
+"""
+
+
+def clave_responsable(nombre):
+    """Nombre en minúsculas y sin tildes, para comparar responsables escritos de forma distinta."""
+    if not nombre:
+        return ""
+    sin_tildes = unicodedata.normalize('NFKD', nombre).encode('ascii', 'ignore').decode('ascii')
+    return " ".join(sin_tildes.lower().split())
+
+
+def _fecha_iso(valor):
+    """Acepta AAAA-MM-DD o DD/MM/AAAA; cualquier otra cosa se guarda como sin fecha."""
+    if not valor:
+        return None
+    for formato in ('%Y-%m-%d', '%d/%m/%Y'):
+        try:
+            return datetime.strptime(str(valor).strip(), formato).strftime('%Y-%m-%d')
+        except ValueError:
+            continue
+    return None
+
+
+def separar_bloque(respuesta):
+    """
+    Separa la respuesta de la IA en (acta en Markdown, datos de compromisos).
+    Los datos son {"nuevos": [...], "cumplidos": [ids]} o None si el bloque falta
+    o no es JSON válido; en ese caso el acta se devuelve igualmente.
+    """
+    if MARCA_BLOQUE not in respuesta:
+        return respuesta.strip(), None
+    acta, bloque = respuesta.split(MARCA_BLOQUE, 1)
+    bloque = re.sub(r'^\s*```(?:json)?|```\s*$', '', bloque.strip()).strip()
+    try:
+        datos = json.loads(bloque)
+    except json.JSONDecodeError as e:
+        logging.warning(f"El bloque de compromisos de la IA no es JSON válido: {e}")
+        return acta.strip(), None
+    if isinstance(datos, list):
+        datos = {"nuevos": datos, "cumplidos": []}
+    return acta.strip(), datos
+
+
+def filas_para_prompt(compromisos):
+    """Filas 'COMPROMISO | RESPONSABLE | FECHA | ESTADO' con el id, para que la IA pueda citarlos."""
+    if not compromisos:
+        return "No hay compromisos previos abiertos."
+    return "\n".join(
+        f"#{c['id']} {c['descripcion']} | {c['responsable'] or 'Sin asignar'} | "
+        f"{datetime.strptime(c['fecha_limite'], '%Y-%m-%d').strftime('%d/%m/%Y') if c['fecha_limite'] else 'Sin fecha'} | Pendiente"
+        for c in compromisos
+    )
+
+
+class AlmacenCompromisos:
+    def __init__(self, ruta=RUTA_COMPROMISOS):
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        self.conexion = sqlite3.connect(ruta)
+        self.conexion.row_factory = sqlite3.Row
+        self.conexion.executescript(_ESQUEMA)
+
+    def cerrar(self):
+        self.conexion.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+    def registrar_reunion(self, reunion, datos):
+        """
+        Guarda los compromisos nuevos de `reunion` y cierra los previos que la IA
+        marcó como cumplidos. Los compromisos de una reunión se identifican por
+        (reunion, descripcion): regenerar el acta actualiza los que ya existían,
+        borra los abiertos que ya no aparecen y rehace los cierres hechos por esta
+        reunión según la nueva respuesta. Devuelve (nuevos, cerrados).
+        """
+        nuevos = {}
+        for c in datos.get("nuevos", []):
+            if isinstance(c, dict) and (c.get("compromiso") or "").strip():
+                nuevos[c["compromiso"].strip()] = c
+        cumplidos = {int(str(i).lstrip('#')) for i in datos.get("cumplidos") or [] if str(i).lstrip('#').isdigit()}
+        ahora = time.strftime('%Y-%m-%dT%H:%M:%S')
+        with self.conexion:
+            existentes = {fila["descripcion"]: fila["id"] for fila in self.conexion.execute(
+                "SELECT id, descripcion FROM compromisos WHERE reunion = ?", (reunion,))}
+            for descripcion, c in nuevos.items():
+                valores = ((c.get("responsable") or "").strip() or None, clave_responsable(c.get("responsable")),
+                           _fecha_iso(c.get("fecha_limite")))
+                if descripcion in existentes:
+                    # El estado se conserva: puede haberlo cerrado ya una reunión posterior.
+                    self.conexion.execute(
+                        "UPDATE compromisos SET responsable = ?, responsable_clave = ?, fecha_limite = ? WHERE id = ?",
+                        valores + (existentes[descripcion],))
+                else:
+                    self.conexion.execute(
+                        "INSERT INTO compromisos (reunion, descripcion, responsable, responsable_clave, fecha_limite, creado) "
+                        "VALUES (?, ?, ?, ?, ?, ?)", (reunion, descripcion) + valores + (ahora,))
+            self.conexion.executemany(
+                "DELETE FROM compromisos WHERE id = ? AND estado = ?",
+                [(id_compromiso, ABIERTO) for descripcion, id_compromiso in existentes.items() if descripcion not in nuevos])
+
+            # Los cierres de una generación anterior de esta acta que la IA ya no confirma se reabren.
+            previos = {fila["id"] for fila in self.conexion.execute(
+                "SELECT id FROM compromisos WHERE cerrado_en_reunion = ?", (reunion,))}
+            self.conexion.executemany(
+                "UPDATE compromisos SET estado = ?, cerrado_en_reunion = NULL WHERE id = ?",
+                [(ABIERTO, id_compromiso) for id_compromiso in previos - cumplidos])
+            for id_compromiso in cumplidos - previos:
+                self.conexion.execute(
+                    "UPDATE compromisos SET estado = ?, cerrado_en_reunion = ? WHERE id = ? AND estado = ? AND reunion != ?",
+                    (CUMPLIDO, reunion, id_compromiso, ABIERTO, reunion))
+            cerrados = self.conexion.execute(
+                "SELECT COUNT(*) FROM compromisos WHERE cerrado_en_reunion = ?", (reunion,)).fetchone()[0]
+        return len(nuevos), cerrados
+
+    def previos(self, reunion, limite=MAX_COMPROMISOS_PREVIOS):
+        """
+        Compromisos de otras reuniones tal como estaban antes de `reunion`: los
+        abiertos más los que cerró la propia `reunion` en una generación anterior
+        del acta, para que regenerarla pueda volver a darlos por cumplidos.
+        """
+        return [dict(fila) for fila in self.conexion.execute(
+            "SELECT * FROM compromisos WHERE reunion != ? AND (estado = ? OR cerrado_en_reunion = ?) "
+            "ORDER BY fecha_limite IS NULL, fecha_limite, id LIMIT ?", (reunion, ABIERTO, reunion, limite))]
+
+    def abiertos(self, excluir_reunion=None, responsable=None, limite=MAX_COMPROMISOS_PREVIOS):
+        """Compromisos abiertos ordenados por fecha de cumplimiento (los sin fecha al final)."""
+        condiciones, parametros = ["estado = ?"], [ABIERTO]
+        if excluir_reunion:
+            condiciones.append("reunion != ?")
+            parametros.append(excluir_reunion)
+        if responsable:
+            condiciones.append("responsable_clave = ?")
+            parametros.append(clave_responsable(responsable))
+        sql = (f"SELECT * FROM compromisos WHERE {' AND '.join(condiciones)} "
+               f"ORDER BY fecha_limite IS NULL, fecha_limite, id LIMIT ?")
+        return [dict(fila) for fila in self.conexion.execute(sql, parametros + [limite])]
+
+    def vencidos(self, hoy=None):
+        """Compromisos abiertos cuya fecha de cumplimiento ya pasó."""
+        hoy = hoy or time.strftime('%Y-%m-%d')
+        return [dict(fila) for fila in self.conexion.execute(
+            "SELECT * FROM compromisos WHERE estado = ? AND fecha_limite < ? ORDER BY fecha_limite", (ABIERTO, hoy))]
+
+    def marcar(self, id_compromiso, estado, reunion=None):
+        """Cambia a mano el estado de un compromiso (p. ej. reabrir uno cerrado por error)."""
+        with self.conexion:
+            self.conexion.execute("UPDATE compromisos SET estado = ?, cerrado_en_reunion = ? WHERE id = ?",
+                                  (estado, reunion if estado != ABIERTO else None, id_compromiso))
@@ -3,9 +3,14 @@
 import os
 import json
 import logging
-from huggingface_hub import InferenceClient
-from cryptography.fernet import Fernet
 import sys
+import re
+import math
+import threading
+import contextlib
+import cache_ia
+import resiliencia
+import metricas
 
 # -----------------------------------------------------------------------------
 # CONFIGURACIÓN DE SEGURIDAD Y MODELO
@@ -63,6 +68,7 @@ def _load_hf_token_from_encrypted_file():
         encrypted_token_bytes = encrypted_token_str.encode('utf-8')
 
         # Ahora el proceso de desencriptación es el mismo, pero con los datos correctos
+        from cryptography.fernet import Fernet  # Importación diferida: no pesa en el arranque de la UI
         fernet = Fernet(ENCRYPTION_KEY)
         decrypted_bytes = fernet.decrypt(encrypted_token_bytes) # Usamos los bytes que extrajimos
         
@@ -87,27 +93,211 @@ def _load_hf_token_from_encrypted_file():
         return None
 
 # --- INICIALIZACIÓN DEL CLIENTE DE INFERENCIA ---
-# Se inicializa una sola vez cuando se importa el módulo.
+# Se inicializa una sola vez, en el primer uso (o antes, en segundo plano, con
+# `precalentar_cliente`), para que importar este módulo no cueste la
+# desencriptación ni la importación de huggingface_hub.
 
 client = None
-try:
-    # 1. Llamamos a la función para obtener el token del archivo encriptado.
-    token = _load_hf_token_from_encrypted_file()
-    
-    if not token:
-        # Si no se pudo obtener el token, lanzamos un error para detener la inicialización.
-        raise ValueError("No se pudo obtener el token de Hugging Face desde el archivo de configuración.")
-    
-    # 2. Creamos el cliente de inferencia con el token obtenido.
-    client = InferenceClient(
-        model=MODEL_ID,
-        token=token
-    )
-    logging.info(f"Cliente de Hugging Face inicializado correctamente para el modelo: {MODEL_ID}")
+token = None
+_cliente_intentado = False
+_lock_cliente = threading.Lock()
+
+def obtener_cliente():
+    """Devuelve el InferenceClient, creándolo la primera vez. None si no se pudo crear."""
+    global client, token, _cliente_intentado
+    with _lock_cliente:
+        if _cliente_intentado:
+            return client
+        _cliente_intentado = True
+        try:
+            # 1. Llamamos a la función para obtener el token del archivo encriptado.
+            token = _load_hf_token_from_encrypted_file()
+            
+            if not token:
+                # Si no se pudo obtener el token, lanzamos un error para detener la inicialización.
+                raise ValueError("No se pudo obtener el token de Hugging Face desde el archivo de configuración.")
+            
+            # 2. Creamos el cliente de inferencia con el token obtenido.
+            from huggingface_hub import InferenceClient
+            client = InferenceClient(
+                model=MODEL_ID,
+                token=token
+            )
+            logging.info(f"Cliente de Hugging Face inicializado correctamente para el modelo: {MODEL_ID}")
+
+        except Exception as e:
+            logging.error(f"Error fatal durante la inicialización del cliente de IA: {e}")
+            # 'client' permanecerá como None, y la función de resumen devolverá un error.
+        return client
+
+def precalentar_cliente():
+    """Crea el cliente en un hilo de fondo para que el primer uso no espere."""
+    threading.Thread(target=obtener_cliente, name="PrecalentarIA", daemon=True).start()
+
+# -----------------------------------------------------------------------------
+# ESTIMACIÓN DE TOKENS
+# -----------------------------------------------------------------------------
+# Por defecto, una aproximación por palabras calibrada para el vocabulario de
+# Llama 3 en español. Si la aplicación se distribuye con el tokenizer.json del
+# modelo (y la librería `tokenizers` está instalada) se usa ese archivo local;
+# nunca se descarga nada ni se leen credenciales solo para contar tokens.
+RUTA_TOKENIZADOR_LOCAL = get_path(os.path.join("tokenizador", "tokenizer.json"))
+
+_tokenizador = None
+_tokenizador_intentado = False
+_PATRON_PIEZAS = re.compile(r"[^\W\d_]+|\d+|[^\w\s]|_+")
+
+def _obtener_tokenizador():
+    # Sin lock: si dos hilos llegan a la vez, ambos leen el mismo archivo local y uno gana.
+    global _tokenizador, _tokenizador_intentado
+    if not _tokenizador_intentado:
+        _tokenizador_intentado = True
+        if os.path.exists(RUTA_TOKENIZADOR_LOCAL):
+            try:
+                from tokenizers import Tokenizer
+                _tokenizador = Tokenizer.from_file(RUTA_TOKENIZADOR_LOCAL)
+                logging.info(f"Tokenizador local cargado desde {RUTA_TOKENIZADOR_LOCAL}.")
+            except Exception as e:
+                logging.info(f"Tokenizador local no disponible ({e}); se usará la estimación aproximada.")
+    return _tokenizador
 
-except Exception as e:
-    logging.error(f"Error fatal durante la inicialización del cliente de IA: {e}")
-    # 'client' permanecerá como None, y la función de resumen devolverá un error.
+def estimar_tokens(texto):
+    """Número de tokens que ocupa `texto` en el modelo configurado."""
+    if not texto:
+        return 0
+    tokenizador = _obtener_tokenizador()
+    if tokenizador:
+        return len(tokenizador.encode(texto, add_special_tokens=False).ids)
+
+    total = 0
+    for pieza in _PATRON_PIEZAS.findall(texto):
+        if pieza[0].isdigit():
+            total += math.ceil(len(pieza) / 3)      # Llama 3 agrupa los dígitos de tres en tres
+        elif pieza[0].isalpha():
+            total += 1 + (len(pieza) - 1) // 6      # Palabras largas se parten en varias piezas
+        else:
+            total += 1                              # Signos de puntuación
+    return total
+
+# -----------------------------------------------------------------------------
+# LLAMADA GENÉRICA AL MODELO
+# -----------------------------------------------------------------------------
+
+# Las respuestas se guardan en disco para no pagar dos veces la misma petición.
+# Se puede desactivar por llamada (`usar_cache=False`) o globalmente con la
+# variable de entorno EVARISIS_SIN_CACHE_IA=1.
+cache_respuestas = cache_ia.CacheRespuestas()
+
+# Semáforo opcional que limita las llamadas simultáneas al modelo. Por defecto no
+# hay límite; el procesamiento por lotes (procesar_lote.py) instala uno compartido
+# entre todos sus procesos.
+limite_llamadas = None
+
+def configurar_limite_llamadas(semaforo):
+    """Instala (o quita, con None) el semáforo que acota las llamadas concurrentes al modelo."""
+    global limite_llamadas
+    limite_llamadas = semaforo
+
+def _cache_activa(usar_cache):
+    return usar_cache and os.environ.get("EVARISIS_SIN_CACHE_IA", "").strip() not in ("1", "true", "si", "sí")
+
+def generar_texto_hf(prompt, max_tokens=2048, temperature=0.3, usar_cache=True, al_recibir_texto=None, ruta_parcial=None,
+                     cancelar=None):
+    """
+    Envía un prompt completo al modelo y devuelve el texto generado, o un
+    mensaje que empieza por "[Error" si la llamada falla.
+
+    Si se pasa `al_recibir_texto` o `ruta_parcial`, la respuesta se pide en modo
+    streaming: cada fragmento se añade a `ruta_parcial` (que sobrevive aunque la
+    conexión se corte a mitad) y se notifica con `al_recibir_texto(fragmento, tokens_recibidos)`.
+
+    Si `cancelar` (un threading.Event) se activa, se abandonan los reintentos y
+    el stream en curso y se lanza resiliencia.OperacionCancelada.
+    """
+    if cancelar is not None and cancelar.is_set():
+        raise resiliencia.OperacionCancelada()
+    clave = cache_ia.clave_cache(MODEL_ID, prompt, temperature, max_tokens)
+    if _cache_activa(usar_cache):
+        respuesta = cache_respuestas.obtener(clave)
+        if respuesta is not None:
+            logging.info(f"Respuesta servida desde la caché de IA ({clave[:12]}).")
+            metricas.contar("llm.respuestas_de_cache")
+            if ruta_parcial:
+                with open(ruta_parcial, 'w', encoding='utf-8') as f:
+                    f.write(respuesta)
+            if al_recibir_texto:
+                al_recibir_texto(respuesta, estimar_tokens(respuesta))
+            return respuesta
+
+    cliente = obtener_cliente()
+    if not cliente:
+        return "[Error Crítico: El cliente de IA no está disponible. Revise los logs de inicio.]"
+
+    fragmentos = []
+
+    def _llamar():
+        # Las respuestas servidas desde la caché no cuentan para el límite.
+        with limite_llamadas or contextlib.nullcontext(), metricas.tramo("llm"):
+            if al_recibir_texto or ruta_parcial:
+                return _generar_en_streaming(cliente, prompt, max_tokens, temperature, al_recibir_texto, ruta_parcial, fragmentos,
+                                             cancelar)
+            response = cliente.chat.completions.create(
+                messages=[{"role": "user", "content": prompt}],
+                max_tokens=max_tokens,
+                temperature=temperature,
+                stream=False
+            )
+            return response.choices[0].message.content.strip()
+
+    def _es_transitorio(error):
+        # Un stream que ya entregó texto no se repite: se duplicaría la vista previa.
+        return resiliencia.es_error_transitorio(error) and not fragmentos
+
+    try:
+        # Reintentos con espera, circuito y límite de peticiones por minuto (ver resiliencia.py).
+        respuesta = resiliencia.servicio("huggingface").ejecutar(_llamar, es_transitorio=_es_transitorio, cancelar=cancelar)
+        # Con la caché desactivada se refresca igualmente la entrada, para que
+        # un "regenerar sin caché" deje guardada la respuesta nueva.
+        cache_respuestas.guardar(clave, respuesta)
+        return respuesta
+
+    except resiliencia.OperacionCancelada:
+        logging.info("Llamada a la IA cancelada.")
+        raise
+    except Exception as e:
+        metricas.contar("llm.errores")
+        logging.error(f"Error en la llamada a la API de Hugging Face: {e}")
+        if ruta_parcial and os.path.exists(ruta_parcial):
+            logging.info(f"La respuesta parcial recibida hasta el error se conserva en: {ruta_parcial}")
+        return f"[Error al procesar con IA: {str(e)}]"
+
+def _generar_en_streaming(cliente, prompt, max_tokens, temperature, al_recibir_texto, ruta_parcial, fragmentos, cancelar=None):
+    """Consume la respuesta fragmento a fragmento en `fragmentos`, volcándola a disco según llega."""
+    archivo = open(ruta_parcial, 'w', encoding='utf-8') if ruta_parcial else None
+    try:
+        stream = cliente.chat.completions.create(
+            messages=[{"role": "user", "content": prompt}],
+            max_tokens=max_tokens,
+            temperature=temperature,
+            stream=True
+        )
+        for chunk in stream:
+            if cancelar is not None and cancelar.is_set():
+                raise resiliencia.OperacionCancelada()
+            fragmento = chunk.choices[0].delta.content if chunk.choices else None
+            if not fragmento:
+                continue
+            fragmentos.append(fragmento)
+            if archivo:
+                archivo.write(fragmento)
+                archivo.flush()
+            if al_recibir_texto:
+                # Cada fragmento del stream corresponde a un token generado.
+                al_recibir_texto(fragmento, len(fragmentos))
+    finally:
+        if archivo:
+            archivo.close()
+    return "".join(fragmentos).strip()
 
 # -----------------------------------------------------------------------------
 # FUNCIÓN PRINCIPAL (SIN CAMBIOS)
@@ -118,7 +308,7 @@ def resumir_intervencion_hf(texto_literal, hablante, participantes):
     Toma una transcripción literal y utiliza un LLM de Hugging Face
     para generar una entrada de acta formal.
     """
-    if not client:
+    if not obtener_cliente():
         return "[Error Crítico: El cliente de IA no está disponible. Revise los logs de inicio.]"
 
     if not texto_literal or texto_literal.startswith("["):
@@ -148,20 +338,8 @@ Eres un asistente ejecutivo experto en la redacción de actas de reuniones de ge
 **Entrada de Acta (Produce únicamente el texto para el acta):**
 """
 
-    try:
-        logging.info(f"Enviando petición a Hugging Face para el hablante: {hablante}")
-        
-        response = client.chat.completions.create(
-            messages=[{"role": "user", "content": prompt}],
-            max_tokens=2048,
-            temperature=0.3,
-            stream=False
-        )
-        
-        resumen = response.choices[0].message.content.strip()
+    logging.info(f"Enviando petición a Hugging Face para el hablante: {hablante}")
+    resumen = generar_texto_hf(prompt, max_tokens=2048, temperature=0.3)
+    if not resumen.startswith("[Error"):
         logging.info(f"Respuesta recibida de Hugging Face para {hablante}")
-        return resumen
-
-    except Exception as e:
-        logging.error(f"Error en la llamada a la API de Hugging Face: {e}")
-        return f"[Error al procesar con IA: {str(e)}]"
\ No newline at end of file
+    return resumen
\ No newline at end of file
@@ -0,0 +1,204 @@
+# indice_busqueda.py
+# Índice de búsqueda de texto completo sobre todas las reuniones archivadas.
+# Cada diálogo transcrito y cada párrafo del acta oficial se guardan en una tabla
+# FTS5 de SQLite, con la reunión, el diálogo, el hablante y el archivo de audio.
+# El índice es incremental: solo se vuelven a leer las carpetas cuyo proyecto,
+# diario o acta cambiaron desde la última actualización.
+#
+# Uso:
+#   python indice_busqueda.py "migración del servidor" [--hablante NOMBRE] [--reunion CARPETA]
+
+import os
+import sys
+import time
+import sqlite3
+import logging
+import argparse
+
+import asistente_reuniones_gerencia_logic as arl_gerencia
+
+RUTA_INDICE = os.path.join(arl_gerencia.RUTA_EVARISIS, '.indice_busqueda.sqlite3')
+NOMBRE_PROYECTO = "proyecto_reunion.json"
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS reuniones (
+    carpeta TEXT PRIMARY KEY,
+    titulo TEXT,
+    firma TEXT NOT NULL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS textos USING fts5(
+    contenido,
+    hablante,
+    carpeta UNINDEXED,
+    tipo UNINDEXED,
+    id_dialogo UNINDEXED,
+    archivo_audio UNINDEXED,
+    tokenize = 'unicode61 remove_diacritics 2'
+);
+"""
+
+
+def _ruta_acta_markdown(ruta_proyecto_json):
+    return os.path.splitext(arl_gerencia.get_ruta_acta_oficial(ruta_proyecto_json))[0] + ".md"
+
+
+def _firma(ruta_proyecto_json):
+    """Identifica el estado de los archivos de los que sale el texto de una reunión."""
+    partes = []
+    for ruta in (ruta_proyecto_json, arl_gerencia.get_ruta_diario(ruta_proyecto_json), _ruta_acta_markdown(ruta_proyecto_json)):
+        try:
+            estado = os.stat(ruta)
+            partes.append(f"{estado.st_mtime_ns}:{estado.st_size}")
+        except OSError:
+            partes.append("-")
+    return "|".join(partes)
+
+
+def _parrafos_acta(texto_md):
+    """Parte el acta en párrafos para que cada resultado apunte a un fragmento concreto."""
+    return [p.strip() for p in texto_md.replace('\r\n', '\n').split('\n\n') if p.strip()]
+
+
+def _consulta_fts(consulta):
+    """Convierte texto libre en una consulta FTS5 que exige todas las palabras (sin operadores)."""
+    terminos = [t.replace('"', '""') for t in consulta.split()]
+    return " ".join(f'"{t}"' for t in terminos)
+
+
+class IndiceBusqueda:
+    def __init__(self, ruta_indice=RUTA_INDICE):
+        os.makedirs(os.path.dirname(ruta_indice), exist_ok=True)
+        self.conexion = sqlite3.connect(ruta_indice)
+        self.conexion.row_factory = sqlite3.Row
+        self.conexion.executescript(_ESQUEMA)
+
+    def cerrar(self):
+        self.conexion.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+    def actualizar(self, raiz=arl_gerencia.RUTA_EVARISIS):
+        """
+        Sincroniza el índice con las carpetas de `raiz`. Devuelve (reuniones
+        reindexadas, reuniones eliminadas del índice).
+        """
+        raiz = os.path.abspath(raiz)
+        en_disco = {}
+        for nombre in os.listdir(raiz) if os.path.isdir(raiz) else []:
+            ruta_json = os.path.join(raiz, nombre, NOMBRE_PROYECTO)
+            if not nombre.startswith(".") and os.path.isfile(ruta_json):
+                en_disco[os.path.join(raiz, nombre)] = ruta_json
+
+        indexadas = {fila["carpeta"]: fila["firma"] for fila in self.conexion.execute("SELECT carpeta, firma FROM reuniones")}
+        eliminadas = [c for c in indexadas if c not in en_disco and os.path.dirname(c) == raiz]
+        reindexadas = 0
+        with self.conexion:
+            for carpeta in eliminadas:
+                self._borrar_reunion(carpeta)
+            for carpeta, ruta_json in en_disco.items():
+                firma = _firma(ruta_json)
+                if indexadas.get(carpeta) == firma:
+                    continue
+                try:
+                    self._indexar_reunion(carpeta, ruta_json, firma)
+                    reindexadas += 1
+                except Exception as e:
+                    logging.warning(f"No se pudo indexar la reunión {carpeta}: {e}")
+        return reindexadas, len(eliminadas)
+
+    def _borrar_reunion(self, carpeta):
+        self.conexion.execute("DELETE FROM textos WHERE carpeta = ?", (carpeta,))
+        self.conexion.execute("DELETE FROM reuniones WHERE carpeta = ?", (carpeta,))
+
+    def _indexar_reunion(self, carpeta, ruta_json, firma):
+        proyecto_info = arl_gerencia.cargar_proyecto(ruta_json)
+        self._borrar_reunion(carpeta)
+        filas = [
+            (d["texto_transcrito"], d.get("hablante", ""), carpeta, "dialogo", d["id"], d.get("archivo_audio"))
+            for d in proyecto_info.get("dialogos", [])
+            if d.get("texto_transcrito") and not d["texto_transcrito"].startswith("[")
+        ]
+        ruta_md = _ruta_acta_markdown(ruta_json)
+        if os.path.exists(ruta_md):
+            with open(ruta_md, 'r', encoding='utf-8') as f:
+                filas += [(p, "", carpeta, "acta", None, None) for p in _parrafos_acta(f.read())]
+        self.conexion.executemany(
+            "INSERT INTO textos (contenido, hablante, carpeta, tipo, id_dialogo, archivo_audio) VALUES (?, ?, ?, ?, ?, ?)", filas
+        )
+        self.conexion.execute("INSERT INTO reuniones (carpeta, titulo, firma) VALUES (?, ?, ?)",
+                              (carpeta, proyecto_info.get("titulo"), firma))
+
+    def buscar(self, consulta, hablante=None, reunion=None, tipo=None, limite=20):
+        """
+        Devuelve los fragmentos que contienen todas las palabras de `consulta`,
+        ordenados por relevancia. Cada resultado trae la reunión, el tipo
+        ("dialogo" o "acta"), el id y hablante del diálogo, un extracto con las
+        coincidencias entre corchetes y la ruta completa del audio.
+        """
+        consulta_fts = _consulta_fts(consulta)
+        if not consulta_fts:
+            return []
+        if hablante:
+            # El filtro por hablante es una segunda condición FTS sobre su columna.
+            consulta_fts = f"({consulta_fts}) AND hablante : ({_consulta_fts(hablante)})"
+        condiciones, parametros = ["textos MATCH ?"], [consulta_fts]
+        if reunion:
+            condiciones.append("carpeta LIKE ?")
+            parametros.append(f"%{reunion}%")
+        if tipo:
+            condiciones.append("tipo = ?")
+            parametros.append(tipo)
+        sql = (f"SELECT carpeta, tipo, id_dialogo, hablante, archivo_audio, "
+               f"snippet(textos, 0, '[', ']', '…', 16) AS fragmento "
+               f"FROM textos WHERE {' AND '.join(condiciones)} ORDER BY rank LIMIT ?")
+        resultados = []
+        for fila in self.conexion.execute(sql, parametros + [limite]):
+            resultado = dict(fila)
+            resultado["reunion"] = os.path.basename(resultado["carpeta"])
+            if resultado["archivo_audio"]:
+                resultado["archivo_audio"] = os.path.join(resultado["carpeta"], resultado["archivo_audio"])
+            resultados.append(resultado)
+        return resultados
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Busca texto en los diálogos y actas de todas las reuniones guardadas.")
+    parser.add_argument("consulta", nargs="?", help="Palabras a buscar (se exigen todas).")
+    parser.add_argument("--hablante", help="Solo intervenciones de este hablante.")
+    parser.add_argument("--reunion", help="Solo reuniones cuya carpeta contenga este texto.")
+    parser.add_argument("--solo-actas", action="store_true", help="Buscar solo en las actas oficiales.")
+    parser.add_argument("--limite", type=int, default=20, help="Número máximo de resultados.")
+    parser.add_argument("--raiz", default=arl_gerencia.RUTA_EVARISIS, help="Carpeta que contiene una subcarpeta por reunión.")
+    parser.add_argument("--indice", default=RUTA_INDICE, help="Archivo SQLite del índice.")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.WARNING, format='%(levelname)s | %(message)s')
+
+    with IndiceBusqueda(args.indice) as indice:
+        inicio = time.perf_counter()
+        reindexadas, eliminadas = indice.actualizar(args.raiz)
+        if reindexadas or eliminadas:
+            print(f"Índice actualizado: {reindexadas} reuniones reindexadas, {eliminadas} eliminadas "
+                  f"({(time.perf_counter() - inicio) * 1000:.0f} ms).")
+        if not args.consulta:
+            return 0
+
+        inicio = time.perf_counter()
+        resultados = indice.buscar(args.consulta, hablante=args.hablante, reunion=args.reunion,
+                                   tipo="acta" if args.solo_actas else None, limite=args.limite)
+        duracion_ms = (time.perf_counter() - inicio) * 1000
+
+    for r in resultados:
+        if r["tipo"] == "dialogo":
+            print(f"{r['reunion']} · Diálogo {r['id_dialogo']} · {r['hablante']}\n    {r['fragmento']}\n    Audio: {r['archivo_audio']}")
+        else:
+            print(f"{r['reunion']} · Acta oficial\n    {r['fragmento']}")
+    print(f"{len(resultados)} resultados en {duracion_ms:.1f} ms.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,206 @@
+# integrantes.py
+# Directorio de integrantes de Gerencia: áreas, personas y cargos fijos.
+# Se lee una vez de la carpeta de datos central y se vuelve a leer solo cuando
+# cambia alguno de sus archivos (se comparan fecha de modificación y tamaño).
+#
+# Las áreas se definen en `areas.json` dentro de la carpeta de datos; para añadir
+# un área basta con crear su .txt (un nombre por línea) y añadirla allí:
+#   {"areas": {"Soporte": "soporte.txt", ...},
+#    "jefe": "Nombre del jefe", "secretaria": "Nombre de la secretaria"}
+# Si no existe `areas.json` se usan AREAS_POR_DEFECTO, JEFE_POR_DEFECTO y SECRETARIA_POR_DEFECTO.
+
+import os
+import json
+import time
+import bisect
+import difflib
+import logging
+import threading
+import unicodedata
+
+NOMBRE_CONFIG_AREAS = "areas.json"
+INTERVALO_COMPROBACION_S = 2.0   # Como mucho, una comprobación de cambios en disco cada tanto
+UMBRAL_SIMILITUD = 0.75          # Parecido mínimo de una palabra para la búsqueda aproximada
+
+AREAS_POR_DEFECTO = {
+    "Innovación y Desarrollo": "innovacion_y_desarrollo.txt",
+    "Soporte": "soporte.txt",
+    "Gestión del Dato": "gestion_del_dato.txt",
+    "Gestión de la Información": "gestion_de_la_informacion.txt"
+}
+JEFE_POR_DEFECTO = "Diego mauricio peña Bolaños"
+SECRETARIA_POR_DEFECTO = "Luz Adriana Ricardo"
+
+
+def normalizar(texto):
+    """Minúsculas y sin tildes, para que 'pena' encuentre a 'Peña'."""
+    descompuesto = unicodedata.normalize('NFKD', texto.casefold())
+    return "".join(c for c in descompuesto if not unicodedata.combining(c))
+
+
+def leer_nombres(ruta_archivo):
+    """Lee un archivo .txt y devuelve una lista de nombres."""
+    try:
+        with open(ruta_archivo, 'r', encoding='utf-8') as f:
+            return [line.strip() for line in f if line.strip()]
+    except FileNotFoundError:
+        return []
+
+
+def _firma(rutas):
+    """(mtime, tamaño) de cada archivo; cambia si alguno se edita, aparece o desaparece."""
+    firma = []
+    for ruta in rutas:
+        try:
+            estado = os.stat(ruta)
+            firma.append((ruta, estado.st_mtime_ns, estado.st_size))
+        except OSError:
+            firma.append((ruta, None, None))
+    return tuple(firma)
+
+
+class DirectorioIntegrantes:
+    def __init__(self, ruta_datos):
+        self.ruta_datos = ruta_datos
+        self._lock = threading.Lock()
+        self._firma = None
+        self._comprobado_en = 0.0
+        self._config = {}
+        self._integrantes = []
+        self._palabras = []   # (palabra normalizada, índice en _integrantes), ordenado para búsqueda por prefijo
+
+    def _ruta_config(self):
+        return os.path.join(self.ruta_datos, NOMBRE_CONFIG_AREAS)
+
+    def _leer_config(self):
+        config = {"areas": AREAS_POR_DEFECTO, "jefe": JEFE_POR_DEFECTO, "secretaria": SECRETARIA_POR_DEFECTO}
+        ruta = self._ruta_config()
+        if os.path.exists(ruta):
+            try:
+                with open(ruta, 'r', encoding='utf-8') as f:
+                    config.update(json.load(f))
+            except (OSError, json.JSONDecodeError) as e:
+                logging.error(f"No se pudo leer {ruta} ({e}); se usan las áreas por defecto.")
+        return config
+
+    def _rutas_vigiladas(self, config):
+        return [self._ruta_config()] + [os.path.join(self.ruta_datos, f) for f in config["areas"].values()]
+
+    def _actualizar(self):
+        """Relee el directorio si cambió algún archivo. Se llama con el lock tomado."""
+        ahora = time.monotonic()
+        if self._firma is not None and ahora - self._comprobado_en < INTERVALO_COMPROBACION_S:
+            return
+        self._comprobado_en = ahora
+        # areas.json es siempre la primera ruta vigilada: solo se vuelve a leer si cambió.
+        config = self._config if self._firma and _firma([self._ruta_config()]) == self._firma[:1] else self._leer_config()
+        firma = _firma(self._rutas_vigiladas(config))
+        if firma == self._firma:
+            return
+
+        todos = []
+        for area, archivo in config["areas"].items():
+            for nombre in leer_nombres(os.path.join(self.ruta_datos, archivo)):
+                todos.append((nombre, area))
+        todos.sort(key=lambda x: x[0])
+
+        palabras = []
+        for i, (nombre, area) in enumerate(todos):
+            palabras.extend((palabra, i) for palabra in set(normalizar(f"{nombre} {area}").split()))
+        palabras.sort()
+
+        self._config, self._firma = config, firma
+        self._integrantes, self._palabras = todos, palabras
+        logging.info(f"Directorio de integrantes cargado: {len(todos)} personas en {len(config['areas'])} áreas.")
+
+    def integrantes(self):
+        """Lista de tuplas (nombre, area) ordenada por nombre."""
+        with self._lock:
+            self._actualizar()
+            return list(self._integrantes)
+
+    def areas(self):
+        with self._lock:
+            self._actualizar()
+            return list(self._config["areas"])
+
+    @property
+    def jefe(self):
+        with self._lock:
+            self._actualizar()
+            return self._config["jefe"]
+
+    @property
+    def secretaria(self):
+        with self._lock:
+            self._actualizar()
+            return self._config["secretaria"]
+
+    def _por_prefijo(self, termino):
+        """Índices de los integrantes con alguna palabra (del nombre o del área) que empieza por `termino`."""
+        posicion = bisect.bisect_left(self._palabras, (termino,))
+        encontrados = set()
+        while posicion < len(self._palabras) and self._palabras[posicion][0].startswith(termino):
+            encontrados.add(self._palabras[posicion][1])
+            posicion += 1
+        return encontrados
+
+    def _parecidos(self, termino):
+        """Índices con alguna palabra parecida a `termino` (errores de tecleo), con su mejor similitud."""
+        mejores = {}
+        comparador = difflib.SequenceMatcher(b=termino, autojunk=False)
+        for palabra, indice in self._palabras:
+            # Se compara con el comienzo de la palabra: mientras se escribe, el término es un prefijo incompleto.
+            comparador.set_seq1(palabra[:len(termino) + 2])
+            if comparador.real_quick_ratio() < UMBRAL_SIMILITUD or comparador.quick_ratio() < UMBRAL_SIMILITUD:
+                continue
+            similitud = comparador.ratio()
+            if similitud >= UMBRAL_SIMILITUD and similitud > mejores.get(indice, 0):
+                mejores[indice] = similitud
+        return mejores
+
+    def buscar(self, texto, limite=None):
+        """
+        Integrantes (nombre, area) que coinciden con `texto` para el filtro de la
+        interfaz. Cada palabra escrita debe ser el comienzo de alguna palabra del
+        nombre o del área, sin distinguir tildes ni mayúsculas; si no hay
+        coincidencias exactas suficientes se completan con nombres parecidos.
+        """
+        terminos = normalizar(texto).split()
+        with self._lock:
+            self._actualizar()
+            todos = self._integrantes
+            if not terminos:
+                return list(todos[:limite])
+
+            exactos = None
+            for termino in terminos:
+                indices = self._por_prefijo(termino)
+                exactos = indices if exactos is None else exactos & indices
+            resultado = [todos[i] for i in sorted(exactos)]
+            if limite is not None and len(resultado) >= limite:
+                return resultado[:limite]
+
+            puntuaciones = None
+            for termino in terminos:
+                parecidos = self._parecidos(termino)
+                for i in self._por_prefijo(termino):
+                    parecidos[i] = 1.0
+                puntuaciones = parecidos if puntuaciones is None else {
+                    i: min(p, parecidos[i]) for i, p in puntuaciones.items() if i in parecidos}
+            aproximados = sorted((i for i in puntuaciones if i not in exactos), key=lambda i: (-puntuaciones[i], i))
+            resultado.extend(todos[i] for i in aproximados)
+            return resultado[:limite]
+
+
+_directorios = {}
+_lock_directorios = threading.Lock()
+
+
+def directorio(ruta_datos):
+    """Devuelve el directorio compartido de esa carpeta de datos, creándolo la primera vez."""
+    clave = os.path.abspath(ruta_datos)
+    with _lock_directorios:
+        if clave not in _directorios:
+            _directorios[clave] = DirectorioIntegrantes(ruta_datos)
+        return _directorios[clave]
@@ -0,0 +1,134 @@
+# linea_de_tiempo.py
+# Índice temporal de una reunión: cuándo empezó cada intervención, en qué muestra
+# del flujo continuo de captura, cuánto duró y dónde empiezan sus datos en su archivo.
+# Se guarda en proyecto_reunion.json bajo "linea_de_tiempo" y permite saltar a
+# cualquier momento, calcular tiempos de palabra y conocer la hora de inicio y fin
+# sin decodificar audio.
+#
+# Formato:
+#   "linea_de_tiempo": {
+#       "frecuencia": 16000, "canales": 1, "ancho_muestra": 2,
+#       "intervenciones": [
+#           {"id": 1, "hablante": "...", "archivo_audio": "dialogo_1.wav",
+#            "inicio": "2025-03-04T09:02:11.250", "muestra_inicio": 48000,
+#            "muestras": 320000, "duracion_s": 20.0, "byte_datos": 44},
+#           ...
+#       ]
+#   }
+# `muestra_inicio` se cuenta sobre el flujo continuo de la reunión, que no se
+# guarda: sirve para ordenar y situar las intervenciones en el tiempo. Para leer
+# el audio, la primera muestra de cada intervención es la primera de su archivo
+# y `byte_datos` es dónde empieza el PCM dentro de él (None en .flac/.opus, que
+# no tienen un byte por muestra: ahí hay que buscar por muestra o por tiempo).
+# Los diálogos grabados sin el servicio de captura solo tienen duración: su
+# `inicio` y su `muestra_inicio` van a None.
+
+import bisect
+from datetime import datetime
+from almacenamiento_audio import TAMANO_CABECERA_WAV
+
+
+def _iso(marca_tiempo):
+    return datetime.fromtimestamp(marca_tiempo).isoformat(timespec='milliseconds')
+
+
+def _byte_datos(archivo_audio):
+    """Byte donde empieza el PCM en el archivo: solo los .wav guardan las muestras tal cual."""
+    return TAMANO_CABECERA_WAV if archivo_audio.lower().endswith(".wav") else None
+
+
+def entrada(id_dialogo, hablante, archivo_audio, frecuencia, segmento=None, duracion_s=None):
+    """
+    Construye la entrada de una intervención guardada en `archivo_audio` (nombre
+    dentro de la carpeta de la reunión). `segmento` es lo que devuelve
+    `ServicioCaptura.terminar_segmento()`; sin él se usa `duracion_s`.
+    """
+    if segmento:
+        muestras = segmento["muestra_fin"] - segmento["muestra_inicio"]
+        return {
+            "id": id_dialogo,
+            "hablante": hablante,
+            "archivo_audio": archivo_audio,
+            "inicio": _iso(segmento["hora_inicio"]),
+            "muestra_inicio": segmento["muestra_inicio"],
+            "muestras": muestras,
+            "duracion_s": round(muestras / frecuencia, 3),
+            "byte_datos": _byte_datos(archivo_audio),
+        }
+    return {
+        "id": id_dialogo,
+        "hablante": hablante,
+        "archivo_audio": archivo_audio,
+        "inicio": None,
+        "muestra_inicio": None,
+        "muestras": int(round((duracion_s or 0) * frecuencia)),
+        "duracion_s": round(duracion_s or 0, 3),
+        "byte_datos": _byte_datos(archivo_audio),
+    }
+
+
+def crear(intervenciones, frecuencia, canales, ancho_muestra):
+    return {"frecuencia": frecuencia, "canales": canales, "ancho_muestra": ancho_muestra, "intervenciones": intervenciones}
+
+
+def horario(proyecto_info):
+    """(inicio, fin) de la reunión como datetime, o (None, None) si no hay marcas de tiempo."""
+    linea = proyecto_info.get("linea_de_tiempo") or {}
+    con_hora = [i for i in linea.get("intervenciones", []) if i.get("inicio")]
+    if not con_hora:
+        return None, None
+    inicio = min(datetime.fromisoformat(i["inicio"]) for i in con_hora)
+    fin = max(datetime.fromisoformat(i["inicio"]).timestamp() + i["duracion_s"] for i in con_hora)
+    return inicio, datetime.fromtimestamp(fin)
+
+
+def estadisticas_de_habla(proyecto_info):
+    """
+    Tiempo de palabra por hablante: {hablante: {"intervenciones", "segundos", "porcentaje"}},
+    ordenado de mayor a menor.
+    """
+    linea = proyecto_info.get("linea_de_tiempo") or {}
+    por_hablante = {}
+    for i in linea.get("intervenciones", []):
+        datos = por_hablante.setdefault(i["hablante"], {"intervenciones": 0, "segundos": 0.0})
+        datos["intervenciones"] += 1
+        datos["segundos"] += i["duracion_s"]
+    total = sum(d["segundos"] for d in por_hablante.values()) or 1.0
+    for datos in por_hablante.values():
+        datos["segundos"] = round(datos["segundos"], 1)
+        datos["porcentaje"] = round(100 * datos["segundos"] / total, 1)
+    return dict(sorted(por_hablante.items(), key=lambda kv: kv[1]["segundos"], reverse=True))
+
+
+def localizar(proyecto_info, segundos_desde_inicio):
+    """
+    Intervención que estaba sonando `segundos_desde_inicio` después de empezar la
+    captura, o None si en ese momento nadie tenía la palabra. Devuelve un dict con
+    el `dialogo` del proyecto, su `archivo_audio` y la posición dentro de ese
+    archivo: `segundo`, `muestra` y `byte` (None si el archivo está comprimido).
+    `dialogo` es None si el proyecto ya no tiene un diálogo con ese id (p. ej. se
+    editó a mano); la posición en el archivo sigue siendo válida.
+    """
+    linea = proyecto_info.get("linea_de_tiempo") or {}
+    frecuencia = linea.get("frecuencia", 16000)
+    alineacion = linea.get("ancho_muestra", 2) * linea.get("canales", 1)
+    intervenciones = sorted((i for i in linea.get("intervenciones", []) if i.get("muestra_inicio") is not None),
+                            key=lambda i: i["muestra_inicio"])
+    muestra = int(segundos_desde_inicio * frecuencia)
+    pos = bisect.bisect_right([i["muestra_inicio"] for i in intervenciones], muestra) - 1
+    if pos < 0:
+        return None
+    intervencion = intervenciones[pos]
+    desplazamiento = muestra - intervencion["muestra_inicio"]
+    if desplazamiento >= intervencion["muestras"]:
+        return None
+    dialogo = next((d for d in proyecto_info.get("dialogos", []) if d["id"] == intervencion["id"]), None)
+    archivo_audio = intervencion.get("archivo_audio") or (dialogo or {}).get("archivo_audio")
+    byte_datos = _byte_datos(archivo_audio) if archivo_audio else None
+    return {
+        "dialogo": dialogo,
+        "archivo_audio": archivo_audio,
+        "segundo": desplazamiento / frecuencia,
+        "muestra": desplazamiento,
+        "byte": byte_datos + desplazamiento * alineacion if byte_datos is not None else None,
+    }
@@ -1,10 +1,25 @@
 ##logger.py:
 import sys
 import logging
+import logging.handlers
 import os
+import gzip
+import json
+import queue
+import atexit
+import shutil
 from datetime import datetime
 
 _logger_configurado = False
+_listener = None
+
+# --- Rotación de los archivos de log ---
+# Por tamaño (por defecto) o diaria, a medianoche, con EVARISIS_LOG_ROTACION=diaria.
+# Los archivos rotados se comprimen con gzip.
+MAX_BYTES_LOG = 5 * 1024 * 1024
+COPIAS_LOG = 5          # Archivos rotados que se conservan con rotación por tamaño
+DIAS_LOG = 14           # Archivos rotados que se conservan con rotación diaria
+FORMATO_LOG = '%(asctime)s | %(levelname)-8s | %(threadName)-10s | %(message)s'
 
 def _get_log_filepath():
     """Determina la ruta correcta para el archivo de log."""
@@ -24,7 +39,7 @@ def _handle_unhandled_exception(exc_type, exc_value, exc_traceback):
         # No registrar el Ctrl+C del usuario como un error.
         sys.__excepthook__(exc_type, exc_value, exc_traceback)
         return
-    
+
     # Registra el error no manejado con el nivel CRITICAL.
     # exc_info=True adjunta el traceback completo al mensaje de log.
     logging.critical("Excepción no manejada atrapada por el hook:", exc_info=(exc_type, exc_value, exc_traceback))
@@ -46,25 +61,91 @@ class StreamToLogger:
         # Necesario para la interfaz de stream.
         pass
 
-def setup_global_logger():
+class FormateadorJSON(logging.Formatter):
+    """
+    Una línea JSON por registro, para analizar los logs después. Lo que se pase
+    en `extra={"datos": {...}}` se añade tal cual bajo la clave "datos".
+    """
+    def format(self, record):
+        entrada = {
+            "ts": datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            "nivel": record.levelname,
+            "logger": record.name,
+            "hilo": record.threadName,
+            "proceso": record.process,
+            "modulo": record.module,
+            "linea": record.lineno,
+            "mensaje": record.getMessage(),
+        }
+        if getattr(record, "datos", None) is not None:
+            entrada["datos"] = record.datos
+        return json.dumps(entrada, ensure_ascii=False, default=str)
+
+def _nombre_comprimido(nombre):
+    return nombre + ".gz"
+
+def _rotar_comprimiendo(origen, destino):
+    """Sustituye al renombrado de la rotación: guarda el archivo rotado comprimido."""
+    with open(origen, 'rb') as f_origen, gzip.open(destino, 'wb') as f_destino:
+        shutil.copyfileobj(f_origen, f_destino)
+    os.remove(origen)
+
+def _crear_handler_archivo(ruta, rotacion):
+    if rotacion == "diaria":
+        handler = logging.handlers.TimedRotatingFileHandler(ruta, when='midnight', backupCount=DIAS_LOG, encoding='utf-8')
+    else:
+        handler = logging.handlers.RotatingFileHandler(ruta, maxBytes=MAX_BYTES_LOG, backupCount=COPIAS_LOG, encoding='utf-8')
+    handler.namer = _nombre_comprimido
+    handler.rotator = _rotar_comprimiendo
+    return handler
+
+def _detener_listener():
+    """Vacía la cola de registros pendientes al salir del programa."""
+    global _listener
+    if _listener:
+        _listener.stop()
+        _listener = None
+
+def setup_global_logger(json_lines=None, rotacion=None):
     """
     Configura el logger global para toda la aplicación.
     Debe llamarse UNA SOLA VEZ al inicio del programa principal.
+
+    Los hilos que registran (interfaz, captura de audio, transcripción) solo
+    encolan el mensaje; un QueueListener en su propio hilo escribe en disco y
+    rota los archivos. Con `json_lines` (o EVARISIS_LOG_JSON=1) se escribe
+    además `evaris_main.jsonl` con un registro JSON por línea.
     """
-    global _logger_configurado
+    global _logger_configurado, _listener
     if _logger_configurado:
         return
 
     log_filepath = _get_log_filepath()
+    if json_lines is None:
+        json_lines = os.environ.get("EVARISIS_LOG_JSON", "").strip().lower() in ("1", "true", "si", "sí")
+    rotacion = rotacion or os.environ.get("EVARISIS_LOG_ROTACION", "tamano").strip().lower()
+
+    handler_texto = _crear_handler_archivo(log_filepath, rotacion)
+    handler_texto.setFormatter(logging.Formatter(FORMATO_LOG))
+    handlers = [handler_texto]
+    if json_lines:
+        handler_json = _crear_handler_archivo(os.path.splitext(log_filepath)[0] + ".jsonl", rotacion)
+        handler_json.setFormatter(FormateadorJSON())
+        handlers.append(handler_json)
 
-    # Configuración base del logging para escribir a un archivo
-    logging.basicConfig(
-        level=logging.INFO,
-        format='%(asctime)s | %(levelname)-8s | %(threadName)-10s | %(message)s',
-        handlers=[
-            logging.FileHandler(log_filepath, mode='a', encoding='utf-8')
-        ]
-    )
+    cola = queue.SimpleQueue()
+    _listener = logging.handlers.QueueListener(cola, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_detener_listener)
+
+    # Se reemplazan los handlers que otros módulos hayan instalado con basicConfig
+    # al importarse; si no, el archivo de log nunca llegaría a configurarse.
+    raiz = logging.getLogger()
+    for handler in raiz.handlers[:]:
+        raiz.removeHandler(handler)
+        handler.close()
+    raiz.addHandler(logging.handlers.QueueHandler(cola))
+    raiz.setLevel(logging.INFO)
 
     # --- CAMBIO DE ESTRATEGIA ---
     # 1. Asignamos nuestro hook para excepciones fatales. ESTA ES LA SOLUCIÓN CLAVE.
@@ -75,12 +156,12 @@ def setup_global_logger():
     sys.stdout = StreamToLogger(logging.getLogger('STDOUT'), logging.INFO)
 
     _logger_configurado = True
-    
+
     # Mensaje inicial para confirmar que el logger está vivo
     prog_name = os.path.basename(sys.executable if getattr(sys, 'frozen', False) else sys.argv[0])
     print("="*60)
     print(f"LOGGER GLOBAL INICIALIZADO POR: {prog_name}")
     print(f"Toda la salida de 'print' y los errores fatales serán registrados.")
-    print(f"Archivo de log: {log_filepath}")
+    print(f"Archivo de log: {log_filepath}{' (+ .jsonl)' if json_lines else ''}, rotación: {rotacion}")
     print(f"Hora de inicio de sesión: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-    print("="*60)
\ No newline at end of file
+    print("="*60)
@@ -0,0 +1,172 @@
+# metricas.py
+# Medición ligera de tiempos y contadores durante el procesamiento de una reunión.
+# Cada ejecución (transcripción, acta oficial) abre un Registro; el código que se
+# mide dentro de ella usa `tramo("nombre")`, `contar()` y `observar()`, que no
+# hacen nada si no hay ejecución en curso. El registro viaja en un ContextVar, así
+# que los hilos de los pools deben lanzarse con `propagar()` para heredarlo.
+# Al terminar, el informe se añade a `metricas.json` en la carpeta de la reunión.
+#
+# Formato de metricas.json:
+#   {"ejecuciones": [
+#       {"etapa": "transcripcion", "inicio": "...", "duracion_s": 812.4, "ok": true,
+#        "tramos": {"reconocedor": {"n": 40, "total_s": 700.1, "p50_s": ..., "p90_s": ..., "p99_s": ..., "max_s": ...}},
+#        "contadores": {"reintentos.google": 3, "timeouts.reconocedor": 1},
+#        "histogramas": {"audio_s_por_dialogo": {"limites": [...], "cuentas": [...], "n": 40, "suma": 1834.2}},
+#        ...datos propios de la etapa}
+#   ]}
+
+import os
+import json
+import math
+import time
+import bisect
+import logging
+import threading
+import contextlib
+import contextvars
+
+NOMBRE_INFORME = "metricas.json"
+MAX_EJECUCIONES = 50   # Ejecuciones que se conservan por reunión (las más recientes)
+LIMITES_HISTOGRAMAS = {
+    "audio_s_por_dialogo": [5, 15, 30, 60, 120, 300, 600],
+}
+LIMITES_POR_DEFECTO = [0.01, 0.1, 1, 10, 100, 1000]
+
+_registro_actual = contextvars.ContextVar("registro_metricas", default=None)
+
+
+def _percentil(ordenados, p):
+    return ordenados[max(0, math.ceil(p / 100 * len(ordenados)) - 1)]
+
+
+class Registro:
+    """Tramos, contadores e histogramas de una ejecución. Seguro entre hilos."""
+    def __init__(self, etapa):
+        self.etapa = etapa
+        self.inicio = time.time()
+        self._inicio_monotono = time.perf_counter()
+        self._lock = threading.Lock()
+        self._tramos = {}
+        self._contadores = {}
+        self._histogramas = {}
+        self._token = None
+
+    def registrar_tramo(self, nombre, segundos):
+        with self._lock:
+            self._tramos.setdefault(nombre, []).append(segundos)
+
+    def contar(self, nombre, n=1):
+        with self._lock:
+            self._contadores[nombre] = self._contadores.get(nombre, 0) + n
+
+    def observar(self, nombre, valor):
+        with self._lock:
+            if nombre not in self._histogramas:
+                limites = LIMITES_HISTOGRAMAS.get(nombre, LIMITES_POR_DEFECTO)
+                self._histogramas[nombre] = {"limites": limites, "cuentas": [0] * (len(limites) + 1), "n": 0, "suma": 0.0}
+            histograma = self._histogramas[nombre]
+            histograma["cuentas"][bisect.bisect_left(histograma["limites"], valor)] += 1
+            histograma["n"] += 1
+            histograma["suma"] += valor
+
+    def informe(self, **datos):
+        with self._lock:
+            tramos = {}
+            for nombre, duraciones in sorted(self._tramos.items()):
+                ordenados = sorted(duraciones)
+                tramos[nombre] = {
+                    "n": len(ordenados),
+                    "total_s": round(sum(ordenados), 3),
+                    "p50_s": round(_percentil(ordenados, 50), 3),
+                    "p90_s": round(_percentil(ordenados, 90), 3),
+                    "p99_s": round(_percentil(ordenados, 99), 3),
+                    "max_s": round(ordenados[-1], 3),
+                }
+            histogramas = {n: dict(h, suma=round(h["suma"], 3)) for n, h in self._histogramas.items()}
+            return {
+                "etapa": self.etapa,
+                "inicio": time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.inicio)),
+                "duracion_s": round(time.perf_counter() - self._inicio_monotono, 3),
+                **datos,
+                "tramos": tramos,
+                "contadores": dict(sorted(self._contadores.items())),
+                "histogramas": histogramas,
+            }
+
+    def terminar(self, ruta_carpeta=None, **datos):
+        """Deja de ser el registro activo y, si se indica la carpeta, añade el informe a su metricas.json."""
+        if self._token is not None:
+            _registro_actual.reset(self._token)
+            self._token = None
+        informe = self.informe(**datos)
+        if ruta_carpeta:
+            try:
+                guardar_informe(os.path.join(ruta_carpeta, NOMBRE_INFORME), informe)
+            except Exception as e:
+                logging.warning(f"No se pudo escribir el informe de métricas: {e}")
+        return informe
+
+
+def iniciar_ejecucion(etapa):
+    """Crea un Registro y lo activa en el contexto actual hasta `registro.terminar()`."""
+    registro = Registro(etapa)
+    registro._token = _registro_actual.set(registro)
+    return registro
+
+
+@contextlib.contextmanager
+def tramo(nombre):
+    """Mide la duración del bloque y la anota como tramo `nombre` (también si lanza una excepción)."""
+    registro = _registro_actual.get()
+    if registro is None:
+        yield
+        return
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        registro.registrar_tramo(nombre, time.perf_counter() - inicio)
+
+
+def anotar_tramo(nombre, segundos):
+    """Anota un tramo medido por fuera (p. ej. solo si hubo espera)."""
+    registro = _registro_actual.get()
+    if registro is not None:
+        registro.registrar_tramo(nombre, segundos)
+
+
+def contar(nombre, n=1):
+    registro = _registro_actual.get()
+    if registro is not None:
+        registro.contar(nombre, n)
+
+
+def observar(nombre, valor):
+    registro = _registro_actual.get()
+    if registro is not None:
+        registro.observar(nombre, valor)
+
+
+def propagar(funcion):
+    """
+    Envuelve `funcion` para que se ejecute con el registro activo ahora. Cada
+    llamada a `propagar` copia el contexto, así que hay que llamarla una vez por
+    tarea enviada al pool (un mismo contexto no puede usarse en dos hilos a la vez).
+    """
+    contexto = contextvars.copy_context()
+    return lambda *args, **kwargs: contexto.run(funcion, *args, **kwargs)
+
+
+def guardar_informe(ruta_json, informe):
+    datos = {"ejecuciones": []}
+    if os.path.exists(ruta_json):
+        try:
+            with open(ruta_json, 'r', encoding='utf-8') as f:
+                datos = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logging.warning(f"{ruta_json} no se pudo leer ({e}); se empieza uno nuevo.")
+    datos["ejecuciones"] = (datos.get("ejecuciones", []) + [informe])[-MAX_EJECUCIONES:]
+    ruta_temporal = ruta_json + ".tmp"
+    with open(ruta_temporal, 'w', encoding='utf-8') as f:
+        json.dump(datos, f, indent=2, ensure_ascii=False)
+    os.replace(ruta_temporal, ruta_json)
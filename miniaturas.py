@@ -0,0 +1,119 @@
+# miniaturas.py
+# Caché persistente de miniaturas para las fotos de los participantes y los iconos.
+# Las fotos originales suelen estar en la carpeta de datos compartida (a menudo una
+# unidad de red) y a resolución completa. Cada miniatura se genera una sola vez y
+# se guarda como PNG en ~/Documents/evarisis/.miniaturas; la clave incluye la ruta,
+# la fecha de modificación y el tamaño del original, así que cambiar la foto
+# invalida su miniatura sin más.
+# La decodificación se hace en un pool de hilos; la interfaz solo convierte la
+# imagen ya reducida en PhotoImage (eso sí tiene que ocurrir en el hilo de Tk).
+
+import os
+import time
+import hashlib
+import logging
+import threading
+import collections
+from concurrent.futures import ThreadPoolExecutor
+
+RUTA_MINIATURAS = os.path.join(os.path.expanduser('~'), 'Documents', 'evarisis', '.miniaturas')
+MAX_HILOS_MINIATURAS = 4
+MAX_EN_MEMORIA = 256                  # Miniaturas que se mantienen ya decodificadas en esta sesión
+EDAD_MAXIMA_S = 90 * 24 * 3600        # Las miniaturas sin usar en este tiempo se borran al arrancar
+
+
+class CacheMiniaturas:
+    def __init__(self, directorio=RUTA_MINIATURAS, max_hilos=MAX_HILOS_MINIATURAS):
+        self.directorio = directorio
+        self._memoria = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_hilos, thread_name_prefix="Miniaturas")
+        self._executor.submit(self.podar)
+
+    def _clave(self, ruta, tamano):
+        """Identifica (original, tamaño); None si el original no existe."""
+        try:
+            estado = os.stat(ruta)
+        except OSError:
+            return None
+        contenido = f"{os.path.abspath(ruta)}|{estado.st_mtime_ns}|{estado.st_size}|{tamano[0]}x{tamano[1]}"
+        return hashlib.sha1(contenido.encode('utf-8')).hexdigest()
+
+    def obtener(self, ruta, tamano):
+        """
+        Devuelve la miniatura de `ruta` como imagen PIL de exactamente `tamano`
+        píxeles, o None si el archivo no existe o no se puede leer. Bloquea: desde
+        la interfaz, usar `cargar_en_segundo_plano` salvo para imágenes locales pequeñas.
+        """
+        from PIL import Image
+        clave = self._clave(ruta, tamano)
+        if clave is None:
+            return None
+        with self._lock:
+            if clave in self._memoria:
+                self._memoria.move_to_end(clave)
+                return self._memoria[clave]
+
+        ruta_cache = os.path.join(self.directorio, f"{clave}.png")
+        try:
+            with Image.open(ruta_cache) as guardada:
+                imagen = guardada.copy()
+            os.utime(ruta_cache)  # Marca de último uso para la poda
+        except OSError:
+            try:
+                imagen = self._reducir(ruta, tamano)
+            except Exception as e:
+                logging.warning(f"No se pudo leer la imagen {ruta}: {e}")
+                return None
+            self._guardar(imagen, ruta_cache)
+
+        with self._lock:
+            self._memoria[clave] = imagen
+            while len(self._memoria) > MAX_EN_MEMORIA:
+                self._memoria.popitem(last=False)
+        return imagen
+
+    def _reducir(self, ruta, tamano):
+        from PIL import Image
+        with Image.open(ruta) as original:
+            # En JPEG, draft() decodifica directamente a 1/2, 1/4 o 1/8 de la resolución,
+            # que es lo que más tiempo ahorra con fotos de cámara.
+            original.draft("RGB", (tamano[0] * 2, tamano[1] * 2))
+            imagen = original.convert("RGBA" if original.mode in ("RGBA", "LA", "P") else "RGB")
+            return imagen.resize(tamano, Image.Resampling.LANCZOS)
+
+    def _guardar(self, imagen, ruta_cache):
+        try:
+            os.makedirs(self.directorio, exist_ok=True)
+            ruta_temporal = f"{ruta_cache}.{threading.get_ident()}.tmp"
+            imagen.save(ruta_temporal, format="PNG")
+            os.replace(ruta_temporal, ruta_cache)
+        except OSError as e:
+            logging.warning(f"No se pudo guardar la miniatura en caché: {e}")
+
+    def cargar_en_segundo_plano(self, ruta, tamano, al_terminar):
+        """
+        Genera la miniatura en el pool y llama a `al_terminar(imagen_o_None)` desde
+        ese hilo. El llamador debe pasar el resultado al hilo de Tk (p. ej. con una cola).
+        """
+        def _tarea():
+            imagen = self.obtener(ruta, tamano)
+            try:
+                al_terminar(imagen)
+            except Exception as e:
+                logging.error(f"Error al entregar la miniatura de {ruta}: {e}")
+        return self._executor.submit(_tarea)
+
+    def podar(self, edad_maxima=EDAD_MAXIMA_S):
+        """Borra las miniaturas que no se han usado en `edad_maxima` segundos (originales cambiados o personas que ya no están)."""
+        limite = time.time() - edad_maxima
+        try:
+            entradas = list(os.scandir(self.directorio))
+        except OSError:
+            return
+        for entrada in entradas:
+            try:
+                if entrada.name.endswith(".png") and entrada.stat().st_mtime < limite:
+                    os.remove(entrada.path)
+            except OSError:
+                pass
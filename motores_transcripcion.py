@@ -0,0 +1,158 @@
+# motores_transcripcion.py
+# Motores de reconocimiento de voz intercambiables.
+# Cada motor recibe PCM int16 mono y devuelve texto; el resto de la aplicación
+# solo conoce la interfaz `MotorTranscripcion` y las dos excepciones de abajo.
+
+import os
+import sys
+import json
+import logging
+import threading
+
+
+class AudioNoReconocido(Exception):
+    """El motor no encontró habla inteligible en el audio."""
+
+
+class ErrorMotorTranscripcion(Exception):
+    """Fallo del motor (red, servicio o modelo) ajeno al contenido del audio."""
+
+
+def get_path(relative_path):
+    """Función de ayuda para encontrar archivos en modo normal y empaquetado (PyInstaller)."""
+    try:
+        base_path = sys._MEIPASS
+    except Exception:
+        base_path = os.path.abspath(os.path.dirname(__file__))
+    return os.path.join(base_path, relative_path)
+
+
+class MotorTranscripcion:
+    """Interfaz común de los motores de transcripción."""
+    nombre = ""
+    requiere_red = False
+
+    def preparar(self):
+        """Carga recursos pesados (modelos, clientes). Lanza ErrorMotorTranscripcion si no es posible."""
+
+    def transcribir(self, pcm, frecuencia):
+        """Transcribe un bloque de audio completo."""
+        raise NotImplementedError
+
+    def transcribir_lote(self, segmentos, frecuencia, progreso=None):
+        """
+        Transcribe varios segmentos de un mismo diálogo y une los textos.
+        `progreso(hechos, total)` se llama tras cada segmento.
+        """
+        textos = []
+        for i, segmento in enumerate(segmentos):
+            try:
+                textos.append(self.transcribir(segmento, frecuencia))
+            except AudioNoReconocido:
+                # Un segmento ininteligible no invalida el resto del diálogo.
+                pass
+            if progreso:
+                progreso(i + 1, len(segmentos))
+        if not textos:
+            raise AudioNoReconocido()
+        return " ".join(textos)
+
+    def transcribir_flujo(self, bloques, frecuencia):
+        """
+        Recibe un iterable de bloques PCM y produce textos a medida que se reconocen.
+        Por defecto acumula todo y transcribe al final; los motores locales lo sobreescriben.
+        """
+        pcm = b''.join(bloques)
+        if pcm:
+            yield self.transcribir(pcm, frecuencia)
+
+
+class MotorGoogle(MotorTranscripcion):
+    """Servicio web gratuito de Google a través de `speech_recognition`."""
+    nombre = "google"
+    requiere_red = True
+
+    def __init__(self, idioma="es-ES"):
+        self.idioma = idioma
+
+    def transcribir(self, pcm, frecuencia):
+        import speech_recognition as sr
+        audio = sr.AudioData(pcm, frecuencia, 2)  # 2 bytes por muestra para 16-bit
+        try:
+            return sr.Recognizer().recognize_google(audio, language=self.idioma)
+        except sr.UnknownValueError as e:
+            raise AudioNoReconocido() from e
+        except sr.RequestError as e:
+            raise ErrorMotorTranscripcion(str(e)) from e
+
+
+class MotorVosk(MotorTranscripcion):
+    """
+    Reconocimiento local en CPU con Vosk (Kaldi), sin conexión a internet.
+    El modelo se busca en la variable de entorno EVARISIS_MODELO_VOSK o en
+    `modelos/vosk-es` junto a la aplicación.
+    """
+    nombre = "vosk"
+    requiere_red = False
+
+    _modelo = None
+    _lock_modelo = threading.Lock()
+
+    def __init__(self, ruta_modelo=None):
+        self.ruta_modelo = ruta_modelo or os.environ.get("EVARISIS_MODELO_VOSK") or get_path(os.path.join("modelos", "vosk-es"))
+
+    def preparar(self):
+        # El modelo se carga una sola vez por proceso y se comparte entre hilos;
+        # cada transcripción crea su propio reconocedor.
+        with MotorVosk._lock_modelo:
+            if MotorVosk._modelo is not None:
+                return
+            try:
+                import vosk
+                vosk.SetLogLevel(-1)
+                if not os.path.isdir(self.ruta_modelo):
+                    raise FileNotFoundError(f"No existe la carpeta del modelo: {self.ruta_modelo}")
+                logging.info(f"Cargando modelo Vosk desde: {self.ruta_modelo}")
+                MotorVosk._modelo = vosk.Model(self.ruta_modelo)
+            except Exception as e:
+                raise ErrorMotorTranscripcion(f"No se pudo cargar el modelo Vosk: {e}") from e
+
+    def _nuevo_reconocedor(self, frecuencia):
+        import vosk
+        self.preparar()
+        return vosk.KaldiRecognizer(MotorVosk._modelo, frecuencia)
+
+    def transcribir(self, pcm, frecuencia):
+        texto = " ".join(self.transcribir_flujo([pcm], frecuencia))
+        if not texto:
+            raise AudioNoReconocido()
+        return texto
+
+    def transcribir_flujo(self, bloques, frecuencia):
+        reconocedor = self._nuevo_reconocedor(frecuencia)
+        paso = frecuencia  # Se alimenta en bloques de ~0,5 s (frecuencia muestras * 2 bytes / 2)
+        for bloque in bloques:
+            for inicio in range(0, len(bloque), paso):
+                if reconocedor.AcceptWaveform(bloque[inicio:inicio + paso]):
+                    texto = json.loads(reconocedor.Result()).get("text", "")
+                    if texto:
+                        yield texto
+        texto = json.loads(reconocedor.FinalResult()).get("text", "")
+        if texto:
+            yield texto
+
+
+# --- Registro de motores disponibles ---
+MOTORES = {
+    MotorGoogle.nombre: MotorGoogle,
+    MotorVosk.nombre: MotorVosk,
+}
+MOTOR_POR_DEFECTO = MotorGoogle.nombre
+
+
+def obtener_motor(nombre=None):
+    """Crea el motor registrado con `nombre` (o el motor por defecto)."""
+    nombre = nombre or MOTOR_POR_DEFECTO
+    if nombre not in MOTORES:
+        raise ValueError(f"Motor de transcripción desconocido: '{nombre}'. Disponibles: {', '.join(MOTORES)}")
+    return MOTORES[nombre]()
@@ -0,0 +1,226 @@
+# procesar_lote.py
+# Reprocesamiento sin interfaz de las reuniones guardadas.
+# Recorre <raíz>/*/proyecto_reunion.json, reanuda la transcripción de los
+# diálogos pendientes y genera las actas que falten, repartiendo las reuniones
+# entre varios procesos. Las llamadas al reconocedor y al modelo de lenguaje
+# tienen un tope global compartido por todos los procesos.
+#
+# Uso:
+#   python procesar_lote.py [--raiz RUTA] [--procesos N] [--max-reconocedor N] [--max-ia N]
+
+import os
+import sys
+import glob
+import time
+import logging
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import asistente_reuniones_gerencia_logic as arl_gerencia
+import huggingface
+import resiliencia
+
+NOMBRE_PROYECTO = "proyecto_reunion.json"
+PROCESOS_POR_DEFECTO = max(1, min(4, os.cpu_count() or 1))
+MAX_RECONOCEDOR_POR_DEFECTO = 4   # Transcripciones simultáneas en todo el lote
+MAX_IA_POR_DEFECTO = 2            # Llamadas simultáneas al modelo de lenguaje en todo el lote
+
+
+def buscar_proyectos(raiz):
+    """Devuelve las rutas de los proyectos de reunión que hay directamente bajo `raiz`."""
+    rutas = glob.glob(os.path.join(raiz, "*", NOMBRE_PROYECTO))
+    # Las carpetas ocultas (.grabaciones_en_curso, .cache_ia) no son reuniones.
+    return sorted(r for r in rutas if not os.path.basename(os.path.dirname(r)).startswith("."))
+
+
+def _segundos_de_audio(ruta_audio):
+    try:
+        return arl_gerencia.almacenamiento_audio.duracion_segundos(ruta_audio)
+    except Exception:
+        return 0.0
+
+
+def estado_proyecto(ruta_proyecto_json):
+    """
+    Resume qué le falta a un proyecto: diálogos sin transcribir (y sus segundos
+    de audio), acta literal y acta oficial.
+    """
+    proyecto_info = arl_gerencia.cargar_proyecto(ruta_proyecto_json)
+    ruta_carpeta = os.path.dirname(ruta_proyecto_json)
+    pendientes = [d for d in proyecto_info.get("dialogos", []) if not d.get("texto_transcrito")]
+    return {
+        "dialogos": len(proyecto_info.get("dialogos", [])),
+        "pendientes": len(pendientes),
+        "segundos_pendientes": sum(_segundos_de_audio(os.path.join(ruta_carpeta, d["archivo_audio"])) for d in pendientes),
+        "falta_literal": not os.path.exists(arl_gerencia.get_ruta_acta_literal(ruta_proyecto_json)),
+        "falta_oficial": not os.path.exists(arl_gerencia.get_ruta_acta_oficial(ruta_proyecto_json)),
+    }
+
+
+def esta_completo(estado, solo_transcripcion=False):
+    if estado["pendientes"] or estado["falta_literal"]:
+        return False
+    return solo_transcripcion or not estado["falta_oficial"]
+
+
+def _inicializar_proceso(semaforo_reconocedor, semaforo_ia, nivel_log, ia_por_minuto=None):
+    """Se ejecuta una vez en cada proceso del pool: instala los límites compartidos."""
+    logging.basicConfig(level=nivel_log, format='%(asctime)s | %(levelname)-8s | %(processName)-12s | %(message)s', force=True)
+    arl_gerencia.configurar_limite_reconocedor(semaforo_reconocedor)
+    huggingface.configurar_limite_llamadas(semaforo_ia)
+    if ia_por_minuto:
+        resiliencia.configurar_tasa("huggingface", ia_por_minuto)
+
+
+def procesar_proyecto(ruta_proyecto_json, motor=None, max_hilos=None, solo_transcripcion=False, usar_cache=True, ruta_datos=None):
+    """
+    Lleva un proyecto hasta el final: transcribe lo pendiente, genera el acta
+    literal y, salvo `solo_transcripcion`, el acta oficial. Devuelve un dict
+    con el resultado y las cifras para el resumen.
+    """
+    nombre = os.path.basename(os.path.dirname(ruta_proyecto_json))
+    inicio = time.monotonic()
+    resultado = {"reunion": nombre, "ok": False, "mensaje": "", "dialogos_transcritos": 0, "segundos_audio": 0.0,
+                 "acta_oficial": False, "duracion": 0.0}
+
+    def _progreso(valor, texto, vista_previa=None):
+        logging.debug(f"[{nombre}] {valor:.0%} {texto}")
+
+    try:
+        antes = estado_proyecto(ruta_proyecto_json)
+        proyecto_info = arl_gerencia.cargar_proyecto(ruta_proyecto_json)
+        acta = arl_gerencia.ActaWord(proyecto_info.get("titulo", nombre), proyecto_info.get("participantes", []),
+                                     ruta_datos=ruta_datos)
+
+        if antes["pendientes"] or antes["falta_literal"]:
+            logging.info(f"[{nombre}] Transcribiendo {antes['pendientes']} diálogos pendientes...")
+            ok, mensaje, _ = acta.transcribir_desde_proyecto(ruta_proyecto_json, _progreso, max_hilos=max_hilos, motor=motor)
+            despues = estado_proyecto(ruta_proyecto_json)
+            resultado["dialogos_transcritos"] = antes["pendientes"] - despues["pendientes"]
+            resultado["segundos_audio"] = antes["segundos_pendientes"] - despues["segundos_pendientes"]
+            if not ok:
+                resultado["mensaje"] = mensaje
+                return resultado
+
+        if not solo_transcripcion and antes["falta_oficial"]:
+            logging.info(f"[{nombre}] Generando acta oficial...")
+            ok, mensaje = acta.generar_acta_inteligente(ruta_proyecto_json, _progreso, usar_cache=usar_cache)
+            if not ok:
+                resultado["mensaje"] = mensaje
+                return resultado
+            resultado["acta_oficial"] = True
+
+        resultado["ok"] = True
+        resultado["mensaje"] = "Completado"
+        return resultado
+    except Exception as e:
+        logging.exception(f"[{nombre}] Error inesperado")
+        resultado["mensaje"] = f"Error inesperado: {e}"
+        return resultado
+    finally:
+        resultado["duracion"] = time.monotonic() - inicio
+
+
+def imprimir_resumen(resultados, duracion_total):
+    completados = [r for r in resultados if r["ok"]]
+    fallidos = [r for r in resultados if not r["ok"]]
+    dialogos = sum(r["dialogos_transcritos"] for r in resultados)
+    segundos_audio = sum(r["segundos_audio"] for r in resultados)
+    actas = sum(1 for r in resultados if r["acta_oficial"])
+
+    print("=" * 60)
+    print(f"Reuniones procesadas: {len(resultados)} ({len(completados)} completadas, {len(fallidos)} con error)")
+    print(f"Diálogos transcritos: {dialogos} ({segundos_audio / 60:.1f} min de audio)")
+    print(f"Actas oficiales generadas: {actas}")
+    print(f"Tiempo total: {duracion_total:.1f} s")
+    if duracion_total > 0:
+        print(f"Rendimiento: {dialogos / duracion_total * 60:.1f} diálogos/min, "
+              f"{segundos_audio / duracion_total:.2f} s de audio por segundo, "
+              f"{len(resultados) / duracion_total * 3600:.1f} reuniones/hora")
+    for r in fallidos:
+        print(f"  [ERROR] {r['reunion']}: {r['mensaje']}")
+    print("=" * 60)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Reanuda la transcripción y genera las actas de todas las reuniones incompletas.")
+    parser.add_argument("--raiz", default=arl_gerencia.RUTA_EVARISIS, help="Carpeta que contiene una subcarpeta por reunión.")
+    parser.add_argument("--procesos", type=int, default=PROCESOS_POR_DEFECTO, help="Reuniones que se procesan a la vez.")
+    parser.add_argument("--hilos", type=int, default=arl_gerencia.MAX_HILOS_TRANSCRIPCION, help="Hilos de transcripción por reunión.")
+    parser.add_argument("--max-reconocedor", type=int, default=MAX_RECONOCEDOR_POR_DEFECTO, help="Transcripciones simultáneas en todo el lote.")
+    parser.add_argument("--max-ia", type=int, default=MAX_IA_POR_DEFECTO, help="Llamadas simultáneas al modelo de lenguaje en todo el lote.")
+    parser.add_argument("--motor", choices=list(arl_gerencia.motores_transcripcion.MOTORES), help="Motor de transcripción (por defecto, el de cada proyecto).")
+    parser.add_argument("--ia-por-minuto", type=int, default=resiliencia.PETICIONES_HF_POR_MINUTO,
+                        help="Peticiones por minuto al modelo de lenguaje en todo el lote.")
+    parser.add_argument("--ruta-datos", help="Carpeta de datos central de EVARISIS (de su areas.json salen el elaborador y el revisor del acta).")
+    parser.add_argument("--solo-transcripcion", action="store_true", help="No generar el acta oficial.")
+    parser.add_argument("--sin-cache", action="store_true", help="Ignorar las respuestas de IA guardadas.")
+    parser.add_argument("--listar", action="store_true", help="Solo mostrar qué reuniones están incompletas.")
+    parser.add_argument("--verbose", action="store_true", help="Mostrar también el progreso de cada reunión.")
+    args = parser.parse_args(argv)
+
+    nivel_log = logging.DEBUG if args.verbose else logging.INFO
+    logging.basicConfig(level=nivel_log, format='%(asctime)s | %(levelname)-8s | %(processName)-12s | %(message)s', force=True)
+
+    incompletos = []
+    for ruta in buscar_proyectos(args.raiz):
+        try:
+            estado = estado_proyecto(ruta)
+        except Exception as e:
+            logging.error(f"No se pudo leer el proyecto {ruta}: {e}")
+            continue
+        if not esta_completo(estado, args.solo_transcripcion):
+            incompletos.append((ruta, estado))
+
+    if not incompletos:
+        print(f"No hay reuniones incompletas en {args.raiz}.")
+        return 0
+
+    for ruta, estado in incompletos:
+        faltas = []
+        if estado["pendientes"]:
+            faltas.append(f"{estado['pendientes']}/{estado['dialogos']} diálogos")
+        if estado["falta_literal"]:
+            faltas.append("acta literal")
+        if estado["falta_oficial"] and not args.solo_transcripcion:
+            faltas.append("acta oficial")
+        print(f"{os.path.basename(os.path.dirname(ruta))}: falta {', '.join(faltas)}")
+    if args.listar:
+        return 0
+
+    # Los semáforos se heredan por los procesos del pool al crearse.
+    semaforo_reconocedor = multiprocessing.BoundedSemaphore(max(1, args.max_reconocedor))
+    semaforo_ia = multiprocessing.BoundedSemaphore(max(1, args.max_ia))
+
+    inicio = time.monotonic()
+    resultados = []
+    executor = ProcessPoolExecutor(max_workers=max(1, args.procesos), initializer=_inicializar_proceso,
+                                   initargs=(semaforo_reconocedor, semaforo_ia, nivel_log,
+                                             # La cuota por minuto es de la cuenta: se reparte entre los procesos.
+                                             max(1, args.ia_por_minuto // max(1, args.procesos))))
+    try:
+        futuros = {
+            executor.submit(procesar_proyecto, ruta, args.motor, args.hilos, args.solo_transcripcion, not args.sin_cache,
+                            args.ruta_datos): ruta
+            for ruta, _ in incompletos
+        }
+        for future in as_completed(futuros):
+            resultado = future.result()
+            resultados.append(resultado)
+            estado = "OK" if resultado["ok"] else "ERROR"
+            logging.info(f"[{resultado['reunion']}] {estado} en {resultado['duracion']:.1f} s: {resultado['mensaje']}")
+    except KeyboardInterrupt:
+        # Lo ya transcrito está en el diario de cada proyecto; la próxima ejecución lo retoma.
+        logging.warning("Interrumpido por el usuario. Las reuniones en curso se reanudarán en la próxima ejecución.")
+        executor.shutdown(wait=False, cancel_futures=True)
+        imprimir_resumen(resultados, time.monotonic() - inicio)
+        return 130
+    executor.shutdown()
+
+    imprimir_resumen(resultados, time.monotonic() - inicio)
+    return 0 if all(r["ok"] for r in resultados) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,260 @@
+# renderizador_docx.py
+# Conversión de Markdown a .docx dentro del proceso, con python-docx.
+# Cubre el subconjunto que usa la plantilla del acta HUV (títulos, negritas,
+# cursivas, listas, tablas COMPROMISO | RESPONSABLE | ..., citas y separadores).
+# Ante cualquier otra construcción lanza MarkdownNoSoportado para que el
+# llamador recurra a pandoc.
+
+import os
+import re
+import sys
+
+
+class MarkdownNoSoportado(Exception):
+    """El texto contiene construcciones que este renderizador no sabe convertir."""
+
+
+def get_path(relative_path):
+    """Función de ayuda para encontrar archivos en modo normal y empaquetado (PyInstaller)."""
+    try:
+        base_path = sys._MEIPASS
+    except Exception:
+        base_path = os.path.abspath(os.path.dirname(__file__))
+    return os.path.join(base_path, relative_path)
+
+
+# Si existe, se usa como documento de referencia (estilos, márgenes, encabezados).
+PLANTILLA_REFERENCIA_POR_DEFECTO = get_path(os.path.join("plantillas", "plantilla_acta_huv.docx"))
+
+# --- Patrones de bloque ---
+_RE_TITULO = re.compile(r'^(#{1,6})\s+(.*?)\s*#*\s*$')
+_RE_VINETA = re.compile(r'^(\s*)[-*+]\s+(.*)$')
+_RE_NUMERADA = re.compile(r'^(\s*)(\d+[.)])\s+(.*)$')
+_RE_SEPARADOR = re.compile(r'^\s*([-*_])(\s*\1){2,}\s*$')
+_RE_FILA_SEPARADORA = re.compile(r'^\s*\|?\s*:?-+:?\s*(\|\s*:?-+:?\s*)+\|?\s*$')
+_RE_CITA = re.compile(r'^\s*>\s?(.*)$')
+
+# --- Construcciones que se delegan a pandoc ---
+_NO_SOPORTADO = [
+    (re.compile(r'^\s*(```|~~~)', re.M), "bloques de código"),
+    (re.compile(r'!\[[^\]]*\]\([^)]*\)'), "imágenes"),
+    (re.compile(r'(?<!!)\[[^\]]+\]\([^)]*\)'), "enlaces"),
+    (re.compile(r'\[\^[^\]]+\]'), "notas al pie"),
+    (re.compile(r'</?[a-zA-Z][^>]*>'), "HTML"),
+    (re.compile(r'\$\$'), "fórmulas"),
+]
+
+# --- Formato en línea: **negrita**, __negrita__, *cursiva*, `código` ---
+_RE_EN_LINEA = re.compile(r'(\*\*|__)(?=\S)(.+?)(?<=\S)\1|\*(?=\S)([^*]+?)(?<=\S)\*|`([^`]+)`')
+
+
+def _verificar_soporte(texto_md):
+    for patron, descripcion in _NO_SOPORTADO:
+        if patron.search(texto_md):
+            raise MarkdownNoSoportado(f"El Markdown contiene {descripcion}.")
+
+
+def _agregar_en_linea(parrafo, texto, negrita=False):
+    """Añade `texto` al párrafo interpretando negritas, cursivas y código."""
+    texto = texto.replace('\\*', '\x00')  # Asteriscos escapados
+    posicion = 0
+    for m in _RE_EN_LINEA.finditer(texto):
+        if m.start() > posicion:
+            parrafo.add_run(texto[posicion:m.start()].replace('\x00', '*')).bold = negrita or None
+        if m.group(2) is not None:
+            parrafo.add_run(m.group(2).replace('\x00', '*')).bold = True
+        elif m.group(3) is not None:
+            run = parrafo.add_run(m.group(3).replace('\x00', '*'))
+            run.italic = True
+            run.bold = negrita or None
+        else:
+            run = parrafo.add_run(m.group(4))
+            run.font.name = "Courier New"
+        posicion = m.end()
+    if posicion < len(texto):
+        parrafo.add_run(texto[posicion:].replace('\x00', '*')).bold = negrita or None
+
+
+def _celdas(linea):
+    linea = linea.strip()
+    if linea.startswith('|'):
+        linea = linea[1:]
+    if linea.endswith('|'):
+        linea = linea[:-1]
+    return [c.strip() for c in linea.split('|')]
+
+
+def _es_fila_tabla(linea):
+    return '|' in linea and len(_celdas(linea)) >= 2
+
+
+def _es_encabezado_de_seccion(texto):
+    """'DATOS GENERALES', '**DESARROLLO**': todo en mayúsculas, como los títulos numerados de la plantilla."""
+    letras = [c for c in texto.replace('*', '').replace('_', '') if c.isalpha()]
+    return bool(letras) and all(c.isupper() for c in letras)
+
+
+class _Renderizador:
+    def __init__(self, plantilla_referencia):
+        from docx import Document
+        if plantilla_referencia and os.path.exists(plantilla_referencia):
+            self.doc = Document(plantilla_referencia)
+            self._vaciar_cuerpo()
+        else:
+            self.doc = Document()
+        self.estilos = {estilo.name for estilo in self.doc.styles}
+
+    def _vaciar_cuerpo(self):
+        # Se conserva solo la configuración de sección (márgenes, encabezado y pie).
+        from docx.oxml.ns import qn
+        cuerpo = self.doc.element.body
+        for elemento in list(cuerpo):
+            if elemento.tag != qn('w:sectPr'):
+                cuerpo.remove(elemento)
+
+    def _parrafo(self, estilo=None):
+        return self.doc.add_paragraph(style=estilo if estilo in self.estilos else None)
+
+    def titulo(self, nivel, texto):
+        if f"Heading {nivel}" in self.estilos:
+            parrafo = self.doc.add_heading(level=nivel)
+            _agregar_en_linea(parrafo, texto)
+        else:
+            _agregar_en_linea(self._parrafo(), texto, negrita=True)
+
+    def parrafo(self, lineas):
+        # Cada línea se conserva como salto de línea: la plantilla HUV pone un
+        # dato por línea ("FECHA: ...", "LUGAR: ...") y no deben fundirse.
+        parrafo = self._parrafo()
+        for i, linea in enumerate(lineas):
+            if i:
+                parrafo.add_run().add_break()
+            _agregar_en_linea(parrafo, linea.strip())
+
+    def elemento_lista(self, texto, nivel):
+        estilo = "List Bullet" if nivel == 0 else f"List Bullet {min(nivel + 1, 3)}"
+        if estilo not in self.estilos:
+            estilo = "List Bullet"
+        if estilo in self.estilos:
+            _agregar_en_linea(self._parrafo(estilo), texto)
+        else:
+            _agregar_en_linea(self._parrafo(), ("    " * nivel) + "- " + texto)
+
+    def elemento_numerado(self, numero, texto, nivel):
+        # El número se escribe tal cual viene en el Markdown. "List Number" comparte
+        # una sola secuencia en todo el documento: la segunda lista seguiría
+        # contando desde la primera y se perderían los números de la plantilla.
+        from docx.shared import Cm
+        parrafo = self._parrafo("List Paragraph")
+        parrafo.paragraph_format.left_indent = Cm(0.75 * (nivel + 1))
+        parrafo.paragraph_format.first_line_indent = Cm(-0.75)
+        _agregar_en_linea(parrafo, f"{numero}\t{texto}")
+
+    def encabezado_numerado(self, numero, texto):
+        # "3. DESARROLLO": encabezado de sección de la plantilla HUV, no un elemento de lista.
+        _agregar_en_linea(self._parrafo(), f"{numero} {texto}", negrita=True)
+
+    def cita(self, lineas):
+        parrafo = self._parrafo("Quote")
+        for i, linea in enumerate(lineas):
+            if i:
+                parrafo.add_run().add_break()
+            _agregar_en_linea(parrafo, linea)
+
+    def separador(self):
+        from docx.oxml import OxmlElement
+        from docx.oxml.ns import qn
+        parrafo = self._parrafo()
+        bordes = OxmlElement('w:pBdr')
+        inferior = OxmlElement('w:bottom')
+        for atributo, valor in (('w:val', 'single'), ('w:sz', '6'), ('w:space', '1'), ('w:color', 'auto')):
+            inferior.set(qn(atributo), valor)
+        bordes.append(inferior)
+        parrafo._p.get_or_add_pPr().append(bordes)
+
+    def tabla(self, filas):
+        columnas = max(len(f) for f in filas)
+        tabla = self.doc.add_table(rows=len(filas), cols=columnas)
+        if "Table Grid" in self.estilos:
+            tabla.style = "Table Grid"
+        for i, fila in enumerate(filas):
+            for j in range(columnas):
+                celda = tabla.cell(i, j)
+                _agregar_en_linea(celda.paragraphs[0], fila[j] if j < len(fila) else "", negrita=(i == 0))
+
+    def guardar(self, ruta):
+        self.doc.save(ruta)
+
+
+def markdown_a_docx(texto_md, ruta_salida, plantilla_referencia=PLANTILLA_REFERENCIA_POR_DEFECTO):
+    """
+    Convierte `texto_md` en un .docx en `ruta_salida`. Si existe
+    `plantilla_referencia`, sus estilos y configuración de página se reutilizan.
+    Lanza MarkdownNoSoportado si el texto usa construcciones fuera del subconjunto.
+    """
+    _verificar_soporte(texto_md)
+    r = _Renderizador(plantilla_referencia)
+    lineas = texto_md.replace('\r\n', '\n').split('\n')
+    i = 0
+    while i < len(lineas):
+        linea = lineas[i]
+        if not linea.strip():
+            i += 1
+            continue
+
+        m = _RE_TITULO.match(linea)
+        if m:
+            r.titulo(len(m.group(1)), m.group(2))
+            i += 1
+            continue
+
+        # Antes que las listas: "* * *" también parecería una viñeta.
+        if _RE_SEPARADOR.match(linea):
+            r.separador()
+            i += 1
+            continue
+
+        if _es_fila_tabla(linea):
+            filas = []
+            while i < len(lineas) and lineas[i].strip() and (_es_fila_tabla(lineas[i]) or _RE_FILA_SEPARADORA.match(lineas[i])):
+                if not _RE_FILA_SEPARADORA.match(lineas[i]):
+                    filas.append(_celdas(lineas[i]))
+                i += 1
+            r.tabla(filas)
+            continue
+
+        m = _RE_VINETA.match(linea)
+        if m:
+            r.elemento_lista(m.group(2), nivel=len(m.group(1).expandtabs(4)) // 2)
+            i += 1
+            continue
+
+        m = _RE_NUMERADA.match(linea)
+        if m:
+            nivel = len(m.group(1).expandtabs(4)) // 2
+            if nivel == 0 and _es_encabezado_de_seccion(m.group(3)):
+                r.encabezado_numerado(m.group(2), m.group(3))
+            else:
+                r.elemento_numerado(m.group(2), m.group(3), nivel)
+            i += 1
+            continue
+
+        if _RE_CITA.match(linea):
+            bloque = []
+            while i < len(lineas) and _RE_CITA.match(lineas[i]):
+                bloque.append(_RE_CITA.match(lineas[i]).group(1))
+                i += 1
+            r.cita(bloque)
+            continue
+
+        # Párrafo: líneas consecutivas hasta una línea en blanco u otro bloque.
+        bloque = []
+        while i < len(lineas) and lineas[i].strip() and not (
+                _RE_TITULO.match(lineas[i]) or _es_fila_tabla(lineas[i]) or _RE_VINETA.match(lineas[i])
+                or _RE_NUMERADA.match(lineas[i]) or _RE_CITA.match(lineas[i]) or _RE_SEPARADOR.match(lineas[i])):
+            bloque.append(lineas[i])
+            i += 1
+        r.parrafo(bloque)
+
+    r.guardar(ruta_salida)
+    return ruta_salida
@@ -0,0 +1,289 @@
+# resiliencia.py
+# Reintentos, cortacircuitos y límite de tasa para los servicios externos
+# (reconocedor de voz en la nube y modelo de Hugging Face).
+# Cada servicio tiene su propia política: los errores transitorios se reintentan
+# con espera exponencial y jitter; si se encadenan varios fallos, el circuito del
+# servicio se abre y todas las llamadas a él esperan (en lugar de fallar) hasta
+# que una llamada de prueba vuelve a funcionar. Una caída breve de la red pausa
+# el trabajo y lo reanuda sola; solo si dura más de `espera_maxima` se abandona.
+# Cada petición tiene sus propios intentos: si falla en todos (incluidos los de
+# prueba del circuito) se relanza su error y la petición queda pendiente.
+
+import os
+import time
+import random
+import socket
+import logging
+import threading
+import metricas
+
+
+class CircuitoAbierto(Exception):
+    """El servicio lleva demasiado tiempo sin responder (o no se quiso esperar a que vuelva)."""
+
+
+class OperacionCancelada(Exception):
+    """Se pidió cancelar antes de una llamada o mientras se esperaba un reintento o la recuperación del servicio."""
+
+
+CERRADO, ABIERTO, SEMIABIERTO = "cerrado", "abierto", "semiabierto"
+
+
+def _dormir(segundos, cancelar=None):
+    """time.sleep interrumpible con un threading.Event."""
+    if cancelar is None:
+        time.sleep(segundos)
+    elif cancelar.wait(segundos):
+        raise OperacionCancelada()
+
+
+class PoliticaReintento:
+    def __init__(self, intentos=4, espera_base=1.0, espera_maxima=30.0):
+        self.intentos = intentos
+        self.espera_base = espera_base
+        self.espera_maxima = espera_maxima
+
+    def espera(self, intento):
+        """
+        Segundos antes de repetir tras el fallo número `intento` (1, 2, ...):
+        exponencial con jitter completo, para que los hilos que fallaron a la vez
+        no vuelvan a llamar todos en el mismo instante.
+        """
+        return random.uniform(0, min(self.espera_maxima, self.espera_base * 2 ** (intento - 1)))
+
+
+class Circuito:
+    """
+    Cortacircuitos de un servicio. Tras `umbral_fallos` errores transitorios
+    seguidos se abre durante `pausa` segundos; después deja pasar una sola
+    llamada de prueba (semiabierto). Si la prueba funciona se cierra; si falla
+    vuelve a abrirse con el doble de pausa, hasta `pausa_maxima`.
+    """
+    def __init__(self, nombre, umbral_fallos=3, pausa=15.0, pausa_maxima=120.0, espera_maxima=600.0):
+        self.nombre = nombre
+        self.umbral_fallos = umbral_fallos
+        self.pausa = pausa
+        self.pausa_maxima = pausa_maxima
+        self.espera_maxima = espera_maxima
+        self.estado = CERRADO
+        self.fallos_seguidos = 0
+        self._cond = threading.Condition()
+        self._pausa_actual = pausa
+        self._reabrir_en = 0.0
+        self._abierto_desde = None
+        self._sondeo_desde = None
+
+    def esperar_turno(self, cancelar=None, al_esperar=None, bloquear=True):
+        """
+        Vuelve cuando se puede llamar al servicio. Devuelve True si tuvo que
+        esperar a que el circuito se recuperara. Lanza CircuitoAbierto si el
+        servicio no vuelve en `espera_maxima` segundos (o enseguida, si
+        `bloquear` es False) y OperacionCancelada si se activa `cancelar`.
+        `al_esperar(segundos, motivo)` se llama una vez al empezar a esperar.
+        """
+        espero = False
+        while True:
+            with self._cond:
+                ahora = time.monotonic()
+                if self.estado == CERRADO:
+                    return espero
+                if self.estado == ABIERTO and ahora >= self._reabrir_en:
+                    self.estado = SEMIABIERTO
+                # Una prueba que no informa en `pausa_maxima` (hilo colgado) se da por fallida.
+                if self.estado == SEMIABIERTO and (self._sondeo_desde is None or ahora - self._sondeo_desde > self.pausa_maxima):
+                    self._sondeo_desde = ahora
+                    return espero
+                if not bloquear:
+                    raise CircuitoAbierto(f"El servicio '{self.nombre}' está en pausa por errores repetidos.")
+                if self.espera_maxima is not None and ahora - self._abierto_desde > self.espera_maxima:
+                    raise CircuitoAbierto(f"El servicio '{self.nombre}' no respondió en {self.espera_maxima:.0f} s.")
+                restante = max(self._reabrir_en - ahora, 0.0)
+            if cancelar is not None and cancelar.is_set():
+                raise OperacionCancelada()
+            if not espero and al_esperar:
+                al_esperar(restante, f"servicio '{self.nombre}' en pausa")
+            espero = True
+            with self._cond:
+                self._cond.wait(min(max(restante, 0.1), 1.0))
+
+    def registrar_exito(self):
+        with self._cond:
+            if self.estado != CERRADO:
+                logging.info(f"Circuito '{self.nombre}' cerrado: el servicio responde de nuevo.")
+            self.estado = CERRADO
+            self.fallos_seguidos = 0
+            self._pausa_actual = self.pausa
+            self._abierto_desde = None
+            self._sondeo_desde = None
+            self._cond.notify_all()
+
+    def registrar_fallo(self):
+        with self._cond:
+            self.fallos_seguidos += 1
+            ahora = time.monotonic()
+            if self.estado == SEMIABIERTO:
+                self._pausa_actual = min(self._pausa_actual * 2, self.pausa_maxima)
+            elif self.estado == CERRADO and self.fallos_seguidos >= self.umbral_fallos:
+                self._pausa_actual = self.pausa
+                self._abierto_desde = ahora
+            else:
+                return
+            self.estado = ABIERTO
+            self._reabrir_en = ahora + self._pausa_actual
+            self._sondeo_desde = None
+            logging.warning(f"Circuito '{self.nombre}' abierto tras {self.fallos_seguidos} fallos seguidos; "
+                            f"se probará de nuevo en {self._pausa_actual:.0f} s.")
+
+
+class LimitadorTasa:
+    """Cubeta de fichas: como mucho `por_minuto` llamadas por minuto, con ráfagas de hasta `rafaga`."""
+    def __init__(self, por_minuto, rafaga=5):
+        self.por_segundo = por_minuto / 60.0
+        self.capacidad = max(1, min(rafaga, por_minuto))
+        self._fichas = float(self.capacidad)
+        self._ultima = time.monotonic()
+        self._lock = threading.Lock()
+
+    def adquirir(self, cancelar=None):
+        while True:
+            with self._lock:
+                ahora = time.monotonic()
+                self._fichas = min(self.capacidad, self._fichas + (ahora - self._ultima) * self.por_segundo)
+                self._ultima = ahora
+                if self._fichas >= 1:
+                    self._fichas -= 1
+                    return
+                espera = (1 - self._fichas) / self.por_segundo
+            _dormir(espera, cancelar)
+
+
+def codigo_http(error):
+    """Código de estado HTTP de una excepción de requests/httpx/huggingface_hub, o None."""
+    respuesta = getattr(error, "response", None)
+    return getattr(respuesta, "status_code", None)
+
+
+def _espera_indicada(error):
+    """Segundos de la cabecera Retry-After de una respuesta 429/503, o 0."""
+    respuesta = getattr(error, "response", None)
+    try:
+        return float(respuesta.headers.get("Retry-After", 0))
+    except (AttributeError, TypeError, ValueError):
+        return 0.0
+
+
+def es_error_transitorio(error):
+    """Errores de red, timeouts, 408/425/429 y 5xx: tiene sentido repetir la misma petición."""
+    codigo = codigo_http(error)
+    if codigo is not None:
+        return codigo in (408, 425, 429) or codigo >= 500
+    if isinstance(error, (OSError, TimeoutError)):
+        return True
+    # httpx no hereda de OSError; se reconoce por el nombre de sus excepciones de transporte.
+    return any(n in c.__name__ for c in type(error).__mro__ for n in ("Timeout", "Connect", "Network"))
+
+
+class Servicio:
+    """Política de reintentos, circuito y (opcional) límite de tasa de un servicio externo."""
+    def __init__(self, nombre, politica, circuito, limitador=None):
+        self.nombre = nombre
+        self.politica = politica
+        self.circuito = circuito
+        self.limitador = limitador
+
+    def ejecutar(self, funcion, es_transitorio=es_error_transitorio, cancelar=None, al_esperar=None,
+                 intentos=None, esperar_circuito=True):
+        """
+        Llama a `funcion()` con reintentos. Los errores para los que
+        `es_transitorio(error)` es falso se relanzan de inmediato (el servicio
+        respondió; el problema es la petición). Cada llamada fallida gasta un
+        intento, también las que fallan con el circuito abierto; al agotarlos se
+        relanza el último error. Mientras el circuito está abierto se espera a
+        que se recupere en lugar de hacer la espera exponencial, hasta su
+        `espera_maxima` (CircuitoAbierto); con `esperar_circuito=False` se lanza
+        CircuitoAbierto sin esperar.
+        `al_esperar(segundos, motivo)` avisa de cada pausa. Si `cancelar` (un
+        threading.Event) se activa, no se hace ninguna llamada más y se lanza
+        OperacionCancelada.
+        """
+        intentos = intentos or self.politica.intentos
+        intento = 0
+        while True:
+            if cancelar is not None and cancelar.is_set():
+                raise OperacionCancelada()
+            inicio_espera = time.perf_counter()
+            if self.circuito.esperar_turno(cancelar, al_esperar, bloquear=esperar_circuito):
+                metricas.anotar_tramo(f"espera_circuito.{self.nombre}", time.perf_counter() - inicio_espera)
+            if self.limitador:
+                self.limitador.adquirir(cancelar)
+            intento += 1
+            try:
+                resultado = funcion()
+            except Exception as e:
+                if not es_transitorio(e):
+                    self.circuito.registrar_exito()
+                    raise
+                metricas.contar(f"errores_transitorios.{self.nombre}")
+                self.circuito.registrar_fallo()
+                # El contador no se reinicia tras esperar al circuito: una petición que
+                # falla siempre se abandona aunque el servicio siga en pausa.
+                if intento >= intentos:
+                    raise
+                if esperar_circuito and self.circuito.estado != CERRADO:
+                    continue  # El circuito decide cuándo volver a probar
+                espera = max(self.politica.espera(intento), _espera_indicada(e))
+                logging.warning(f"{self.nombre}: error transitorio ({e}); reintento {intento}/{intentos - 1} en {espera:.1f} s.")
+                metricas.contar(f"reintentos.{self.nombre}")
+                if al_esperar:
+                    al_esperar(espera, str(e))
+                with metricas.tramo(f"espera_reintento.{self.nombre}"):
+                    _dormir(espera, cancelar)
+            else:
+                self.circuito.registrar_exito()
+                return resultado
+
+
+# --- Configuración por servicio ---
+# Las claves son el nombre del motor de transcripción o "huggingface".
+# `por_minuto` activa el límite de tasa (Hugging Face corta con 429 al superar la cuota).
+PETICIONES_HF_POR_MINUTO = int(os.environ.get("EVARISIS_HF_PETICIONES_MINUTO", "30"))
+
+CONFIGURACION = {
+    "google": dict(intentos=4, espera_base=1.0, espera_maxima=20.0, umbral_fallos=3, pausa=15.0,
+                   pausa_maxima=120.0, espera_maxima_circuito=600.0, por_minuto=None),
+    "huggingface": dict(intentos=4, espera_base=2.0, espera_maxima=60.0, umbral_fallos=3, pausa=30.0,
+                        pausa_maxima=180.0, espera_maxima_circuito=600.0, por_minuto=PETICIONES_HF_POR_MINUTO),
+}
+CONFIGURACION_POR_DEFECTO = dict(intentos=3, espera_base=1.0, espera_maxima=20.0, umbral_fallos=3, pausa=15.0,
+                                 pausa_maxima=120.0, espera_maxima_circuito=600.0, por_minuto=None)
+
+_servicios = {}
+_lock_servicios = threading.Lock()
+
+
+def servicio(nombre):
+    """Devuelve el Servicio compartido (por proceso) con ese nombre, creándolo la primera vez."""
+    with _lock_servicios:
+        if nombre not in _servicios:
+            c = CONFIGURACION.get(nombre, CONFIGURACION_POR_DEFECTO)
+            _servicios[nombre] = Servicio(
+                nombre,
+                PoliticaReintento(c["intentos"], c["espera_base"], c["espera_maxima"]),
+                Circuito(nombre, c["umbral_fallos"], c["pausa"], c["pausa_maxima"], c["espera_maxima_circuito"]),
+                LimitadorTasa(c["por_minuto"]) if c["por_minuto"] else None,
+            )
+        return _servicios[nombre]
+
+
+def configurar_tasa(nombre, por_minuto):
+    """Cambia (o quita, con None) el límite de llamadas por minuto de un servicio en este proceso."""
+    servicio(nombre).limitador = LimitadorTasa(por_minuto) if por_minuto else None
+
+
+def hay_conexion(host="8.8.8.8", port=53, timeout=3):
+    """Comprobación puntual de red: abre y cierra una conexión TCP sin tocar el timeout global de sockets."""
+    try:
+        with socket.create_connection((host, port), timeout=timeout):
+            return True
+    except OSError:
+        return False
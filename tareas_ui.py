@@ -0,0 +1,131 @@
+# tareas_ui.py
+# Ejecución de trabajo bloqueante fuera del hilo de Tk.
+# Tk no es seguro entre hilos: ningún hilo de trabajo debe tocar widgets, llamar
+# a messagebox ni siquiera a `after()`. Los hilos solo encolan funciones; el hilo
+# de Tk vacía la cola con un sondeo periódico (`after`) mientras haya tareas.
+#
+#   tarea = ejecutor.ejecutar(trabajo, al_terminar=..., al_fallar=..., al_cancelar=...)
+#   - `trabajo(tarea)` corre en el pool; debe consultar `tarea.cancelada` (o pasar
+#     `tarea.evento_cancelar` a la lógica) para detenerse cuando se cancela.
+#   - Los callbacks se ejecutan en el hilo de Tk con el resultado o la excepción.
+#   - Desde el trabajo, `ejecutor.en_hilo_principal(f, ...)` actualiza la interfaz y
+#     `ejecutor.preguntar(messagebox.askyesno, ...)` muestra un diálogo y espera la respuesta.
+
+import queue
+import logging
+import threading
+from concurrent.futures import Future
+
+import resiliencia
+
+MAX_HILOS_TAREAS = 2
+INTERVALO_SONDEO_MS = 50
+
+
+class Tarea:
+    def __init__(self, nombre):
+        self.nombre = nombre
+        self.evento_cancelar = threading.Event()
+        self.terminada = False
+
+    @property
+    def cancelada(self):
+        return self.evento_cancelar.is_set()
+
+    def cancelar(self):
+        self.evento_cancelar.set()
+
+
+class EjecutorTareas:
+    """Pool de hilos de trabajo ligado a una ventana de Tk."""
+    def __init__(self, raiz, max_hilos=MAX_HILOS_TAREAS, intervalo_ms=INTERVALO_SONDEO_MS):
+        self.raiz = raiz
+        self.intervalo_ms = intervalo_ms
+        self._trabajos = queue.Queue()
+        self._cola_tk = queue.SimpleQueue()
+        self._activas = set()
+        self._sondeando = False
+        # Hilos daemon (no ThreadPoolExecutor): cerrar la ventana no debe esperar a
+        # que termine una transcripción larga; lo ya guardado en disco es reanudable.
+        for i in range(max_hilos):
+            threading.Thread(target=self._trabajador, name=f"TareaUI-{i + 1}", daemon=True).start()
+
+    def ejecutar(self, trabajo, al_terminar=None, al_fallar=None, al_cancelar=None, nombre=None):
+        """Lanza `trabajo(tarea)` en el pool. Llamar solo desde el hilo de Tk."""
+        tarea = Tarea(nombre or getattr(trabajo, "__name__", "tarea"))
+        self._activas.add(tarea)
+        self._trabajos.put((tarea, trabajo, al_terminar, al_fallar, al_cancelar))
+        self._iniciar_sondeo()
+        return tarea
+
+    def en_hilo_principal(self, funcion, *args, **kwargs):
+        """Encola `funcion` para el hilo de Tk. Se puede llamar desde cualquier hilo."""
+        self._cola_tk.put((funcion, args, kwargs))
+
+    def preguntar(self, funcion, *args, **kwargs):
+        """
+        Desde un hilo de trabajo: ejecuta `funcion` (típicamente un messagebox)
+        en el hilo de Tk y devuelve su resultado. No llamar desde el hilo de Tk
+        (se bloquearía esperándose a sí mismo); ahí basta con llamar a `funcion`.
+        """
+        if threading.current_thread() is threading.main_thread():
+            return funcion(*args, **kwargs)
+        resultado = Future()
+        def _en_tk():
+            try:
+                resultado.set_result(funcion(*args, **kwargs))
+            except Exception as e:
+                resultado.set_exception(e)
+        self.en_hilo_principal(_en_tk)
+        return resultado.result()
+
+    def cancelar_todo(self):
+        for tarea in list(self._activas):
+            tarea.cancelar()
+
+    @property
+    def ocupado(self):
+        return bool(self._activas)
+
+    def _trabajador(self):
+        while True:
+            tarea, trabajo, al_terminar, al_fallar, al_cancelar = self._trabajos.get()
+            if tarea.cancelada:
+                self.en_hilo_principal(self._finalizar, tarea, al_cancelar)
+                continue
+            try:
+                resultado = trabajo(tarea)
+            except resiliencia.OperacionCancelada:
+                self.en_hilo_principal(self._finalizar, tarea, al_cancelar)
+            except Exception as e:
+                logging.error(f"Error en la tarea '{tarea.nombre}': {e}", exc_info=True)
+                self.en_hilo_principal(self._finalizar, tarea, al_fallar, e)
+            else:
+                self.en_hilo_principal(self._finalizar, tarea, al_terminar, resultado)
+
+    def _finalizar(self, tarea, callback, *args):
+        # Se quita de las activas en el hilo de Tk, después de todo lo que la tarea haya encolado antes.
+        tarea.terminada = True
+        self._activas.discard(tarea)
+        if callback:
+            callback(*args)
+
+    def _iniciar_sondeo(self):
+        if not self._sondeando:
+            self._sondeando = True
+            self.raiz.after(self.intervalo_ms, self._sondear)
+
+    def _sondear(self):
+        while True:
+            try:
+                funcion, args, kwargs = self._cola_tk.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                funcion(*args, **kwargs)
+            except Exception as e:
+                logging.error(f"Error al actualizar la interfaz desde una tarea: {e}", exc_info=True)
+        if self._activas:
+            self.raiz.after(self.intervalo_ms, self._sondear)
+        else:
+            self._sondeando = False
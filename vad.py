@@ -0,0 +1,118 @@
+# vad.py
+# Detección de actividad de voz (VAD) sobre PCM int16 mono.
+# Recorta los silencios de los extremos y parte las intervenciones largas en las
+# pausas, para enviar al reconocedor solo segmentos de voz de tamaño razonable.
+
+import numpy as np
+
+DURACION_TRAMA_MS = 30          # Tamaño de la ventana de análisis
+UMBRAL_ENERGIA_MINIMO = 300     # RMS mínimo (int16) para considerar voz en una sala muy silenciosa
+FACTOR_SOBRE_RUIDO = 3.0        # La voz debe superar el ruido de fondo estimado en este factor
+FRACCION_MAXIMA_UMBRAL = 0.3    # ...pero el umbral nunca pasa de esta fracción de las tramas más fuertes
+RANGO_ZCR_FRICATIVAS = (0.15, 0.5)  # Cruces por cero típicos de "s", "f", "j" con poca energía
+PAUSA_MINIMA_MS = 600           # Silencio a partir del cual se considera que hay una pausa
+SILENCIO_LARGO_MS = 2000        # Pausas más largas nunca se envían: se corta el segmento ahí
+VOZ_MINIMA_MS = 150             # Ráfagas más cortas se tratan como ruido (golpes, clics)
+MARGEN_MS = 200                 # Audio que se conserva antes y después de cada tramo de voz
+DURACION_MAXIMA_SEGMENTO_S = 45 # Tamaño máximo de cada segmento enviado al reconocedor
+
+
+def _tramas(muestras, tam_trama):
+    """Devuelve una matriz (n_tramas, tam_trama); descarta la cola incompleta."""
+    n_tramas = len(muestras) // tam_trama
+    return muestras[:n_tramas * tam_trama].reshape(n_tramas, tam_trama)
+
+
+def detectar_voz(muestras, frecuencia):
+    """
+    Clasifica cada trama como voz (True) o silencio (False) combinando energía
+    RMS y tasa de cruces por cero. Devuelve también la energía por trama.
+    """
+    tam_trama = int(frecuencia * DURACION_TRAMA_MS / 1000)
+    tramas = _tramas(muestras, tam_trama).astype(np.float32)
+    if tramas.size == 0:
+        return np.zeros(0, dtype=bool), np.zeros(0, dtype=np.float32)
+
+    energia = np.sqrt(np.mean(tramas * tramas, axis=1))
+    signos = np.signbit(tramas)
+    zcr = np.count_nonzero(signos[:, 1:] != signos[:, :-1], axis=1) / tam_trama
+
+    # El ruido de fondo se estima con las tramas más silenciosas de la propia intervención.
+    # Si alguien habla sin pausas esas tramas también son voz, así que el umbral se
+    # limita a una fracción de las tramas más fuertes.
+    ruido, fuerte = np.percentile(energia, [10, 95])
+    umbral = max(min(ruido * FACTOR_SOBRE_RUIDO, fuerte * FRACCION_MAXIMA_UMBRAL), UMBRAL_ENERGIA_MINIMO)
+    fricativas = (energia > umbral * 0.5) & (zcr > RANGO_ZCR_FRICATIVAS[0]) & (zcr < RANGO_ZCR_FRICATIVAS[1])
+    return (energia > umbral) | fricativas, energia
+
+
+def _tramos_de_voz(voz, pausa_minima, voz_minima):
+    """Convierte la máscara por trama en tramos [inicio, fin) de voz, uniendo pausas cortas."""
+    bordes = np.diff(np.concatenate(([0], voz.astype(np.int8), [0])))
+    inicios = np.flatnonzero(bordes == 1)
+    fines = np.flatnonzero(bordes == -1)
+    if inicios.size == 0:
+        return inicios, fines
+
+    # Une tramos separados por silencios más cortos que una pausa.
+    cortes = (inicios[1:] - fines[:-1]) >= pausa_minima
+    inicios = inicios[np.concatenate(([True], cortes))]
+    fines = fines[np.concatenate((cortes, [True]))]
+
+    largos = (fines - inicios) >= voz_minima
+    return inicios[largos], fines[largos]
+
+
+def _partir_tramo(inicio, fin, energia, max_tramas):
+    """Parte un tramo demasiado largo por la trama más silenciosa cerca del límite."""
+    partes = []
+    while fin - inicio > max_tramas:
+        # Se busca el corte en el último tercio de la ventana permitida.
+        desde = inicio + (max_tramas * 2) // 3
+        hasta = inicio + max_tramas
+        corte = desde + int(np.argmin(energia[desde:hasta]))
+        partes.append((inicio, corte))
+        inicio = corte
+    partes.append((inicio, fin))
+    return partes
+
+
+def segmentar_por_voz(pcm, frecuencia, duracion_maxima_s=DURACION_MAXIMA_SEGMENTO_S):
+    """
+    Recibe bytes PCM int16 mono y devuelve una lista de segmentos (bytes) que
+    contienen voz, cada uno de como máximo `duracion_maxima_s` segundos.
+    Devuelve una lista vacía si no se detecta voz.
+    """
+    muestras = np.frombuffer(pcm, dtype='<i2')
+    voz, energia = detectar_voz(muestras, frecuencia)
+    if not voz.any():
+        return []
+
+    ms_por_trama = DURACION_TRAMA_MS
+    inicios, fines = _tramos_de_voz(voz, PAUSA_MINIMA_MS // ms_por_trama, VOZ_MINIMA_MS // ms_por_trama)
+    max_tramas = int(duracion_maxima_s * 1000 / ms_por_trama)
+    margen = MARGEN_MS // ms_por_trama
+
+    silencio_largo = SILENCIO_LARGO_MS // ms_por_trama
+
+    # Agrupa tramos consecutivos mientras quepan en un segmento; así los cortes
+    # caen siempre en una pausa real salvo que un solo tramo exceda el máximo.
+    grupos = []
+    for inicio, fin in zip(inicios.tolist(), fines.tolist()):
+        if grupos and fin - grupos[-1][0] <= max_tramas and inicio - grupos[-1][1] < silencio_largo:
+            grupos[-1][1] = fin
+        else:
+            grupos.append([inicio, fin])
+
+    tam_trama = int(frecuencia * ms_por_trama / 1000)
+    total_tramas = len(voz)
+    segmentos = []
+    for inicio, fin in grupos:
+        partes = _partir_tramo(inicio, fin, energia, max_tramas)
+        # El margen solo se añade en los extremos del grupo; los cortes forzados
+        # internos no se solapan para no repetir sílabas entre segmentos.
+        partes[0] = (max(partes[0][0] - margen, 0), partes[0][1])
+        partes[-1] = (partes[-1][0], min(partes[-1][1] + margen, total_tramas))
+        for ini, fi in partes:
+            segmentos.append(muestras[ini * tam_trama:fi * tam_trama].tobytes())
+    return segmentos